@@ -0,0 +1,173 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+TELEGRAM_API_BASE_URL = "https://api.telegram.org"
+# sendMessage rejects longer texts with a 400
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+_ALERT_HEADER = 'New job matches for you:\n'
+
+
+def _format_job_entry(job: Dict[str, Any]) -> str:
+    # Titles are the post's first line and can be arbitrarily long; clip them so any one entry fits
+    title = str(job.get('title', 'Job'))
+    if len(title) > 300:
+        title = title[:299] + '…'
+    return f"\n{title} at {job.get('company', '')}\n{job.get('url', '')}\n"
+
+
+def format_job_alert(jobs: List[Dict[str, Any]]) -> str:
+    return _ALERT_HEADER + ''.join(_format_job_entry(job) for job in jobs)
+
+
+def split_job_alert(jobs: List[Dict[str, Any]], limit: int = TELEGRAM_MESSAGE_LIMIT) -> List[List[int]]:
+    """Group job positions into as few messages as possible, each within `limit` characters."""
+    groups: List[List[int]] = []
+    length = limit
+    for i, job in enumerate(jobs):
+        entry = len(_format_job_entry(job))
+        if not groups or length + entry > limit:
+            groups.append([])
+            length = len(_ALERT_HEADER)
+        groups[-1].append(i)
+        length += entry
+    return groups
+
+
+class DeliveryResult:
+    def __init__(self, chat_id, ok: bool, attempts: int, status_code: Optional[int] = None, error: str = ''):
+        self.chat_id = chat_id
+        self.ok = ok
+        self.attempts = attempts
+        self.status_code = status_code
+        self.error = error
+
+    def __repr__(self):
+        state = 'ok' if self.ok else f"failed ({self.status_code}: {self.error})"
+        return f"DeliveryResult(chat_id={self.chat_id}, {state}, attempts={self.attempts})"
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second: float, capacity: float = 1.0):
+        self.rate = max(0.001, float(rate_per_second))
+        self.capacity = max(1.0, float(capacity))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+
+    def pause(self, seconds: float) -> None:
+        # Hand out nothing until then, and start again from an empty bucket rather than a burst
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+        self.updated_at = self.paused_until
+
+    async def acquire(self) -> None:
+        # Single event loop, no await between the check and the decrement, so no lock is needed
+        while True:
+            now = time.monotonic()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return
+            await asyncio.sleep((1.0 - self.tokens) / self.rate)
+
+
+class TelegramAlertDispatcher:
+    """
+    Sends alerts through the Bot API over one pooled HTTP client. At most max_in_flight
+    messages are being sent at once; a global token bucket and one bucket per chat keep us
+    under Telegram's broadcast limits. A 429 pauses the global bucket for the server's
+    retry_after, so every sender backs off, not just the one that hit it. 5xx and network
+    errors back off exponentially, and other 4xx are final.
+    """
+
+    def __init__(
+        self,
+        token: str,
+        global_rate: float = 25.0,
+        per_chat_rate: float = 1.0,
+        max_retries: int = 3,
+        max_connections: int = 20,
+        max_in_flight: int = 20,
+        timeout_seconds: float = 15.0,
+        base_url: str = TELEGRAM_API_BASE_URL,
+    ):
+        self.url = f"{base_url.rstrip('/')}/bot{token}/sendMessage"
+        self.global_bucket = TokenBucket(global_rate, capacity=global_rate)
+        self.per_chat_rate = per_chat_rate
+        self.max_retries = max_retries
+        self.max_connections = max_connections
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.timeout_seconds = timeout_seconds
+        self._chat_buckets: Dict[Any, TokenBucket] = {}
+
+    async def send_many(self, messages: List[Tuple[Any, str]]) -> List[DeliveryResult]:
+        limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+        # A bounded pool of senders instead of one task per message, so a large batch does not
+        # have every message polling the token buckets at once
+        pending = iter(enumerate(messages))
+        results: List[Optional[DeliveryResult]] = [None] * len(messages)
+
+        async def worker(client: httpx.AsyncClient) -> None:
+            # Workers share one iterator, so each message is taken by exactly one of them
+            for i, (chat_id, text) in pending:
+                results[i] = await self._send(client, chat_id, text)
+
+        async with httpx.AsyncClient(limits=limits, timeout=self.timeout_seconds) as client:
+            await asyncio.gather(*[worker(client) for _ in range(min(self.max_in_flight, len(messages)))])
+        return results
+
+    async def _send(self, client: httpx.AsyncClient, chat_id, text: str) -> DeliveryResult:
+        chat_bucket = self._chat_buckets.setdefault(chat_id, TokenBucket(self.per_chat_rate))
+        status_code = None
+        error = ''
+        attempt = 0
+        while True:
+            attempt += 1
+            await chat_bucket.acquire()
+            await self.global_bucket.acquire()
+            try:
+                resp = await client.post(self.url, data={"chat_id": chat_id, "text": text})
+            except httpx.HTTPError as e:
+                status_code, error = None, str(e) or e.__class__.__name__
+                delay = min(30, 2 ** attempt)
+            else:
+                status_code = resp.status_code
+                try:
+                    body = resp.json()
+                except ValueError:
+                    body = {}
+                if status_code == 200 and body.get('ok'):
+                    return DeliveryResult(chat_id, True, attempt, status_code)
+                error = body.get('description') or resp.reason_phrase
+                if status_code == 429:
+                    delay = float((body.get('parameters') or {}).get('retry_after') or 1)
+                    self.global_bucket.pause(delay)
+                elif status_code >= 500:
+                    delay = min(30, 2 ** attempt)
+                else:
+                    # 400/403 (chat not found, bot blocked by the user) will not succeed on retry
+                    break
+            if attempt > self.max_retries:
+                break
+            await asyncio.sleep(delay)
+        return DeliveryResult(chat_id, False, attempt, status_code, error)
+
+
+def get_alert_dispatcher(config: Dict[str, Any]) -> TelegramAlertDispatcher:
+    return TelegramAlertDispatcher(
+        token=config['TELEGRAM_BOT_TOKEN'],
+        global_rate=float(config.get('ALERT_GLOBAL_RATE', 25)),
+        per_chat_rate=float(config.get('ALERT_PER_CHAT_RATE', 1)),
+        max_retries=int(config.get('ALERT_MAX_RETRIES', 3)),
+        max_connections=int(config.get('ALERT_MAX_CONNECTIONS', 20)),
+        max_in_flight=int(config.get('ALERT_MAX_IN_FLIGHT', 20)),
+        base_url=config.get('TELEGRAM_API_BASE_URL') or TELEGRAM_API_BASE_URL,
+    )
@@ -0,0 +1,110 @@
+import asyncio
+from typing import Any, Dict, List, Tuple
+
+from alerts.dispatcher import format_job_alert, get_alert_dispatcher, split_job_alert
+from db.db import enqueue_alerts, claim_outbox_batch, complete_outbox_rows, release_outbox_rows, mark_jobs_as_sent
+from metrics.metrics import ALERTS, ALERTS_QUEUED
+
+
+def build_outbox_rows(user_id, jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # The payload carries what the message needs, so delivery never has to read the jobs table
+    return [
+        {
+            'user_id': user_id,
+            'job_id': job['id'],
+            'payload': {
+                'title': job.get('title') or 'Job',
+                'company': job.get('company') or '',
+                'url': job.get('url') or '',
+            },
+        }
+        for job in jobs
+    ]
+
+
+def _is_permanent(result) -> bool:
+    # Only failures about the chat itself (bot blocked, chat gone) are final. Other 400s may be
+    # caused by the message, and the jobs in it must stay deliverable: parked rows are never
+    # queued again for that user.
+    if result.status_code == 403:
+        return True
+    error = (result.error or '').lower()
+    return result.status_code == 400 and any(
+        reason in error for reason in ('chat not found', 'user is deactivated', 'bot was kicked', 'peer_id_invalid')
+    )
+
+
+def enqueue_job_alerts(alerts: List[Tuple[Any, List[Dict[str, Any]]]]) -> int:
+    rows = [row for user_id, jobs in alerts for row in build_outbox_rows(user_id, jobs)]
+    if rows:
+        enqueue_alerts(rows)
+        ALERTS_QUEUED.inc(len(rows))
+    return len(rows)
+
+
+class AlertDeliveryWorker:
+    """
+    Drains alert_outbox in batches. Rows are claimed with a lease, grouped into one message per
+    user (more if they would not fit in one Telegram message), and marked sent (plus recorded in
+    sent_alerts) only once Telegram accepts the message. Transient failures go back to pending;
+    permanent ones (bot blocked, chat gone) are parked as failed.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.batch_size = int(config.get('ALERT_OUTBOX_BATCH_SIZE', 500))
+        self.lease_seconds = int(config.get('ALERT_OUTBOX_LEASE_SECONDS', 300))
+        self.max_attempts = int(config.get('ALERT_OUTBOX_MAX_ATTEMPTS', 5))
+        self.max_batches = int(config.get('ALERT_OUTBOX_MAX_BATCHES', 20))
+
+    async def drain(self) -> Tuple[int, int]:
+        delivered = failed = 0
+        for _ in range(self.max_batches):
+            rows = await asyncio.to_thread(claim_outbox_batch, self.batch_size, self.lease_seconds)
+            if not rows:
+                break
+            ok, not_ok = await self.deliver(rows)
+            delivered += ok
+            failed += not_ok
+        if delivered or failed:
+            print(f"Alert outbox: delivered {delivered} messages, {failed} not delivered")
+        return delivered, failed
+
+    async def deliver(self, rows: List[Dict[str, Any]]) -> Tuple[int, int]:
+        by_user: Dict[Any, List[Dict[str, Any]]] = {}
+        for row in rows:
+            by_user.setdefault(row['user_id'], []).append(row)
+        # One message per user unless a backlog (first cycle, after an outage) would go over
+        # Telegram's length limit; then as many messages as it takes
+        batches = []
+        for user_id, user_rows in by_user.items():
+            payloads = [r.get('payload') or {} for r in user_rows]
+            for group in split_job_alert(payloads):
+                batches.append((user_id, [user_rows[i] for i in group]))
+        dispatcher = get_alert_dispatcher(self.config)
+        results = await dispatcher.send_many(
+            [(user_id, format_job_alert([r.get('payload') or {} for r in user_rows])) for user_id, user_rows in batches]
+        )
+        delivered = failed = 0
+        for (user_id, user_rows), result in zip(batches, results):
+            ids = [r['id'] for r in user_rows]
+            if result.ok:
+                # Close the outbox rows first: if we crash before sent_alerts is written, the
+                # unique (user_id, job_id) outbox row still stops the job from being queued again
+                await asyncio.to_thread(complete_outbox_rows, ids)
+                await asyncio.to_thread(mark_jobs_as_sent, user_id, [{'id': r['job_id']} for r in user_rows])
+                delivered += 1
+                ALERTS.inc(outcome='sent')
+                continue
+            failed += 1
+            attempts = max(int(r.get('attempts') or 0) for r in user_rows) + 1
+            permanent = _is_permanent(result)
+            ALERTS.inc(outcome='failed' if permanent or attempts >= self.max_attempts else 'retry')
+            await asyncio.to_thread(
+                release_outbox_rows,
+                ids,
+                attempts,
+                f"{result.status_code} {result.error}",
+                final=permanent or attempts >= self.max_attempts,
+            )
+        return delivered, failed
@@ -0,0 +1,178 @@
+"""
+End-to-end benchmark of one scrape → match → deliver cycle, entirely offline.
+
+Telegram, Supabase, the Hugging Face Inference API and the Bot API are replaced by in-process
+fakes (see benchmarks/fakes.py); everything in between is the production code path. Run from
+the find_jobs/ directory:
+
+    python -m benchmarks.cycle_benchmark --users 100,1000 --jobs 50,200 --channels 1,5
+    python -m benchmarks.cycle_benchmark --hf-latency-ms 200 --hf-429-rate 0.1 --json results.json
+    python -m benchmarks.cycle_benchmark --channels 3 --cross-post-rate 0.3
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from benchmarks.fakes import (
+    FakePyrogramClient, FakeRepository, FakeServiceServer, FakeTelegramScraper, synthetic_users,
+)
+from config.config import load_config
+from db.db import use_repository
+from matching import inference_cache
+from scheduler.scheduler import JobScheduler
+from search import near_duplicates
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+def build_config(args, services: FakeServiceServer, channels: List[str], workdir: str) -> Dict[str, Any]:
+    config = load_config()
+    config.update({
+        'TELEGRAM_BOT_TOKEN': 'bench-token',
+        'TELEGRAM_API_BASE_URL': services.base_url,
+        'HF_API_KEY': 'bench-key',
+        'HF_INFERENCE_BASE_URL': f"{services.base_url}/models",
+        'AI_MATCH_PROVIDER': args.provider,
+        'LOCAL_MATCHER_PATH': os.path.join(workdir, 'local_matcher.json'),
+        # A fresh in-memory cache per run, so runs don't warm each other up
+        'INFERENCE_CACHE_BACKEND': 'memory',
+        'TELEGRAM_CHANNELS': channels,
+        'WORKER_SHARD_MODE': 'single',
+        'LIVE_INGESTION': False,
+        'JOB_CANDIDATE_WINDOW': args.window,
+        'ALERT_GLOBAL_RATE': args.alert_rate,
+        'ALERT_PER_CHAT_RATE': args.alert_rate,
+        'ALERT_OUTBOX_MAX_BATCHES': 1000,
+    })
+    return config
+
+
+async def run_cycle(config: Dict[str, Any], scraper: FakeTelegramScraper, passes: int) -> Dict[str, float]:
+    scheduler = JobScheduler(scraper=scraper)
+    timings = {'cycle_seconds': 0.0, 'delivery_seconds': 0.0}
+    for _ in range(passes):
+        started = time.perf_counter()
+        await scheduler.run_scrape_and_alert(config)
+        timings['cycle_seconds'] += time.perf_counter() - started
+        started = time.perf_counter()
+        await scheduler.run_alert_delivery(config)
+        timings['delivery_seconds'] += time.perf_counter() - started
+    return timings
+
+
+def run_point(args, services: FakeServiceServer, users: int, jobs: int, channels: int) -> Dict[str, Any]:
+    channel_names = [f"@bench_channel_{i}" for i in range(channels)]
+    per_channel = max(1, jobs // channels)
+    client = FakePyrogramClient(
+        channel_names, per_channel,
+        latency_seconds=args.telegram_latency_ms / 1000.0, cross_post_rate=args.cross_post_rate,
+    )
+    repo = FakeRepository(synthetic_users(users), latency_seconds=args.db_latency_ms / 1000.0)
+    repo.offsets = client.initial_offsets()
+    use_repository(repo)
+    inference_cache._cache = None
+    near_duplicates._index = None
+    services.reset()
+    with tempfile.TemporaryDirectory() as workdir:
+        config = build_config(args, services, channel_names, workdir)
+        # Allow enough pages to pick up every synthetic post in one cycle
+        config['SCRAPE_MAX_PAGES'] = math.ceil(per_channel / max(1, int(config['SCRAPE_PAGE_SIZE']))) + 1
+        timings = asyncio.run(run_cycle(config, FakeTelegramScraper(client), args.passes))
+    hf = services.stats.get('hf', {})
+    bot = services.stats.get('bot', {})
+    outbox = list(repo.outbox.values())
+    stored = len(repo.jobs)
+    return {
+        'users': users,
+        'jobs': jobs,
+        'channels': channels,
+        'stored_jobs': stored,
+        'duplicates': sum(1 for j in repo.jobs if j.get('canonical_job_id') is not None),
+        'cycle_seconds': round(timings['cycle_seconds'], 3),
+        'delivery_seconds': round(timings['delivery_seconds'], 3),
+        'jobs_per_second': round(stored / timings['cycle_seconds'], 1) if timings['cycle_seconds'] else None,
+        'alerts_queued': len(outbox),
+        'alerts_sent': sum(1 for r in outbox if r['status'] == 'sent'),
+        'alerts_failed': sum(1 for r in outbox if r['status'] == 'failed'),
+        'hf_zero_shot_requests': hf.get('zero-shot_requests', 0),
+        'hf_zero_shot_texts': hf.get('zero-shot_texts', 0),
+        'hf_ner_requests': hf.get('ner_requests', 0),
+        'hf_429': hf.get('429', 0),
+        'bot_requests': bot.get('requests', 0),
+        'bot_429': bot.get('429', 0),
+        'telegram_calls': sum(client.calls.values()),
+        'db_calls': sum(repo.calls.values()),
+        'db_calls_by_op': dict(sorted(repo.calls.items())),
+    }
+
+
+COLUMNS = [
+    ('users', 6), ('jobs', 6), ('channels', 8), ('stored_jobs', 7), ('duplicates', 6), ('cycle_seconds', 9),
+    ('jobs_per_second', 9), ('delivery_seconds', 9), ('alerts_queued', 8), ('alerts_sent', 8),
+    ('hf_zero_shot_requests', 8), ('hf_zero_shot_texts', 8), ('hf_ner_requests', 8), ('hf_429', 6),
+    ('bot_requests', 8), ('telegram_calls', 8), ('db_calls', 8),
+]
+HEADERS = {
+    'stored_jobs': 'stored', 'duplicates': 'dups', 'cycle_seconds': 'cycle_s', 'jobs_per_second': 'jobs/s',
+    'delivery_seconds': 'deliv_s', 'alerts_queued': 'queued', 'alerts_sent': 'sent',
+    'hf_zero_shot_requests': 'zs_req', 'hf_zero_shot_texts': 'zs_txt', 'hf_ner_requests': 'ner_req',
+    'bot_requests': 'bot_req', 'telegram_calls': 'tg_req', 'db_calls': 'db',
+}
+
+
+def print_header() -> None:
+    print(' '.join(HEADERS.get(name, name).rjust(width) for name, width in COLUMNS))
+
+
+def print_row(row: Dict[str, Any]) -> None:
+    print(' '.join(str(row.get(name, '')).rjust(width) for name, width in COLUMNS))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=_int_list, default=[10, 100, 1000], help='comma-separated user counts')
+    parser.add_argument('--jobs', type=_int_list, default=[50, 200], help='comma-separated new posts per cycle')
+    parser.add_argument('--channels', type=_int_list, default=[1, 5], help='comma-separated channel counts')
+    parser.add_argument('--passes', type=int, default=1, help='cycles per grid point (later passes find no new posts)')
+    parser.add_argument('--provider', default='huggingface_zeroshot', choices=['huggingface_zeroshot', 'local'])
+    parser.add_argument('--window', type=int, default=200, help='JOB_CANDIDATE_WINDOW')
+    parser.add_argument('--hf-latency-ms', type=float, default=50.0)
+    parser.add_argument('--hf-429-rate', type=float, default=0.0)
+    parser.add_argument('--bot-latency-ms', type=float, default=10.0)
+    parser.add_argument('--bot-429-rate', type=float, default=0.0)
+    parser.add_argument('--telegram-latency-ms', type=float, default=20.0)
+    parser.add_argument('--cross-post-rate', type=float, default=0.0, help='share of posts copied from the first channel')
+    parser.add_argument('--db-latency-ms', type=float, default=5.0)
+    parser.add_argument('--alert-rate', type=float, default=1000.0, help='Bot API sends per second (global and per chat)')
+    parser.add_argument('--json', dest='json_path', help='also write the raw results to this file')
+    args = parser.parse_args()
+
+    services = FakeServiceServer(
+        hf_latency_seconds=args.hf_latency_ms / 1000.0,
+        hf_429_rate=args.hf_429_rate,
+        bot_latency_seconds=args.bot_latency_ms / 1000.0,
+        bot_429_rate=args.bot_429_rate,
+    ).start()
+    results = []
+    print_header()
+    try:
+        for users, jobs, channels in itertools.product(args.users, args.jobs, args.channels):
+            results.append(run_point(args, services, users, jobs, channels))
+            print_row(results[-1])
+    finally:
+        services.stop()
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,451 @@
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs
+
+from db.db import SupabaseRepository, JobSnapshot
+from matching.ai_matcher import DOMAIN_LABELS
+from scraper.scraper import TelegramScraper, _channel_key
+
+# Words that make a synthetic post (and the fake zero-shot model) lean towards a domain
+DOMAIN_WORDS: Dict[str, List[str]] = {
+    "Web Development": ["react", "frontend", "backend", "django", "javascript"],
+    "Data Science": ["python", "machine learning", "sql", "analytics", "pandas"],
+    "UI/UX Design": ["figma", "wireframes", "user research", "prototype"],
+    "Mobile Development": ["android", "ios", "flutter", "kotlin", "swift"],
+    "DevOps": ["kubernetes", "docker", "ci/cd", "terraform", "aws"],
+    "Marketing": ["campaigns", "seo", "social media", "brand"],
+    "Finance": ["budget", "financial reporting", "audit", "forecasting"],
+    "Sales": ["leads", "quota", "b2b", "pipeline", "closing"],
+    "Accounting": ["bookkeeping", "ledger", "ifrs", "reconciliation"],
+    "Customer Support": ["tickets", "helpdesk", "customer calls"],
+    "Healthcare": ["nurse", "clinic", "patients", "pharmacy"],
+    "Education": ["teacher", "curriculum", "students", "tutoring"],
+}
+COMPANIES = ["Acme", "Globex", "Initech", "Umbrella", "Hooli", "Stark Industries"]
+CITIES = ["Addis Ababa", "Adama", "Hawassa", "Remote", "Bahir Dar"]
+LEVELS = ["junior", "mid-level", "senior", "lead"]
+DUTIES = [
+    "You will own features end to end and work closely with the product team",
+    "You will review work from peers and help set standards for quality",
+    "You will report progress weekly and keep documentation up to date",
+    "You will support customers and stakeholders when issues come up",
+    "You will plan work with your manager and mentor newer colleagues",
+]
+BENEFITS = [
+    "We offer a competitive salary, health insurance and flexible working hours",
+    "The role includes paid training, a yearly bonus and a transport allowance",
+    "Hybrid work is possible after the probation period of three months",
+]
+
+
+class FakeMessage:
+    def __init__(self, message_id: int, text: str):
+        self.id = message_id
+        self.text = text
+        self.caption = None
+        self.chat = None
+
+
+def synthetic_post(rng: random.Random, message_id: int) -> str:
+    domain = rng.choice(list(DOMAIN_WORDS))
+    words = rng.sample(DOMAIN_WORDS[domain], k=min(3, len(DOMAIN_WORDS[domain])))
+    # Some posts leave fields unlabeled so the extractor has work to do
+    lines = [f"{rng.choice(LEVELS).title()} {domain} specialist #{message_id}"]
+    if rng.random() < 0.5:
+        lines.append(f"Company: {rng.choice(COMPANIES)}")
+    if rng.random() < 0.5:
+        lines.append(f"Location: {rng.choice(CITIES)}")
+    lines.append(f"We are hiring. Experience with {', '.join(words)} required.")
+    lines.append('. '.join(rng.sample(DUTIES, k=2) + [rng.choice(BENEFITS)]) + '.')
+    return '\n'.join(lines)
+
+
+class FakePyrogramClient:
+    """
+    Stands in for a connected Pyrogram client. `invoke` answers GetHistory requests from
+    synthetic channels, honouring offset_id, add_offset, min_id and limit like the real server. A
+    `cross_post_rate` share of each later channel's posts are copies of the first channel's,
+    with a channel footer added, as when a vacancy is shared across channels.
+    """
+
+    FIRST_ID = 1000
+
+    def __init__(
+        self,
+        channels: List[str],
+        posts_per_channel: int,
+        latency_seconds: float = 0.0,
+        seed: int = 7,
+        cross_post_rate: float = 0.0,
+    ):
+        rng = random.Random(seed)
+        self.latency_seconds = latency_seconds
+        self.history: Dict[str, List[FakeMessage]] = {}
+        originals: List[str] = []
+        for channel in channels:
+            key = _channel_key(channel)
+            texts = []
+            for i, message_id in enumerate(range(self.FIRST_ID, self.FIRST_ID + posts_per_channel)):
+                if originals and rng.random() < cross_post_rate:
+                    texts.append(f"{originals[i]}\nFollow @{key} for more jobs")
+                else:
+                    texts.append(synthetic_post(rng, message_id))
+            originals = originals or texts
+            self.history[key] = [
+                FakeMessage(message_id, text)
+                for message_id, text in zip(range(self.FIRST_ID, self.FIRST_ID + posts_per_channel), texts)
+            ]
+        self.calls = {'resolve_peer': 0, 'invoke': 0}
+        self.handlers = []
+
+    def initial_offsets(self) -> Dict[str, int]:
+        # High-water marks just below the synthetic posts, so a cycle pages through all of them
+        # (a channel with no stored offset only gets its latest page)
+        return {key: self.FIRST_ID - 1 for key in self.history}
+
+    def add_handler(self, handler, group=0):
+        self.handlers.append(handler)
+
+    def remove_handler(self, handler, group=0):
+        self.handlers.remove(handler)
+
+    async def resolve_peer(self, channel):
+        self.calls['resolve_peer'] += 1
+        return _channel_key(channel)
+
+    async def invoke(self, request, sleep_threshold=None):
+        self.calls['invoke'] += 1
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        # Newest first, like messages.getHistory: the page starts add_offset positions from the
+        # first message older than offset_id (negative add_offset reaches newer messages)
+        messages = [m for m in reversed(self.history.get(request.peer, [])) if m.id > request.min_id]
+        start = sum(1 for m in messages if m.id >= request.offset_id) if request.offset_id else 0
+        start = max(0, start + request.add_offset)
+        return messages[start:start + request.limit]
+
+
+class FakeTelegramScraper(TelegramScraper):
+    def __init__(self, client: FakePyrogramClient):
+        super().__init__()
+        self.client = client
+
+    async def get_pyrogram_client(self, config):
+        return self.client
+
+    async def parse_history(self, app, history):
+        return list(history)
+
+    async def cleanup_pyrogram_client(self):
+        return None
+
+
+class FakeRepository(SupabaseRepository):
+    """In-memory tables behind the SupabaseRepository interface, with a fixed delay per call."""
+
+    def __init__(self, users: List[Dict[str, Any]], latency_seconds: float = 0.0):
+        super().__init__(client=None)
+        self.latency_seconds = latency_seconds
+        self.users = list(users)
+        self.jobs: List[Dict[str, Any]] = []
+        self.job_urls: Dict[str, int] = {}
+        self.sent: Dict[Any, set] = {}
+        self.outbox: Dict[int, Dict[str, Any]] = {}
+        self.outbox_keys = set()
+        self.offsets: Dict[str, int] = {}
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _call(self, op: str) -> None:
+        with self._lock:
+            self.calls[op] = self.calls.get(op, 0) + 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+    def save_user_profile(self, user_data):
+        self._call('save_user_profile')
+        self.users = [u for u in self.users if u['user_id'] != user_data['user_id']] + [dict(user_data)]
+
+    def get_user_profile(self, user_id):
+        self._call('get_user_profile')
+        return next((u for u in self.users if u['user_id'] == user_id), None)
+
+    def save_job_posts(self, jobs, chunk_size=200):
+        new_ids = []
+        for i in range(0, len(jobs), chunk_size):
+            self._call('save_job_posts')
+            with self._lock:
+                for job in jobs[i:i + chunk_size]:
+                    if job.get('url') in self.job_urls:
+                        continue
+                    row = dict(job, id=len(self.jobs) + 1)
+                    job['id'] = row['id']
+                    self.jobs.append(row)
+                    self.job_urls[row['url']] = row['id']
+                    new_ids.append(row['id'])
+        return new_ids
+
+    def fetch_jobs_after(self, after_id, limit=1000, columns='*'):
+        self._call('fetch_jobs_after')
+        return [dict(j) for j in self.jobs if j['id'] > after_id][:limit]
+
+    def get_existing_job_urls(self, urls, chunk_size=200):
+        unique = list(dict.fromkeys(u for u in urls if u))
+        for _ in range(0, len(unique), chunk_size):
+            self._call('get_existing_job_urls')
+        return {u for u in unique if u in self.job_urls}
+
+    def mark_jobs_as_sent(self, user_id, jobs):
+        self._call('mark_jobs_as_sent')
+        with self._lock:
+            self.sent.setdefault(user_id, set()).update(job['id'] for job in jobs)
+
+    def fetch_all_users(self):
+        self._call('fetch_all_users')
+        return [dict(u) for u in self.users]
+
+    def fetch_recent_jobs(self, limit=200, columns='*'):
+        self._call('fetch_recent_jobs')
+        canonical = [j for j in self.jobs if j.get('canonical_job_id') is None]
+        return [dict(j) for j in reversed(canonical[-limit:])]
+
+    def load_job_snapshot(self, window=200):
+        return JobSnapshot(self.fetch_recent_jobs(window))
+
+    def fetch_sent_job_ids_by_user(self, job_ids, page_size=1000, chunk_size=200):
+        self._call('fetch_sent_job_ids_by_user')
+        wanted = set(job_ids)
+        return {user_id: ids & wanted for user_id, ids in self.sent.items() if ids & wanted}
+
+    def fetch_queued_job_ids_by_user(self, job_ids, page_size=1000, chunk_size=200):
+        self._call('fetch_queued_job_ids_by_user')
+        wanted = set(job_ids)
+        queued: Dict[Any, set] = {}
+        for user_id, job_id in self.outbox_keys:
+            if job_id in wanted:
+                queued.setdefault(user_id, set()).add(job_id)
+        return queued
+
+    def fetch_labeled_jobs(self, limit=5000):
+        self._call('fetch_labeled_jobs')
+        return [j for j in reversed(self.jobs) if j.get('field')][:limit]
+
+    def get_channel_offsets(self):
+        self._call('get_channel_offsets')
+        return dict(self.offsets)
+
+    def save_channel_offsets(self, offsets):
+        self._call('save_channel_offsets')
+        with self._lock:
+            self.offsets.update({k: int(v) for k, v in offsets.items()})
+
+    def enqueue_alerts(self, rows, chunk_size=500):
+        for i in range(0, len(rows), chunk_size):
+            self._call('enqueue_alerts')
+            with self._lock:
+                for row in rows[i:i + chunk_size]:
+                    key = (row['user_id'], row['job_id'])
+                    if key in self.outbox_keys:
+                        continue
+                    self.outbox_keys.add(key)
+                    row_id = len(self.outbox) + 1
+                    self.outbox[row_id] = dict(row, id=row_id, status='pending', attempts=0)
+
+    def claim_outbox_batch(self, limit=500, lease_seconds=300):
+        self._call('claim_outbox_batch')
+        with self._lock:
+            pending = [r for r in self.outbox.values() if r['status'] == 'pending']
+            users = {r['user_id'] for r in pending[:limit]}
+            rows = [r for r in pending if r['user_id'] in users]
+            for row in rows:
+                row['status'] = 'sending'
+            return [dict(r) for r in rows]
+
+    def complete_outbox_rows(self, ids):
+        self._call('complete_outbox_rows')
+        with self._lock:
+            for row_id in ids:
+                self.outbox[row_id]['status'] = 'sent'
+
+    def release_outbox_rows(self, ids, attempts, error, final=False):
+        self._call('release_outbox_rows')
+        with self._lock:
+            for row_id in ids:
+                self.outbox[row_id].update(status='failed' if final else 'pending', attempts=attempts, last_error=error)
+
+    def heartbeat_worker(self, worker_id):
+        self._call('heartbeat_worker')
+
+    def fetch_live_workers(self, ttl_seconds=120):
+        self._call('fetch_live_workers')
+        return []
+
+
+class FakeServiceServer:
+    """
+    One local HTTP server standing in for both the Hugging Face Inference API
+    (POST /models/<model>) and the Bot API (POST /bot<token>/sendMessage). Each service has its
+    own latency and 429 rate; request counts, statuses and batch sizes are recorded per service,
+    along with the most Bot API requests that were ever open at once.
+    """
+
+    def __init__(
+        self,
+        hf_latency_seconds: float = 0.05,
+        hf_429_rate: float = 0.0,
+        bot_latency_seconds: float = 0.01,
+        bot_429_rate: float = 0.0,
+        seed: int = 11,
+    ):
+        self.hf_latency_seconds = hf_latency_seconds
+        self.hf_429_rate = hf_429_rate
+        self.bot_latency_seconds = bot_latency_seconds
+        self.bot_429_rate = bot_429_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._bot_in_flight = 0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stats = {}
+
+    def _record(self, service: str, key: str, n: int = 1) -> None:
+        with self._lock:
+            bucket = self.stats.setdefault(service, {})
+            bucket[key] = bucket.get(key, 0) + n
+
+    def _throttled(self, rate: float) -> bool:
+        with self._lock:
+            return rate > 0 and self._rng.random() < rate
+
+    def start(self) -> 'FakeServiceServer':
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                if self.path.startswith('/models/'):
+                    status, payload, headers = fake._hf(self.path, body)
+                elif re.match(r'^/bot[^/]+/sendMessage$', self.path):
+                    status, payload, headers = fake._bot(body)
+                else:
+                    status, payload, headers = 404, {'error': 'not found'}, {}
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-services', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _hf(self, path: str, body: bytes):
+        time.sleep(self.hf_latency_seconds)
+        task = 'ner' if 'NER' in path.upper() else 'zero-shot'
+        self._record('hf', f'{task}_requests')
+        if self._throttled(self.hf_429_rate):
+            self._record('hf', '429')
+            return 429, {'error': 'Rate limit reached'}, {'Retry-After': '1'}
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            return 400, {'error': 'bad json'}, {}
+        inputs = payload.get('inputs')
+        if task == 'ner':
+            text = inputs or ''
+            company = next((c for c in COMPANIES if c in text), None)
+            city = next((c for c in CITIES if c in text), None)
+            entities = []
+            if company:
+                entities.append({'entity_group': 'ORG', 'word': company, 'score': 0.99})
+            if city:
+                entities.append({'entity_group': 'LOC', 'word': city, 'score': 0.98})
+            return 200, entities, {}
+        labels = (payload.get('parameters') or {}).get('candidate_labels') or []
+        texts = inputs if isinstance(inputs, list) else [inputs or '']
+        self._record('hf', 'zero-shot_texts', len(texts))
+        results = [_fake_zero_shot(text, labels) for text in texts]
+        return 200, (results if isinstance(inputs, list) else results[0]), {}
+
+    def _bot(self, body: bytes = b''):
+        with self._lock:
+            self._bot_in_flight += 1
+            bucket = self.stats.setdefault('bot', {})
+            bucket['peak_in_flight'] = max(bucket.get('peak_in_flight', 0), self._bot_in_flight)
+        try:
+            time.sleep(self.bot_latency_seconds)
+        finally:
+            with self._lock:
+                self._bot_in_flight -= 1
+        self._record('bot', 'requests')
+        text = parse_qs(body.decode('utf-8')).get('text', [''])[0]
+        if len(text) > 4096:
+            self._record('bot', '400')
+            return 400, {'ok': False, 'error_code': 400, 'description': 'Bad Request: message is too long'}, {}
+        if self._throttled(self.bot_429_rate):
+            self._record('bot', '429')
+            return 429, {'ok': False, 'error_code': 429, 'description': 'Too Many Requests',
+                         'parameters': {'retry_after': 1}}, {}
+        return 200, {'ok': True, 'result': {}}, {}
+
+
+def _fake_zero_shot(text: str, labels: List[str]) -> Dict[str, Any]:
+    # Deterministic stand-in for NLI scores: labels whose keywords appear in the text win
+    lowered = (text or '').lower()
+    raw = []
+    for label in labels:
+        words = DOMAIN_WORDS.get(label, [label.lower()])
+        hits = sum(1 for w in words if w in lowered) + (2 if label.lower() in lowered else 0)
+        if label == "Job Post":
+            hits = 3 if 'hiring' in lowered or 'required' in lowered else 0
+        raw.append(0.1 + hits)
+    total = sum(raw) or 1.0
+    scored = sorted(zip(labels, (r / total for r in raw)), key=lambda kv: kv[1], reverse=True)
+    return {'sequence': text, 'labels': [l for l, _ in scored], 'scores': [s for _, s in scored]}
+
+
+def synthetic_users(count: int, seed: int = 3) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    professions = [label for label in DOMAIN_LABELS if label != "Other"]
+    return [
+        {
+            'user_id': 100000 + i,
+            'location': rng.choice(CITIES),
+            'profession': rng.choice(professions),
+            'experience': rng.choice(["Entry Level", "Mid Level", "Senior Level", "Lead/Manager"]),
+            'preferences': 'any',
+        }
+        for i in range(count)
+    ]
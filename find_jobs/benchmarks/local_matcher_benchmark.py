@@ -0,0 +1,46 @@
+"""
+Throughput of the offline local matcher (AI_MATCH_PROVIDER=local), scoring synthetic posts on
+one core with no network. Run from the find_jobs/ directory:
+
+    python -m benchmarks.local_matcher_benchmark --jobs 20000 --professions "Data Science,Finance"
+"""
+import argparse
+import random
+import time
+
+from benchmarks.fakes import synthetic_post
+from matching.local_matcher import LocalLexicalMatcher
+
+
+def synthetic_jobs(count: int, seed: int = 5):
+    rng = random.Random(seed)
+    jobs = []
+    for message_id in range(count):
+        title, _, description = synthetic_post(rng, message_id).partition('\n')
+        jobs.append({'id': message_id, 'title': title, 'description': description})
+    return jobs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--jobs', type=int, default=20000, help='posts scored per profession')
+    parser.add_argument('--professions', default='Data Science,Finance,Engineering', help='comma-separated')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per profession; the best one is reported')
+    args = parser.parse_args()
+
+    # Seed vocabulary only, as on a fresh install; scoring cost does not depend on training size
+    matcher = LocalLexicalMatcher()
+    matcher.train([])
+    jobs = synthetic_jobs(args.jobs)
+    print(f"{'profession':>20} {'jobs':>7} {'seconds':>8} {'jobs/s':>8}")
+    for profession in [p.strip() for p in args.professions.split(',') if p.strip()]:
+        best = float('inf')
+        for _ in range(max(1, args.repeat)):
+            started = time.perf_counter()
+            matcher.score_jobs({'profession': profession}, jobs)
+            best = min(best, time.perf_counter() - started)
+        print(f"{profession:>20} {len(jobs):>7} {best:>8.3f} {len(jobs) / best:>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
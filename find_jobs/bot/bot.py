@@ -1,6 +1,8 @@
 from telegram import Update, ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import (ApplicationBuilder, CommandHandler, MessageHandler, filters, ConversationHandler, ContextTypes, CallbackQueryHandler)
-from db.db import save_user_profile, get_user_profile
+from db.db import save_user_profile, get_user_profile, fetch_jobs_after
+from search.job_index import get_job_index, INDEXED_COLUMNS
+import asyncio
 import logging
 
 # States for conversation
@@ -13,6 +15,7 @@ class TelegramBotService:
     def __init__(self, config):
         self.config = config
         self.application = None
+        self._index_load = None
 
     def build_application(self):
         logging.basicConfig(level=logging.INFO)
@@ -222,7 +225,50 @@ class TelegramBotService:
             )
             return ConversationHandler.END
 
-        application = ApplicationBuilder().token(self.config['TELEGRAM_BOT_TOKEN']).build()
+        def render_search_page(query_text, page):
+            page_size = int(self.config.get('SEARCH_PAGE_SIZE', 5))
+            results, total = get_job_index().search(query_text, page=page, page_size=page_size)
+            if not total:
+                return f"No jobs found for '{query_text}'. Try different keywords.", None
+            pages = (total + page_size - 1) // page_size
+            text = f"🔎 Results for '{query_text}' (page {page + 1}/{pages}, {total} jobs):\n"
+            for rank, (job, score) in enumerate(results, start=page * page_size + 1):
+                company = f" at {job['company']}" if job['company'] else ''
+                text += f"\n{rank}. {job['title'][:120]}{company}\n{job['url']}\n"
+            buttons = []
+            if page > 0:
+                buttons.append(InlineKeyboardButton("◀️ Prev", callback_data=f"search_{page - 1}"))
+            if page + 1 < pages:
+                buttons.append(InlineKeyboardButton("Next ▶️", callback_data=f"search_{page + 1}"))
+            return text, (InlineKeyboardMarkup([buttons]) if buttons else None)
+
+        async def search(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            user_id = update.effective_user.id
+            query_text = ' '.join(context.args or []).strip()[:100]
+            if not query_text:
+                await update.message.reply_text("Usage: /search <keywords>, e.g. /search python remote")
+                return
+            logger.info(f"/search invoked by user_id={user_id}: '{query_text}'")
+            await asyncio.to_thread(self.refresh_search_index)
+            context.user_data['search_query'] = query_text
+            text, markup = render_search_page(query_text, 0)
+            await update.message.reply_text(text, reply_markup=markup, disable_web_page_preview=True)
+
+        async def search_page_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            query = update.callback_query
+            await query.answer()
+            query_text = context.user_data.get('search_query')
+            if not query_text:
+                await query.edit_message_text("This search has expired. Use /search <keywords> again.")
+                return
+            page = int(query.data.split('_', 1)[1])
+            text, markup = render_search_page(query_text, page)
+            await query.edit_message_text(text, reply_markup=markup, disable_web_page_preview=True)
+
+        async def load_search_index(application):
+            self.load_search_index()
+
+        application = ApplicationBuilder().token(self.config['TELEGRAM_BOT_TOKEN']).post_init(load_search_index).build()
         conv_handler = ConversationHandler(
             entry_points=[CommandHandler('start', start), CommandHandler('update', update_profile)],
             states={
@@ -235,9 +281,29 @@ class TelegramBotService:
             fallbacks=[CommandHandler('cancel', cancel)],
         )
         application.add_handler(conv_handler)
+        application.add_handler(CommandHandler('search', search))
+        application.add_handler(CallbackQueryHandler(search_page_callback, pattern=r'^search_\d+$'))
         self.application = application
         return application
 
+    def refresh_search_index(self):
+        # Only the bot's process keeps a /search index; it pulls in rows any process stored
+        logger = logging.getLogger("telegram_bot")
+        index = get_job_index()
+        if index.is_stale(float(self.config.get('SEARCH_INDEX_REFRESH_SECONDS', 60))):
+            try:
+                added = index.refresh(lambda after_id, limit: fetch_jobs_after(after_id, limit, INDEXED_COLUMNS))
+                if added:
+                    logger.info(f"Search index: added {added} jobs ({len(index)} total)")
+            except Exception as e:
+                logger.warning(f"Search index refresh failed; serving current index: {e}")
+        return index
+
+    def load_search_index(self):
+        # Build the index in the background at startup, so the first /search does not page
+        # through the whole jobs table; a /search before it finishes serves what is loaded so far
+        self._index_load = asyncio.create_task(asyncio.to_thread(self.refresh_search_index))
+
     def run(self):
         if self.application is None:
             self.build_application()
@@ -252,8 +318,39 @@ class TelegramBotService:
         finally:
             print("Bot cleanup completed.") 
 
+    async def start(self):
+        # Polls on the caller's event loop, so the scheduler and Pyrogram can share it
+        if self.application is None:
+            self.build_application()
+        await self.application.initialize()
+        await self.application.start()
+        # post_init only runs under run_polling
+        self.load_search_index()
+        await self.application.updater.start_polling(drop_pending_updates=True, timeout=1)
+        print("Bot started successfully!")
+
+    async def stop(self):
+        if self.application is None:
+            return
+        try:
+            if self.application.updater.running:
+                await self.application.updater.stop()
+            if self.application.running:
+                await self.application.stop()
+            await self.application.shutdown()
+        except Exception as e:
+            print(f"Bot error during shutdown: {e}")
+        finally:
+            print("Bot cleanup completed.")
+
 
 def start_bot(config):
     service = TelegramBotService(config)
     service.build_application()
-    service.run() 
\ No newline at end of file
+    service.run()
+
+
+async def start_bot_async(config):
+    service = TelegramBotService(config)
+    await service.start()
+    return service
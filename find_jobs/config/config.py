@@ -47,10 +47,84 @@ def load_config():
         'AI_MATCH_PROVIDER': os.getenv('AI_MATCH_PROVIDER', 'huggingface_zeroshot'),
         'HF_API_KEY': os.getenv('HF_API_KEY'),
         'AI_MODEL_ID': os.getenv('AI_MODEL_ID', 'facebook/bart-large-mnli'),
+        # Optional offline scorer used when the primary provider gives no answer (e.g. 'local')
+        'AI_MATCH_FALLBACK_PROVIDER': os.getenv('AI_MATCH_FALLBACK_PROVIDER', ''),
+        # Local lexical matcher: persisted model path, retrain interval, and training sample size
+        'LOCAL_MATCHER_PATH': os.getenv('LOCAL_MATCHER_PATH', os.path.join('data', 'local_matcher.json')),
+        'LOCAL_MATCHER_RETRAIN_HOURS': float(os.getenv('LOCAL_MATCHER_RETRAIN_HOURS', 24)),
+        'LOCAL_MATCHER_TRAIN_LIMIT': int(os.getenv('LOCAL_MATCHER_TRAIN_LIMIT', 5000)),
         'AI_MIN_SCORE': float(os.getenv('AI_MIN_SCORE', 0.5)),
         'AI_TOP_K': int(os.getenv('AI_TOP_K', 5)),
+        # Most recent jobs considered for alerts each cycle (loaded once and shared by all users)
+        'JOB_CANDIDATE_WINDOW': int(os.getenv('JOB_CANDIDATE_WINDOW', 200)),
+        # Inference API base URL (override for a dedicated Inference Endpoint or a local stand-in)
+        'HF_INFERENCE_BASE_URL': os.getenv('HF_INFERENCE_BASE_URL', 'https://api-inference.huggingface.co/models'),
+        # Zero-shot requests sharing a label set are batched into one Inference API call
+        'HF_BATCH_MAX_SIZE': int(os.getenv('HF_BATCH_MAX_SIZE', 16)),
+        'HF_BATCH_MAX_WAIT_MS': float(os.getenv('HF_BATCH_MAX_WAIT_MS', 50)),
+        # Shared Inference API client: pooled connections and in-flight request bounds (adaptive
+        # between min and max), retries, and circuit breaker
+        'HF_MAX_CONCURRENCY': int(os.getenv('HF_MAX_CONCURRENCY', 8)),
+        'HF_MIN_CONCURRENCY': int(os.getenv('HF_MIN_CONCURRENCY', 1)),
+        'HF_MAX_RETRIES': int(os.getenv('HF_MAX_RETRIES', 2)),
+        'HF_MAX_RETRY_WAIT_SECONDS': float(os.getenv('HF_MAX_RETRY_WAIT_SECONDS', 30)),
+        'HF_CIRCUIT_FAILURE_THRESHOLD': int(os.getenv('HF_CIRCUIT_FAILURE_THRESHOLD', 5)),
+        'HF_CIRCUIT_RESET_SECONDS': float(os.getenv('HF_CIRCUIT_RESET_SECONDS', 60)),
+        # How long the matcher skips texts the API just failed on, going straight to the fallback
+        'HF_NEGATIVE_CACHE_SECONDS': float(os.getenv('HF_NEGATIVE_CACHE_SECONDS', 60)),
+        # Inference cache shared by matcher/extractor and across processes ('sqlite' or 'memory')
+        'INFERENCE_CACHE_BACKEND': os.getenv('INFERENCE_CACHE_BACKEND', 'sqlite'),
+        'INFERENCE_CACHE_PATH': os.getenv('INFERENCE_CACHE_PATH', os.path.join('data', 'inference_cache.sqlite3')),
+        'INFERENCE_CACHE_TTL_HOURS': float(os.getenv('INFERENCE_CACHE_TTL_HOURS', 168)),
+        'INFERENCE_CACHE_MAX_ENTRIES': int(os.getenv('INFERENCE_CACHE_MAX_ENTRIES', 100000)),
+        'INFERENCE_CACHE_MEMORY_MB': float(os.getenv('INFERENCE_CACHE_MEMORY_MB', 32)),
+        # Cross-posted vacancies: posts with the same title within this many SimHash bits of a stored job are linked to it
+        'NEAR_DUPLICATE_DETECTION': _parse_bool(os.getenv('NEAR_DUPLICATE_DETECTION', 'true'), True),
+        'NEAR_DUPLICATE_MAX_DISTANCE': int(os.getenv('NEAR_DUPLICATE_MAX_DISTANCE', 4)),
+        'NEAR_DUPLICATE_INDEX_SIZE': int(os.getenv('NEAR_DUPLICATE_INDEX_SIZE', 50000)),
         # Telegram channels to scrape (JSON array or comma-separated)
         'TELEGRAM_CHANNELS': _parse_channels_env(os.getenv('TELEGRAM_CHANNELS', '')),
+        # Incremental scraping: messages fetched per history request, and max requests per channel per cycle
+        'SCRAPE_PAGE_SIZE': int(os.getenv('SCRAPE_PAGE_SIZE', 20)),
+        'SCRAPE_MAX_PAGES': int(os.getenv('SCRAPE_MAX_PAGES', 10)),
+        # Channels scraped in parallel, and FloodWait retries per request before a channel is skipped
+        'SCRAPE_CONCURRENCY': int(os.getenv('SCRAPE_CONCURRENCY', 8)),
+        'SCRAPE_FLOOD_WAIT_RETRIES': int(os.getenv('SCRAPE_FLOOD_WAIT_RETRIES', 3)),
+        # Subscribe to new posts in TELEGRAM_CHANNELS and ingest them immediately; polling still fills gaps
+        'LIVE_INGESTION': _parse_bool(os.getenv('LIVE_INGESTION', 'false'), False),
+        # Seconds between pings of the persistent Pyrogram connection (reconnects if it is gone)
+        'PYROGRAM_HEALTHCHECK_SECONDS': float(os.getenv('PYROGRAM_HEALTHCHECK_SECONDS', 60)),
+        # Streaming ingestion: bounded queue size between stages, concurrent enrichment workers,
+        # and how many jobs (or how many seconds of quiet) trigger a store flush
+        'PIPELINE_QUEUE_SIZE': int(os.getenv('PIPELINE_QUEUE_SIZE', 50)),
+        'PIPELINE_ENRICH_WORKERS': int(os.getenv('PIPELINE_ENRICH_WORKERS', 4)),
+        'PIPELINE_STORE_BATCH_SIZE': int(os.getenv('PIPELINE_STORE_BATCH_SIZE', 20)),
+        'PIPELINE_STORE_LINGER_SECONDS': float(os.getenv('PIPELINE_STORE_LINGER_SECONDS', 1.0)),
+        # /search: results per page, and how often the bot pulls newly stored jobs into its index
+        'SEARCH_PAGE_SIZE': int(os.getenv('SEARCH_PAGE_SIZE', 5)),
+        'SEARCH_INDEX_REFRESH_SECONDS': float(os.getenv('SEARCH_INDEX_REFRESH_SECONDS', 60)),
+        # Alert delivery: Bot API send rate overall and per chat, retries for 429/5xx, pooled connections, messages in flight
+        'TELEGRAM_API_BASE_URL': os.getenv('TELEGRAM_API_BASE_URL', 'https://api.telegram.org'),
+        'ALERT_GLOBAL_RATE': float(os.getenv('ALERT_GLOBAL_RATE', 25)),
+        'ALERT_PER_CHAT_RATE': float(os.getenv('ALERT_PER_CHAT_RATE', 1)),
+        'ALERT_MAX_RETRIES': int(os.getenv('ALERT_MAX_RETRIES', 3)),
+        'ALERT_MAX_CONNECTIONS': int(os.getenv('ALERT_MAX_CONNECTIONS', 20)),
+        'ALERT_MAX_IN_FLIGHT': int(os.getenv('ALERT_MAX_IN_FLIGHT', 20)),
+        # Alert outbox delivery: run it inside the scheduler process (disable when running delivery_worker.py)
+        'ENABLE_ALERT_DELIVERY': _parse_bool(os.getenv('ENABLE_ALERT_DELIVERY', 'true'), True),
+        'ALERT_DELIVERY_INTERVAL_SECONDS': float(os.getenv('ALERT_DELIVERY_INTERVAL_SECONDS', 30)),
+        'ALERT_OUTBOX_BATCH_SIZE': int(os.getenv('ALERT_OUTBOX_BATCH_SIZE', 500)),
+        'ALERT_OUTBOX_LEASE_SECONDS': int(os.getenv('ALERT_OUTBOX_LEASE_SECONDS', 300)),
+        'ALERT_OUTBOX_MAX_ATTEMPTS': int(os.getenv('ALERT_OUTBOX_MAX_ATTEMPTS', 5)),
+        # Horizontal scaling: 'single', 'static' (index/count from env) or 'lease' (worker_leases table)
+        'WORKER_SHARD_MODE': os.getenv('WORKER_SHARD_MODE', 'single'),
+        'WORKER_SHARD_COUNT': int(os.getenv('WORKER_SHARD_COUNT', 1)),
+        'WORKER_SHARD_INDEX': int(os.getenv('WORKER_SHARD_INDEX', 0)),
+        'WORKER_ID': os.getenv('WORKER_ID'),
+        'WORKER_LEASE_TTL_SECONDS': int(os.getenv('WORKER_LEASE_TTL_SECONDS', 120)),
+        # Prometheus metrics endpoint (GET /metrics); 0 disables it
+        'METRICS_PORT': int(os.getenv('METRICS_PORT', 0)),
+        'METRICS_HOST': os.getenv('METRICS_HOST', '127.0.0.1'),
         # Control whether main.py starts the scheduler (set to false when running worker.py separately)
         'ENABLE_SCHEDULER': _parse_bool(os.getenv('ENABLE_SCHEDULER', 'true'), True),
     } 
\ No newline at end of file
@@ -0,0 +1 @@
+# Lets tests import the app's top-level packages (matching, search, ...) the way the entrypoints do
@@ -1,12 +1,64 @@
 from supabase import create_client, Client
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+from types import MappingProxyType
+import time
+
+from metrics.metrics import DB_CALLS, DB_SECONDS
 
 supabase: Client = None
 
 
+def _freeze(value):
+    # Nested values too (e.g. domain_scores): a shared snapshot is only read-only if all of it is
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+class JobSnapshot:
+    """
+    Candidate job window loaded once per cycle and shared read-only by every user iteration.
+    Jobs are frozen copies (mappings all the way down), so no iteration can change what the
+    next one sees.
+    """
+
+    def __init__(self, jobs):
+        self.jobs = tuple(_freeze(job) for job in jobs)
+        self.by_id = MappingProxyType({job['id']: job for job in self.jobs})
+
+    @property
+    def job_ids(self):
+        return list(self.by_id)
+
+    def __len__(self):
+        return len(self.jobs)
+
+
+def _timed(method):
+    # Latency and outcome per repository operation; chunked/paged calls count as one operation
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        started = time.perf_counter()
+        outcome = 'ok'
+        try:
+            return method(self, *args, **kwargs)
+        except Exception:
+            outcome = 'error'
+            raise
+        finally:
+            DB_SECONDS.observe(time.perf_counter() - started, op=method.__name__)
+            DB_CALLS.inc(op=method.__name__, outcome=outcome)
+    return wrapper
+
+
 class SupabaseRepository:
     def __init__(self, client: Client):
         self.client = client
 
+    @_timed
     def save_user_profile(self, user_data):
         data = {
             'user_id': user_data['user_id'],
@@ -17,49 +69,193 @@ class SupabaseRepository:
         }
         self.client.table('users').upsert(data).execute()
 
+    @_timed
     def get_user_profile(self, user_id):
         result = self.client.table('users').select('*').eq('user_id', user_id).execute()
         return result.data[0] if result.data else None
 
     def save_job_post(self, job_data):
-        url = job_data.get('url')
-        if url:
-            existing = self.client.table('jobs').select('id').eq('url', url).execute().data
-            if existing:
-                return
-        self.client.table('jobs').upsert(job_data).execute()
-
-    def get_matching_jobs(self, user_profile):
-        profession = user_profile.get('profession', '')
-        query = self.client.table('jobs').select('*')
-        if profession:
-            query = query.ilike('title', f'%{profession}%')
-        return query.execute().data
-
-    def get_new_matching_jobs(self, user_profile):
-        profession = user_profile.get('profession', '')
-        user_id = user_profile.get('user_id')
-        query = self.client.table('jobs').select('*')
-        if profession:
-            query = query.ilike('title', f"%{profession}%")
-        jobs = query.execute().data
-        sent = self.client.table('sent_alerts').select('job_id').eq('user_id', user_id).execute().data
-        sent_job_ids = {row['job_id'] for row in sent}
-        return [job for job in jobs if job['id'] not in sent_job_ids]
+        new_ids = self.save_job_posts([job_data])
+        return new_ids[0] if new_ids else None
+
+    @_timed
+    def save_job_posts(self, jobs, chunk_size=200):
+        # Insert-or-ignore on the unique url: one request per chunk, and PostgREST only
+        # returns the rows it actually inserted, which gives us the ids of new jobs (also set
+        # on the inserted job dicts).
+        rows = []
+        seen_urls = set()
+        for job in jobs:
+            url = job.get('url')
+            if url and url in seen_urls:
+                continue
+            if url:
+                seen_urls.add(url)
+            rows.append(job)
+        new_ids = []
+        for i in range(0, len(rows), chunk_size):
+            chunk = rows[i:i + chunk_size]
+            inserted = self.client.table('jobs').upsert(
+                chunk, on_conflict='url', ignore_duplicates=True
+            ).execute().data
+            new_ids.extend(row['id'] for row in inserted or [])
+            ids_by_url = {row.get('url'): row['id'] for row in inserted or []}
+            for job in chunk:
+                if job.get('url') in ids_by_url:
+                    job['id'] = ids_by_url[job['url']]
+        return new_ids
 
+    @_timed
+    def fetch_jobs_after(self, after_id, limit=1000, columns='*'):
+        return (
+            self.client.table('jobs').select(columns).gt('id', after_id)
+            .order('id').limit(limit).execute().data
+        )
+
+    @_timed
+    def get_existing_job_urls(self, urls, chunk_size=200):
+        existing = set()
+        unique_urls = list(dict.fromkeys(u for u in urls if u))
+        for i in range(0, len(unique_urls), chunk_size):
+            chunk = unique_urls[i:i + chunk_size]
+            rows = self.client.table('jobs').select('url').in_('url', chunk).execute().data
+            existing.update(row['url'] for row in rows)
+        return existing
+
+    @_timed
     def mark_jobs_as_sent(self, user_id, jobs):
         rows = [{'user_id': user_id, 'job_id': job['id']} for job in jobs]
         if rows:
             self.client.table('sent_alerts').upsert(rows).execute()
 
+    @_timed
     def fetch_all_users(self):
         return self.client.table('users').select('*').execute().data
 
-    def fetch_unsent_jobs_for_user(self, user_id):
-        jobs = self.client.table('jobs').select('*').order('id', desc=True).limit(200).execute().data
-        sent = self.client.table('sent_alerts').select('job_id').eq('user_id', user_id).execute().data
-        sent_job_ids = {row['job_id'] for row in sent}
-        return [job for job in jobs if job['id'] not in sent_job_ids]
+    @_timed
+    def fetch_recent_jobs(self, limit=200, columns='*'):
+        # Canonical jobs only: near-duplicates link to the job users are alerted about
+        return (
+            self.client.table('jobs').select(columns).is_('canonical_job_id', 'null')
+            .order('id', desc=True).limit(limit).execute().data
+        )
+
+    def load_job_snapshot(self, window=200):
+        return JobSnapshot(self.fetch_recent_jobs(window))
+
+    @_timed
+    def fetch_sent_job_ids_by_user(self, job_ids, page_size=1000, chunk_size=200):
+        # One paged scan of sent_alerts for the whole cycle, restricted to the candidate jobs
+        return self._job_ids_by_user('sent_alerts', job_ids, page_size, chunk_size)
+
+    @_timed
+    def fetch_queued_job_ids_by_user(self, job_ids, page_size=1000, chunk_size=200):
+        # Pairs already in alert_outbox in any state (pending, sending, failed, sent): matching
+        # them again could only be a no-op insert, so they should not take a top-k slot
+        return self._job_ids_by_user('alert_outbox', job_ids, page_size, chunk_size)
+
+    def _job_ids_by_user(self, table, job_ids, page_size, chunk_size):
+        sent = {}
+        unique_ids = list(dict.fromkeys(job_ids))
+        for i in range(0, len(unique_ids), chunk_size):
+            chunk = unique_ids[i:i + chunk_size]
+            start = 0
+            while True:
+                rows = (
+                    self.client.table(table)
+                    .select('user_id, job_id')
+                    .in_('job_id', chunk)
+                    .order('user_id')
+                    .order('job_id')
+                    .range(start, start + page_size - 1)
+                    .execute()
+                    .data
+                )
+                for row in rows:
+                    sent.setdefault(row['user_id'], set()).add(row['job_id'])
+                if len(rows) < page_size:
+                    break
+                start += page_size
+        return sent
+
+    @_timed
+    def fetch_labeled_jobs(self, limit=5000):
+        query = self.client.table('jobs').select('title, description, field').neq('field', '')
+        return query.order('id', desc=True).limit(limit).execute().data
+
+    @_timed
+    def get_channel_offsets(self):
+        rows = self.client.table('channel_state').select('channel, last_message_id').execute().data
+        return {row['channel']: int(row['last_message_id'] or 0) for row in rows}
+
+    @_timed
+    def save_channel_offsets(self, offsets):
+        rows = [{'channel': channel, 'last_message_id': int(message_id)} for channel, message_id in offsets.items()]
+        if rows:
+            self.client.table('channel_state').upsert(rows, on_conflict='channel').execute()
+
+    @_timed
+    def enqueue_alerts(self, rows, chunk_size=500):
+        # (user_id, job_id) is unique, so re-matching a job that is still queued is a no-op
+        for i in range(0, len(rows), chunk_size):
+            self.client.table('alert_outbox').upsert(
+                rows[i:i + chunk_size], on_conflict='user_id,job_id', ignore_duplicates=True
+            ).execute()
+
+    @_timed
+    def claim_outbox_batch(self, limit=500, lease_seconds=300):
+        now = datetime.now(timezone.utc)
+        # Rows left in 'sending' by a delivery worker that died are handed out again after the lease
+        self.client.table('alert_outbox').update({'status': 'pending'}).eq('status', 'sending').lt(
+            'claimed_at', (now - timedelta(seconds=lease_seconds)).isoformat()
+        ).execute()
+        candidates = (
+            self.client.table('alert_outbox').select('user_id').eq('status', 'pending')
+            .order('id').limit(limit).execute().data
+        )
+        if not candidates:
+            return []
+        # Claim every pending row of the users found, so each user's jobs go out as one message
+        # rather than split across batches. The status filter makes the claim atomic per row:
+        # concurrent workers never get the same row.
+        return (
+            self.client.table('alert_outbox')
+            .update({'status': 'sending', 'claimed_at': now.isoformat()})
+            .in_('user_id', list(dict.fromkeys(row['user_id'] for row in candidates)))
+            .eq('status', 'pending')
+            .execute()
+            .data
+        )
+
+    @_timed
+    def complete_outbox_rows(self, ids):
+        if ids:
+            self.client.table('alert_outbox').update({
+                'status': 'sent',
+                'sent_at': datetime.now(timezone.utc).isoformat(),
+            }).in_('id', ids).execute()
+
+    @_timed
+    def release_outbox_rows(self, ids, attempts, error, final=False):
+        if ids:
+            self.client.table('alert_outbox').update({
+                'status': 'failed' if final else 'pending',
+                'attempts': attempts,
+                'last_error': (error or '')[:500],
+            }).in_('id', ids).execute()
+
+    @_timed
+    def heartbeat_worker(self, worker_id):
+        self.client.table('worker_leases').upsert(
+            {'worker_id': worker_id, 'heartbeat_at': datetime.now(timezone.utc).isoformat()},
+            on_conflict='worker_id',
+        ).execute()
+
+    @_timed
+    def fetch_live_workers(self, ttl_seconds=120):
+        cutoff = (datetime.now(timezone.utc) - timedelta(seconds=ttl_seconds)).isoformat()
+        rows = self.client.table('worker_leases').select('worker_id').gte('heartbeat_at', cutoff).execute().data
+        return [row['worker_id'] for row in rows]
 
 
 _repo: SupabaseRepository = None
@@ -71,57 +267,154 @@ def init_db(config):
     _repo = SupabaseRepository(supabase)
 
 
+def use_repository(repo):
+    # Swap in any object with the SupabaseRepository interface (e.g. the benchmark's in-memory fake)
+    global _repo
+    _repo = repo
+
+
 def save_user_profile(user_data):
-    if supabase is None:
+    if _repo is None:
         raise Exception("Supabase client not initialized. Call init_db(config) first.")
     if _repo is not None:
         return _repo.save_user_profile(user_data)
 
 
 def get_user_profile(user_id):
-    if supabase is None:
+    if _repo is None:
         raise Exception("Supabase client not initialized. Call init_db(config) first.")
     if _repo is not None:
         return _repo.get_user_profile(user_id)
 
 
 def save_job_post(job_data):
-    if supabase is None:
+    if _repo is None:
         raise Exception("Supabase client not initialized. Call init_db(config) first.")
     if _repo is not None:
         return _repo.save_job_post(job_data)
 
 
-def get_matching_jobs(user_profile):
-    if supabase is None:
+def save_job_posts(jobs):
+    if _repo is None:
         raise Exception("Supabase client not initialized. Call init_db(config) first.")
     if _repo is not None:
-        return _repo.get_matching_jobs(user_profile)
+        return _repo.save_job_posts(jobs)
 
 
-def get_new_matching_jobs(user_profile):
-    if supabase is None:
+def get_existing_job_urls(urls):
+    if _repo is None:
         raise Exception("Supabase client not initialized. Call init_db(config) first.")
     if _repo is not None:
-        return _repo.get_new_matching_jobs(user_profile)
+        return _repo.get_existing_job_urls(urls)
 
 
 def mark_jobs_as_sent(user_id, jobs):
-    if supabase is None:
+    if _repo is None:
         raise Exception("Supabase client not initialized. Call init_db(config) first.")
     if _repo is not None:
         return _repo.mark_jobs_as_sent(user_id, jobs)
 
 
 def fetch_all_users():
-    if supabase is None:
+    if _repo is None:
         raise Exception("Supabase client not initialized. Call init_db(config) first.")
     if _repo is not None:
         return _repo.fetch_all_users()
 
 
-def fetch_unsent_jobs_for_user(user_id):
-    if supabase is None:
+def fetch_jobs_after(after_id, limit=1000, columns='*'):
+    if _repo is None:
+        raise Exception("Supabase client not initialized. Call init_db(config) first.")
+    if _repo is not None:
+        return _repo.fetch_jobs_after(after_id, limit, columns)
+
+
+def fetch_recent_jobs(limit=200, columns='*'):
+    if _repo is None:
+        raise Exception("Supabase client not initialized. Call init_db(config) first.")
+    if _repo is not None:
+        return _repo.fetch_recent_jobs(limit, columns)
+
+
+def load_job_snapshot(window=200):
+    if _repo is None:
+        raise Exception("Supabase client not initialized. Call init_db(config) first.")
+    if _repo is not None:
+        return _repo.load_job_snapshot(window)
+
+
+def fetch_sent_job_ids_by_user(job_ids):
+    if _repo is None:
+        raise Exception("Supabase client not initialized. Call init_db(config) first.")
+    if _repo is not None:
+        return _repo.fetch_sent_job_ids_by_user(job_ids)
+
+
+def fetch_queued_job_ids_by_user(job_ids):
+    if _repo is None:
+        raise Exception("Supabase client not initialized. Call init_db(config) first.")
+    if _repo is not None:
+        return _repo.fetch_queued_job_ids_by_user(job_ids)
+
+
+def fetch_labeled_jobs(limit=5000):
+    if _repo is None:
+        raise Exception("Supabase client not initialized. Call init_db(config) first.")
+    if _repo is not None:
+        return _repo.fetch_labeled_jobs(limit)
+
+
+def get_channel_offsets():
+    if _repo is None:
+        raise Exception("Supabase client not initialized. Call init_db(config) first.")
+    if _repo is not None:
+        return _repo.get_channel_offsets()
+
+
+def save_channel_offsets(offsets):
+    if _repo is None:
+        raise Exception("Supabase client not initialized. Call init_db(config) first.")
+    if _repo is not None:
+        return _repo.save_channel_offsets(offsets)
+
+
+def enqueue_alerts(rows):
+    if _repo is None:
+        raise Exception("Supabase client not initialized. Call init_db(config) first.")
+    if _repo is not None:
+        return _repo.enqueue_alerts(rows)
+
+
+def claim_outbox_batch(limit=500, lease_seconds=300):
+    if _repo is None:
+        raise Exception("Supabase client not initialized. Call init_db(config) first.")
+    if _repo is not None:
+        return _repo.claim_outbox_batch(limit, lease_seconds)
+
+
+def complete_outbox_rows(ids):
+    if _repo is None:
+        raise Exception("Supabase client not initialized. Call init_db(config) first.")
+    if _repo is not None:
+        return _repo.complete_outbox_rows(ids)
+
+
+def release_outbox_rows(ids, attempts, error, final=False):
+    if _repo is None:
+        raise Exception("Supabase client not initialized. Call init_db(config) first.")
+    if _repo is not None:
+        return _repo.release_outbox_rows(ids, attempts, error, final)
+
+
+def heartbeat_worker(worker_id):
+    if _repo is None:
+        raise Exception("Supabase client not initialized. Call init_db(config) first.")
+    if _repo is not None:
+        return _repo.heartbeat_worker(worker_id)
+
+
+def fetch_live_workers(ttl_seconds=120):
+    if _repo is None:
         raise Exception("Supabase client not initialized. Call init_db(config) first.")
     if _repo is not None:
-        return _repo.fetch_unsent_jobs_for_user(user_id) 
\ No newline at end of file
+        return _repo.fetch_live_workers(ttl_seconds)
\ No newline at end of file
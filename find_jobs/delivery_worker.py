@@ -0,0 +1,28 @@
+import asyncio
+from config.config import load_config
+from db.db import init_db
+from metrics.metrics import start_metrics_server
+from scheduler.scheduler import start_delivery_scheduler, cleanup_scheduler, wait_for_shutdown
+
+
+async def run(config):
+    metrics_server = await start_metrics_server(config)
+    scheduler = await start_delivery_scheduler(config)
+    try:
+        print('Delivery worker running. Press Ctrl+C to exit.')
+        print(f"Draining the alert outbox every {config['ALERT_DELIVERY_INTERVAL_SECONDS']} seconds.")
+        await wait_for_shutdown()
+        print("Delivery worker shutting down...")
+    finally:
+        await cleanup_scheduler(scheduler)
+        if metrics_server is not None:
+            metrics_server.close()
+
+
+if __name__ == "__main__":
+    config = load_config()
+    init_db(config)
+    try:
+        asyncio.run(run(config))
+    except KeyboardInterrupt:
+        print("Delivery worker shutting down...")
@@ -8,6 +8,7 @@ import time
 PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
 MAIN_PATH = os.path.join(PROJECT_DIR, "main.py")
 WORKER_PATH = os.path.join(PROJECT_DIR, "worker.py")
+DELIVERY_PATH = os.path.join(PROJECT_DIR, "delivery_worker.py")
 
 
 def _send_signal_if_alive(proc: subprocess.Popen, sig: int) -> None:
@@ -42,6 +43,8 @@ def run_all() -> int:
     env_main = os.environ.copy()
     # Avoid duplicate schedulers: let worker own scheduling when running together
     env_main["ENABLE_SCHEDULER"] = "false"
+    # The worker does the pipeline work, so it alone serves METRICS_PORT
+    env_main["METRICS_PORT"] = "0"
 
     print("[entrypoint] Starting main (bot-only)...")
     p_main = subprocess.Popen([sys.executable, MAIN_PATH], env=env_main, cwd=PROJECT_DIR)
@@ -96,10 +99,12 @@ def main() -> int:
         os.execv(sys.executable, [sys.executable, MAIN_PATH])
     elif mode == "worker":
         os.execv(sys.executable, [sys.executable, WORKER_PATH])
+    elif mode == "delivery":
+        os.execv(sys.executable, [sys.executable, DELIVERY_PATH])
     elif mode == "all":
         return run_all()
     else:
-        print(f"[entrypoint] Unknown APP_MODE='{mode}'. Use one of: main, worker, all.")
+        print(f"[entrypoint] Unknown APP_MODE='{mode}'. Use one of: main, worker, delivery, all.")
         return 2
 
 
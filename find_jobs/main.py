@@ -1,40 +1,44 @@
-import os
-import nest_asyncio
-import signal
-import sys
-nest_asyncio.apply()
+import asyncio
 from config.config import load_config
-from bot.bot import start_bot
-from scheduler.scheduler import start_scheduler, job_scrape_and_alert, cleanup_scheduler
+from bot.bot import start_bot_async
+from scheduler.scheduler import start_scheduler, cleanup_scheduler, wait_for_shutdown
 from db.db import init_db
+from metrics.metrics import start_metrics_server
+
+
+async def run(config):
+	# Bot, scheduler and Pyrogram share this one event loop for the life of the process
+	scheduler = None
+	service = None
+	metrics_server = await start_metrics_server(config)
+	try:
+		if config.get('ENABLE_SCHEDULER', True):
+			# First scrape and alert cycle starts right away, alongside the bot
+			scheduler = await start_scheduler(config, run_now=True)
+		else:
+			print("ENABLE_SCHEDULER is false: running bot only (no scheduler in main.py)")
+		print("Starting bot... Press Ctrl+C to exit gracefully.")
+		service = await start_bot_async(config)
+		await wait_for_shutdown()
+		print("\nShutting down gracefully...")
+	finally:
+		print("Cleaning up resources...")
+		if service is not None:
+			await service.stop()
+		if scheduler is not None:
+			await cleanup_scheduler(scheduler)
+		if metrics_server is not None:
+			metrics_server.close()
+		print("Cleanup completed successfully!")
 
 
 if __name__ == "__main__":
 	config = load_config()
 	init_db(config)
-
-	scheduler = None
-	if config.get('ENABLE_SCHEDULER', True):
-		bot, scheduler = start_scheduler(config)
-	else:
-		print("ENABLE_SCHEDULER is false: running bot only (no scheduler in main.py)")
-	
 	try:
-		# One-off run for initial scrape and alert cycle only if scheduler enabled
-		if scheduler is not None:
-			job_scrape_and_alert(config, bot)
-		print("Starting bot... Press Ctrl+C to exit gracefully.")
-		start_bot(config)
+		asyncio.run(run(config))
 	except KeyboardInterrupt:
 		print("\nShutting down gracefully...")
 	except Exception as e:
 		print(f"Error during execution: {e}")
-	finally:    
-		print("Cleaning up resources...")
-		try:
-			if scheduler is not None:
-				cleanup_scheduler(scheduler)
-			print("Cleanup completed successfully!")
-		except Exception as e:
-			print(f"Error during cleanup: {e}")
-		print("Shutdown complete.") 
\ No newline at end of file
+	print("Shutdown complete.")
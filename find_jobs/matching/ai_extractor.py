@@ -1,31 +1,16 @@
 import os
+from concurrent.futures import Future
 from typing import Dict, Any, Optional, List, Tuple
-import requests
-
-
-DEFAULT_FIELD_LABELS: List[str] = [
-    "Web Development",
-    "Data Science",
-    "UI/UX Design",
-    "Mobile Development",
-    "DevOps",
-    "Product Management",
-    "Content Writing",
-    "Marketing",
-    "Finance",
-    "Human Resources",
-    "Sales",
-    "Accounting",
-    "Customer Support",
-    "Operations",
-    "Project Management",
-    "Education",
-    "Healthcare",
-    "Engineering",
-    "Agriculture",
-    "Legal",
-    "Other",
-]
+from matching.ai_matcher import DOMAIN_LABELS
+from matching.hf_batching import get_zeroshot_batcher, hf_model_url
+from matching.hf_client import InferenceUnavailable, get_hf_client
+from matching.inference_cache import get_inference_cache, zero_shot_task, NER_TASK
+from metrics.metrics import INFERENCE_DEGRADED
+
+
+# The matcher's domain labels: the full field distribution is stored with the job as its
+# domain_scores, so the matcher does not classify the post against the same labels again
+DEFAULT_FIELD_LABELS: List[str] = DOMAIN_LABELS
 
 EXPERIENCE_LABELS: List[str] = [
     "Entry Level",
@@ -34,82 +19,43 @@ EXPERIENCE_LABELS: List[str] = [
     "Lead/Manager",
 ]
 
-# Simple in-memory caches to limit repeated API calls per identical input
-_ZSHOT_CACHE: Dict[Tuple[str, Tuple[str, ...], str, bool], List[Tuple[str, float]]] = {}
-_NER_CACHE: Dict[Tuple[str, str], Dict[str, Any]] = {}
-_MAX_CACHE_SIZE = 512
-
-
-def _cache_set(cache: Dict, key, value):
-    try:
-        if len(cache) >= _MAX_CACHE_SIZE:
-            # Drop one arbitrary item (simple cap)
-            cache.pop(next(iter(cache)))
-        cache[key] = value
-    except Exception:
-        pass
-
-
 class _HFZeroShot:
-    def __init__(self, api_key: str, model_id: str):
+    def __init__(self, api_key: str, model_id: str, config: Optional[Dict[str, Any]] = None):
         self.api_key = api_key
         self.model_id = model_id or os.getenv('AI_MODEL_ID', 'facebook/bart-large-mnli')
-        self.endpoint = f"https://api-inference.huggingface.co/models/{self.model_id}"
-        self.headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
+        self.batcher = get_zeroshot_batcher(self.api_key, self.model_id, config)
+        self.cache = get_inference_cache(config)
 
     def classify(self, text: str, labels: List[str], multi_label: bool = False) -> List[Tuple[str, float]]:
         if not text or not labels:
             return []
-        # Cache lookup
-        key = (text, tuple(labels), self.model_id, multi_label)
-        if key in _ZSHOT_CACHE:
-            return _ZSHOT_CACHE[key]
-        payload = {
-            "inputs": text,
-            "parameters": {
-                "candidate_labels": labels,
-                "hypothesis_template": "This text is about {}.",
-                "multi_label": multi_label,
-            },
-            "options": {"wait_for_model": True},
-        }
-        try:
-            resp = requests.post(self.endpoint, headers=self.headers, json=payload, timeout=30)
-            # If rate-limited or server error, return empty gracefully
-            if resp.status_code >= 400:
+        # Cache lookup (shared with the matcher, which stores the same label -> score mapping)
+        task = zero_shot_task(multi_label)
+        scores = self.cache.get(self.model_id, task, labels, text)
+        if scores is None:
+            # Raises InferenceUnavailable if rate-limited, failing or the circuit is open
+            scores = self.batcher.classify(text, labels, multi_label)
+            if not scores:
                 return []
-            data = resp.json()
-            if isinstance(data, list) and data:
-                data = data[0]
-            labels_out = data.get('labels') or []
-            scores_out = data.get('scores') or []
-            result = list(zip(labels_out, scores_out))
-            _cache_set(_ZSHOT_CACHE, key, result)
-            return result
-        except Exception:
-            return []
+            self.cache.set(self.model_id, task, labels, text, scores)
+        return list(scores.items())
 
 
 class _HFNERAPI:
-    def __init__(self, api_key: str, model_id: Optional[str] = None):
+    def __init__(self, api_key: str, model_id: Optional[str] = None, config: Optional[Dict[str, Any]] = None):
         self.api_key = api_key
         self.model_id = model_id or os.getenv('AI_NER_MODEL_ID', 'dslim/bert-base-NER')
-        self.endpoint = f"https://api-inference.huggingface.co/models/{self.model_id}"
-        self.headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
+        self.endpoint = hf_model_url(self.model_id, config)
+        self.client = get_hf_client(self.api_key, config)
+        self.cache = get_inference_cache(config)
 
     def extract(self, text: str) -> Dict[str, Any]:
         if not text:
             return {}
         # Cache lookup
-        key = (text, self.model_id)
-        if key in _NER_CACHE:
-            return _NER_CACHE[key]
+        cached = self.cache.get(self.model_id, NER_TASK, (), text)
+        if cached is not None:
+            return cached
         payload = {
             "inputs": text,
             "parameters": {
@@ -117,11 +63,9 @@ class _HFNERAPI:
             },
             "options": {"wait_for_model": True},
         }
+        # InferenceUnavailable propagates so the caller can tell "no entities" from "no answer"
+        data = self.client.post(self.endpoint, payload, task='ner')
         try:
-            resp = requests.post(self.endpoint, headers=self.headers, json=payload, timeout=30)
-            if resp.status_code >= 400:
-                return {}
-            data = resp.json()
             if isinstance(data, list) and len(data) == 1 and isinstance(data[0], list):
                 entities = data[0]
             elif isinstance(data, list):
@@ -146,7 +90,7 @@ class _HFNERAPI:
                 out['company'] = company
             if location:
                 out['location'] = location
-            _cache_set(_NER_CACHE, key, out)
+            self.cache.set(self.model_id, NER_TASK, (), text, out)
             return out
         except Exception:
             return {}
@@ -167,48 +111,63 @@ def _normalize_experience(raw: Optional[str]) -> Optional[str]:
     return None
 
 
+def _call_result(call: Future, degraded: List[str]) -> Any:
+    # Best effort: failures give None, and unavailable inference is noted in `degraded`
+    try:
+        return call.result()
+    except InferenceUnavailable as e:
+        degraded.append(e.reason)
+    except Exception:
+        pass
+    return None
+
+
 def extract_fields(text: str, config: Dict[str, Any]) -> Dict[str, Any]:
     """
     AI-based extraction of company, location, field, and experience from free text.
     Uses HF zero-shot (API) for field/experience and HF Inference API NER for company/location.
     Returns only fields it can infer with reasonable confidence; otherwise omits them.
+    'field_scores' holds the full field label distribution whenever it was computed.
+    If the Inference API was unavailable, 'degraded' lists the reasons, so a missing field can
+    be told apart from one the models found nothing for.
     """
     results: Dict[str, Any] = {}
     if not text or len(text.strip()) < 15:
         return results
 
+    degraded: List[str] = []
     api_key = (config.get('HF_API_KEY') or '').strip()
     model_id = (config.get('AI_MODEL_ID') or '').strip() or 'facebook/bart-large-mnli'
 
-    # Field and experience via zero-shot
-    try:
-        if api_key:
-            zshot = _HFZeroShot(api_key=api_key, model_id=model_id)
-            field_scores = zshot.classify(text, DEFAULT_FIELD_LABELS, multi_label=True)
-            if field_scores:
-                field_scores.sort(key=lambda x: x[1], reverse=True)
-                top_field, top_field_score = field_scores[0]
-                if top_field_score >= 0.5 and top_field != "Other":
-                    results['field'] = top_field
-            exp_scores = zshot.classify(text, EXPERIENCE_LABELS, multi_label=False)
-            if exp_scores:
-                exp_scores.sort(key=lambda x: x[1], reverse=True)
-                top_exp, top_exp_score = exp_scores[0]
-                if top_exp_score >= 0.4:
-                    results['experience'] = top_exp
-    except Exception:
-        pass
-
-    # Company and location via HF NER API (best effort)
-    try:
-        if api_key:
-            ner = _HFNERAPI(api_key=api_key)
-            ner_out = ner.extract(text)
-            for k in ('company', 'location'):
-                if k in ner_out:
-                    results[k] = ner_out[k]
-    except Exception:
-        pass
+    if api_key:
+        # Field, experience and entities are independent requests, so all three are in flight at once
+        zshot = _HFZeroShot(api_key=api_key, model_id=model_id, config=config)
+        ner = _HFNERAPI(api_key=api_key, config=config)
+        client = get_hf_client(api_key, config)
+        field_call = client.submit(zshot.classify, text, DEFAULT_FIELD_LABELS, multi_label=True)
+        exp_call = client.submit(zshot.classify, text, EXPERIENCE_LABELS, multi_label=False)
+        ner_call = client.submit(ner.extract, text)
+
+        # Field and experience via zero-shot
+        field_scores = _call_result(field_call, degraded) or []
+        if field_scores:
+            results['field_scores'] = dict(field_scores)
+            field_scores.sort(key=lambda x: x[1], reverse=True)
+            top_field, top_field_score = field_scores[0]
+            if top_field_score >= 0.5 and top_field != "Other":
+                results['field'] = top_field
+        exp_scores = _call_result(exp_call, degraded) or []
+        if exp_scores:
+            exp_scores.sort(key=lambda x: x[1], reverse=True)
+            top_exp, top_exp_score = exp_scores[0]
+            if top_exp_score >= 0.4:
+                results['experience'] = top_exp
+
+        # Company and location via HF NER API (best effort)
+        ner_out = _call_result(ner_call, degraded) or {}
+        for k in ('company', 'location'):
+            if k in ner_out:
+                results[k] = ner_out[k]
 
     # Heuristic normalization fallback for experience
     if 'experience' not in results:
@@ -216,4 +175,8 @@ def extract_fields(text: str, config: Dict[str, Any]) -> Dict[str, Any]:
         if normalized:
             results['experience'] = normalized
 
+    for reason in degraded:
+        INFERENCE_DEGRADED.inc(component='extractor', reason=reason)
+    if degraded:
+        results['degraded'] = degraded
     return results 
\ No newline at end of file
@@ -1,6 +1,12 @@
 import os
-import requests
-from typing import Dict, List, Tuple, Any
+import threading
+import time
+from collections.abc import Mapping
+from typing import Dict, List, Optional, Tuple, Any
+from matching.hf_batching import get_zeroshot_batcher
+from matching.hf_client import InferenceUnavailable
+from matching.inference_cache import get_inference_cache, make_cache_key, zero_shot_task
+from metrics.metrics import INFERENCE_DEGRADED
 
 DEFAULT_HF_MODEL_ID = os.getenv('AI_MODEL_ID', 'facebook/bart-large-mnli')
 
@@ -29,29 +35,38 @@ DOMAIN_LABELS: List[str] = [
     "Other",
 ]
 
-# Simple in-memory cache for classification results
-_ZSHOT_CACHE: Dict[Tuple[str, Tuple[str, ...], str, bool], Dict[str, float]] = {}
-_MAX_CACHE_SIZE = 512
+JOB_POST_LABELS: List[str] = ["Job Post", "Not a Job Post"]
+JOB_POST_THRESHOLD = 0.6
 
-
-def _cache_set(cache: Dict, key, value):
-    try:
-        if len(cache) >= _MAX_CACHE_SIZE:
-            cache.pop(next(iter(cache)))
-        cache[key] = value
-    except Exception:
-        pass
-    
 class BaseAIMatcher:
+    # Jobs left out of the last score_jobs call because inference was unavailable: job id -> reason
+    degraded: Dict[Any, str]
+
+    def __init__(self):
+        self.degraded = {}
+
+    def annotate_jobs(self, jobs: List[Dict[str, Any]]) -> None:
+        """Attach job-only classification results to new jobs before they are stored."""
+        return None
+
+    def cohort_key(self, user_profile: Dict[str, Any]) -> str:
+        """Users with the same key get identical scores, so they can share one scoring pass."""
+        return normalize_profession(user_profile.get('profession') or '')
+
     def score_job(self, user_profile: Dict[str, Any], job: Dict[str, Any]) -> float:
         raise NotImplementedError
 
     def score_jobs(self, user_profile: Dict[str, Any], jobs: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], float]]:
         scored: List[Tuple[Dict[str, Any], float]] = []
+        self.degraded = {}
         for job in jobs:
             try:
                 score = self.score_job(user_profile, job)
                 scored.append((job, score))
+            except InferenceUnavailable as e:
+                # Not a 0.0: the job is left unscored so a later cycle can still match it
+                self.degraded[job.get('id')] = e.reason
+                INFERENCE_DEGRADED.inc(component='matcher', reason=e.reason)
             except Exception:
                 # Skip jobs that fail to score
                 continue
@@ -60,6 +75,26 @@ class BaseAIMatcher:
         return scored
 
 
+def normalize_profession(profession: str) -> str:
+    prof = (profession or '').strip()
+    if not prof:
+        return ''
+    # Direct match if present
+    if prof in DOMAIN_LABELS:
+        return prof
+    # Simple aliases
+    alias_map = {
+        "Software Engineering": "Engineering",
+        "Software Engineer": "Engineering",
+        "Backend Development": "Web Development",
+        "Frontend Development": "Web Development",
+        "Mobile": "Mobile Development",
+        "Product": "Product Management",
+        "HR": "Human Resources",
+    }
+    return alias_map.get(prof, prof)
+
+
 def _build_profile_text(user_profile: Dict[str, Any]) -> str:
     location = user_profile.get('location') or {}
     loc_str = ''
@@ -89,76 +124,152 @@ def _build_job_text(job: Dict[str, Any]) -> str:
 
 
 class HuggingFaceZeroShotMatcher(BaseAIMatcher):
-    def __init__(self, api_key: str, model_id: str = DEFAULT_HF_MODEL_ID, timeout_seconds: int = 30):
+    def __init__(
+        self,
+        api_key: str,
+        model_id: str = DEFAULT_HF_MODEL_ID,
+        timeout_seconds: int = 30,
+        config: Dict[str, Any] = None,
+        fallback: BaseAIMatcher = None,
+    ):
+        super().__init__()
         self.api_key = api_key
         self.model_id = model_id
         self.timeout_seconds = timeout_seconds
-        self.endpoint = f"https://api-inference.huggingface.co/models/{self.model_id}"
-        self.headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
+        # Used when the Inference API gives no answer (rate limit, outage) instead of scoring 0.0
+        self.fallback = fallback
+        self.batcher = get_zeroshot_batcher(api_key, model_id, config)
+        self.cache = get_inference_cache(config)
+        # Texts the API just failed on (or answered with nothing): key -> (expires_at, reason).
+        # Asking again within the TTL would only delay the fallback by another failed call.
+        self.negative_ttl_seconds = float((config or {}).get('HF_NEGATIVE_CACHE_SECONDS', 60))
+        self._failures: Dict[str, Tuple[float, str]] = {}
+        self._failures_lock = threading.Lock()
+
+    def _recent_failure(self, task: str, labels: List[str], text: str) -> Optional[str]:
+        key = make_cache_key(self.model_id, task, labels, text)
+        with self._failures_lock:
+            entry = self._failures.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() >= entry[0]:
+                del self._failures[key]
+                return None
+            return entry[1]
+
+    def _remember_failure(self, task: str, labels: List[str], text: str, reason: str) -> None:
+        if self.negative_ttl_seconds <= 0:
+            return
+        now = time.monotonic()
+        with self._failures_lock:
+            if len(self._failures) >= 10000:
+                self._failures = {k: v for k, v in self._failures.items() if v[0] > now}
+            self._failures[make_cache_key(self.model_id, task, labels, text)] = (now + self.negative_ttl_seconds, reason)
 
     def _classify(self, text: str, labels: List[str], multi_label: bool) -> Dict[str, float]:
         # Cache lookup
-        cache_key = (text, tuple(labels), self.model_id, multi_label)
-        if cache_key in _ZSHOT_CACHE:
-            return _ZSHOT_CACHE[cache_key]
-        payload = {
-            "inputs": text,
-            "parameters": {
-                "candidate_labels": labels,
-                "hypothesis_template": "This text is about {}.",
-                "multi_label": multi_label,
-            },
-            "options": {"wait_for_model": True},
-        }
+        task = zero_shot_task(multi_label)
+        cached = self.cache.get(self.model_id, task, labels, text)
+        if cached is not None:
+            return cached
+        reason = self._recent_failure(task, labels, text)
+        if reason is not None:
+            raise InferenceUnavailable(reason)
         try:
-            resp = requests.post(self.endpoint, headers=self.headers, json=payload, timeout=self.timeout_seconds)
-            if resp.status_code >= 400:
-                return {}
-            data = resp.json()
-            if isinstance(data, list) and data:
-                data = data[0]
-            labels_out = data.get('labels') or []
-            scores_out = data.get('scores') or []
-            result = {lbl: float(scr) for lbl, scr in zip(labels_out, scores_out)}
-            _cache_set(_ZSHOT_CACHE, cache_key, result)
-            return result
-        except Exception:
-            return {}
+            result = self.batcher.classify(text, labels, multi_label)
+        except InferenceUnavailable as e:
+            self._remember_failure(task, labels, text, e.reason)
+            raise
+        if result:
+            self.cache.set(self.model_id, task, labels, text, result)
+        else:
+            self._remember_failure(task, labels, text, 'bad_response')
+        return result
 
-    def _is_job_post(self, job_text: str) -> bool:
-        try:
-            scores = self._classify(job_text, ["Job Post", "Not a Job Post"], multi_label=False)
-            return scores.get("Job Post", 0.0) >= 0.6
-        except Exception:
-            # If the classifier fails, do not block; consider it a job
-            return True
+    def _classify_many(self, texts: List[str], labels: List[str], multi_label: bool) -> Dict[str, str]:
+        # Warm the cache for every uncached text with batched requests; returns the texts the
+        # API could not classify, with the reason
+        task = zero_shot_task(multi_label)
+        missing = list(dict.fromkeys(
+            t for t in texts if self.cache.get(self.model_id, task, labels, t) is None
+        ))
+        failed: Dict[str, str] = {}
+        for text in missing:
+            reason = self._recent_failure(task, labels, text)
+            if reason is not None:
+                failed[text] = reason
+        missing = [t for t in missing if t not in failed]
+        if not missing:
+            return failed
+        for text, result in zip(missing, self.batcher.classify_many(missing, labels, multi_label)):
+            if isinstance(result, InferenceUnavailable):
+                failed[text] = result.reason
+                self._remember_failure(task, labels, text, result.reason)
+            elif result:
+                self.cache.set(self.model_id, task, labels, text, result)
+            else:
+                self._remember_failure(task, labels, text, 'bad_response')
+        return failed
+
+    def _cached(self, text: str, labels: List[str], multi_label: bool) -> Dict[str, float]:
+        return self.cache.get(self.model_id, zero_shot_task(multi_label), labels, text) or {}
+
+    def _job_post_probability(self, job: Dict[str, Any], job_text: str):
+        # Prefer the probability stored at ingest; None means the classifier gave no answer
+        stored = job.get('job_post_score')
+        if stored is not None:
+            return float(stored)
+        scores = self._classify(job_text, JOB_POST_LABELS, multi_label=False)
+        return scores.get("Job Post", 0.0) if scores else None
+
+    def _domain_scores(self, job: Dict[str, Any], job_text: str) -> Dict[str, float]:
+        stored = job.get('domain_scores')
+        if isinstance(stored, Mapping) and stored:
+            return stored
+        return self._classify(job_text, DOMAIN_LABELS, multi_label=True)
 
     def _normalize_profession(self, profession: str) -> str:
-        prof = (profession or '').strip()
-        if not prof:
-            return ''
-        # Direct match if present
-        if prof in DOMAIN_LABELS:
-            return prof
-        # Simple aliases
-        alias_map = {
-            "Software Engineering": "Engineering",
-            "Software Engineer": "Engineering",
-            "Backend Development": "Web Development",
-            "Frontend Development": "Web Development",
-            "Mobile": "Mobile Development",
-            "Product": "Product Management",
-            "HR": "Human Resources",
-        }
-        return alias_map.get(prof, prof)
+        return normalize_profession(profession)
+
+    def annotate_jobs(self, jobs: List[Dict[str, Any]]) -> None:
+        # Both results depend only on the job, so compute them once here and store them
+        # with the row; score_job then never has to call the API for this job again.
+        # Jobs the API could not classify keep None scores and are classified at match time.
+        # Domain scores the extractor already computed at enrichment are kept as they are.
+        texts = [_build_job_text(job) for job in jobs]
+        failed = self._classify_many(texts, JOB_POST_LABELS, multi_label=False)
+        post_scores = [self._cached(text, JOB_POST_LABELS, False) for text in texts]
+        failed.update(self._classify_many(
+            [
+                t for job, t, p in zip(jobs, texts, post_scores)
+                if p.get("Job Post", 0.0) >= JOB_POST_THRESHOLD and not job.get('domain_scores')
+            ],
+            DOMAIN_LABELS,
+            multi_label=True,
+        ))
+        for job, text, post in zip(jobs, texts, post_scores):
+            job['job_post_score'] = post.get("Job Post") if post else None
+            job['domain_scores'] = job.get('domain_scores') or self._cached(text, DOMAIN_LABELS, True) or None
+        for reason in failed.values():
+            INFERENCE_DEGRADED.inc(component='annotator', reason=reason)
+        if failed:
+            print(f"Inference unavailable for {len(failed)} of {len(jobs)} new jobs ({', '.join(sorted(set(failed.values())))})")
 
     def score_job(self, user_profile: Dict[str, Any], job: Dict[str, Any]) -> float:
+        try:
+            return self._score_job(user_profile, job)
+        except InferenceUnavailable:
+            if self.fallback is None:
+                raise
+            return self.fallback.score_job(user_profile, job)
+
+    def _score_job(self, user_profile: Dict[str, Any], job: Dict[str, Any]) -> float:
         job_text = _build_job_text(job)
+        job_post_probability = self._job_post_probability(job, job_text)
+        if job_post_probability is None and self.fallback is not None:
+            return self.fallback.score_job(user_profile, job)
         # Prefilter: drop obvious non-job posts (e.g., 'Test')
-        if not self._is_job_post(job_text):
+        if (job_post_probability or 0.0) < JOB_POST_THRESHOLD:
             return 0.0
 
         # If extractor provided a field and it matches the user's profession, trust it
@@ -167,24 +278,60 @@ class HuggingFaceZeroShotMatcher(BaseAIMatcher):
         if job_field and user_profession and job_field.lower() == user_profession.lower():
             return 0.95
 
-        # Otherwise, classify against a broad domain list and take the user's profession score
-        labels = DOMAIN_LABELS
-        scores = self._classify(job_text, labels, multi_label=True)
+        # Otherwise, use the job's scores over a broad domain list and take the user's profession score
+        scores = self._domain_scores(job, job_text)
+        if not scores and self.fallback is not None:
+            return self.fallback.score_job(user_profile, job)
         if user_profession and user_profession in scores:
             return float(scores[user_profession])
         if job_field and job_field in scores:
             return float(scores[job_field])
         return float(scores.get('Other', 0.0))
 
+    def score_jobs(self, user_profile: Dict[str, Any], jobs: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], float]]:
+        # Jobs stored before ingest-time classification existed are classified here, in
+        # batched requests that are all in flight at once; score_job then hits the cache
+        try:
+            legacy = [
+                job for job in jobs
+                if job.get('job_post_score') is None
+                or (float(job['job_post_score']) >= JOB_POST_THRESHOLD and not job.get('domain_scores'))
+            ]
+            texts = [_build_job_text(job) for job in legacy]
+            self._classify_many(texts, JOB_POST_LABELS, multi_label=False)
+            user_profession = self._normalize_profession(user_profile.get('profession') or '').lower()
+            domain_texts = []
+            for job, text in zip(legacy, texts):
+                job_field = (job.get('field') or '').strip().lower()
+                if job_field and user_profession and job_field == user_profession:
+                    continue
+                if self._cached(text, JOB_POST_LABELS, False).get("Job Post", 0.0) >= JOB_POST_THRESHOLD:
+                    domain_texts.append(text)
+            self._classify_many(domain_texts, DOMAIN_LABELS, multi_label=True)
+        except Exception:
+            # Whatever is still uncached is retried per job, and reported there if it fails
+            pass
+        return super().score_jobs(user_profile, jobs)
+
 
 def get_ai_matcher(config: Dict[str, Any]) -> BaseAIMatcher:
     provider = (config.get('AI_MATCH_PROVIDER') or 'huggingface_zeroshot').lower()
+    fallback_provider = (config.get('AI_MATCH_FALLBACK_PROVIDER') or '').lower()
+    if provider == 'local':
+        from matching.local_matcher import load_local_matcher
+        return load_local_matcher(config)
     if provider == 'huggingface_zeroshot':
         api_key = config.get('HF_API_KEY')
         if not api_key:
             raise ValueError("HF_API_KEY is required for Hugging Face zero-shot matcher")
         model_id = config.get('AI_MODEL_ID') or DEFAULT_HF_MODEL_ID
-        return HuggingFaceZeroShotMatcher(api_key=api_key, model_id=model_id)
+        fallback = None
+        if fallback_provider == 'local':
+            from matching.local_matcher import load_local_matcher
+            fallback = load_local_matcher(config)
+        elif fallback_provider:
+            raise ValueError(f"Unsupported AI_MATCH_FALLBACK_PROVIDER: {fallback_provider}")
+        return HuggingFaceZeroShotMatcher(api_key=api_key, model_id=model_id, config=config, fallback=fallback)
     raise ValueError(f"Unsupported AI_MATCH_PROVIDER: {provider}")
 
 
@@ -0,0 +1,156 @@
+import threading
+from typing import Dict, List, Optional, Tuple, Union, Any
+
+from matching.hf_client import HFInferenceClient, InferenceUnavailable, get_hf_client
+
+HF_INFERENCE_BASE_URL = "https://api-inference.huggingface.co/models"
+HYPOTHESIS_TEMPLATE = "This text is about {}."
+
+
+def hf_model_url(model_id: str, config: Dict[str, Any] = None) -> str:
+    # HF_INFERENCE_BASE_URL points at a dedicated endpoint or a local stand-in instead of the public API
+    base = ((config or {}).get('HF_INFERENCE_BASE_URL') or HF_INFERENCE_BASE_URL).rstrip('/')
+    return f"{base}/{model_id}"
+
+
+class _PendingText:
+    def __init__(self, text: str):
+        self.text = text
+        self.result: Dict[str, float] = {}
+        self.error: Optional[InferenceUnavailable] = None
+        self.done = threading.Event()
+
+
+class _OpenBatch:
+    def __init__(self):
+        self.requests: List[_PendingText] = []
+        self.full = threading.Event()
+
+
+class ZeroShotBatcher:
+    """
+    Groups concurrent zero-shot requests that share a label set into one Inference API call.
+    The first caller of a batch waits up to max_wait_seconds for others to join; the caller
+    that fills the batch sends it straight away. Each caller gets back its own label scores,
+    or InferenceUnavailable if the batch got no answer.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model_id: str,
+        max_batch_size: int = 16,
+        max_wait_seconds: float = 0.05,
+        timeout_seconds: int = 30,
+        endpoint: str = None,
+        client: HFInferenceClient = None,
+    ):
+        self.model_id = model_id
+        self.endpoint = endpoint or hf_model_url(model_id)
+        self.client = client or HFInferenceClient(api_key, timeout_seconds=timeout_seconds)
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_seconds = max(0.0, float(max_wait_seconds))
+        self._lock = threading.Lock()
+        self._open: Dict[Tuple[Tuple[str, ...], bool], _OpenBatch] = {}
+
+    def classify(self, text: str, labels: List[str], multi_label: bool) -> Dict[str, float]:
+        # Don't hold a batch open for a call that is bound to be refused
+        self.client.check_available()
+        key = (tuple(labels), multi_label)
+        pending = _PendingText(text)
+        with self._lock:
+            batch = self._open.get(key)
+            leader = batch is None
+            if leader:
+                batch = _OpenBatch()
+                self._open[key] = batch
+            batch.requests.append(pending)
+            send_now = len(batch.requests) >= self.max_batch_size
+            if send_now:
+                self._open.pop(key, None)
+                batch.full.set()
+        if send_now:
+            self._send(batch.requests, labels, multi_label)
+        elif leader:
+            batch.full.wait(self.max_wait_seconds)
+            with self._lock:
+                owns_batch = self._open.get(key) is batch
+                if owns_batch:
+                    self._open.pop(key, None)
+            if owns_batch:
+                self._send(batch.requests, labels, multi_label)
+        # No deadline of our own: the sender is bounded by the client's retry and Retry-After
+        # budget and always marks its texts done, so every caller gets the batch's own outcome
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def classify_many(
+        self, texts: List[str], labels: List[str], multi_label: bool
+    ) -> List[Union[Dict[str, float], InferenceUnavailable]]:
+        # Callers that already hold many texts skip the wait and send full batches directly,
+        # all in flight at once on the client's pool. Texts whose batch failed come back as the
+        # InferenceUnavailable that failed them.
+        pending = [_PendingText(t) for t in texts]
+        batches = [pending[i:i + self.max_batch_size] for i in range(0, len(pending), self.max_batch_size)]
+        if len(batches) == 1:
+            self._send(batches[0], labels, multi_label)
+        else:
+            for future in [self.client.submit(self._send, b, labels, multi_label) for b in batches]:
+                future.result()
+        return [p.error if p.error is not None else p.result for p in pending]
+
+    def _send(self, batch: List[_PendingText], labels: List[str], multi_label: bool) -> None:
+        try:
+            inputs: Any = [p.text for p in batch] if len(batch) > 1 else batch[0].text
+            payload = {
+                "inputs": inputs,
+                "parameters": {
+                    "candidate_labels": labels,
+                    "hypothesis_template": HYPOTHESIS_TEMPLATE,
+                    "multi_label": multi_label,
+                },
+                "options": {"wait_for_model": True},
+            }
+            data = self.client.post(self.endpoint, payload, task='zero-shot')
+            if isinstance(data, dict):
+                data = [data]
+            if not isinstance(data, list) or len(data) != len(batch):
+                raise InferenceUnavailable('bad_response')
+            for p, item in zip(batch, data):
+                labels_out = item.get('labels') or []
+                scores_out = item.get('scores') or []
+                p.result = {lbl: float(scr) for lbl, scr in zip(labels_out, scores_out)}
+        except InferenceUnavailable as e:
+            for p in batch:
+                p.error = e
+        except Exception:
+            for p in batch:
+                p.error = InferenceUnavailable('bad_response')
+        finally:
+            for p in batch:
+                p.done.set()
+
+
+_BATCHERS: Dict[Tuple[str, str], ZeroShotBatcher] = {}
+_BATCHERS_LOCK = threading.Lock()
+
+
+def get_zeroshot_batcher(api_key: str, model_id: str, config: Dict[str, Any] = None) -> ZeroShotBatcher:
+    """Process-wide batcher per model, so the matcher and extractor share batches."""
+    config = config or {}
+    endpoint = hf_model_url(model_id, config)
+    with _BATCHERS_LOCK:
+        batcher = _BATCHERS.get((api_key, endpoint))
+        if batcher is None:
+            batcher = ZeroShotBatcher(
+                api_key=api_key,
+                model_id=model_id,
+                max_batch_size=int(config.get('HF_BATCH_MAX_SIZE', 16)),
+                max_wait_seconds=float(config.get('HF_BATCH_MAX_WAIT_MS', 50)) / 1000.0,
+                endpoint=endpoint,
+                client=get_hf_client(api_key, config),
+            )
+            _BATCHERS[(api_key, endpoint)] = batcher
+        return batcher
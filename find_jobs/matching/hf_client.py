@@ -0,0 +1,300 @@
+import email.utils
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics.metrics import (
+    INFERENCE_CIRCUIT_OPEN, INFERENCE_CONCURRENCY_LIMIT, INFERENCE_REQUESTS, INFERENCE_SECONDS,
+)
+
+
+class InferenceUnavailable(Exception):
+    """
+    The Inference API gave no usable answer. `reason` is one of rate_limited, circuit_open,
+    server_error, network_error, timeout or bad_response, so callers can report degraded
+    results instead of treating them as a genuine 0.0 score.
+    """
+
+    def __init__(self, reason: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(f"{reason}" + (f" (HTTP {status_code})" if status_code else ''))
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    # Retry-After is either delta-seconds or an HTTP date
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD limit on in-flight requests: each success adds 1/limit (about +1 per window of
+    successes), each overload response multiplies the limit by `decrease`. The limit settles
+    just below the point where the API starts pushing back.
+    """
+
+    def __init__(self, initial: float = 4, minimum: float = 1, maximum: float = 16, decrease: float = 0.5):
+        self.minimum = max(1.0, float(minimum))
+        self.maximum = max(self.minimum, float(maximum))
+        self.decrease = decrease
+        self.limit = min(self.maximum, max(self.minimum, float(initial)))
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.in_flight < int(self.limit), timeout):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, overloaded: bool = False, succeeded: bool = True) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            if overloaded:
+                self.limit = max(self.minimum, self.limit * self.decrease)
+            elif succeeded:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+        INFERENCE_CONCURRENCY_LIMIT.set(self.limit)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and fails fast for `reset_seconds`;
+    then lets a single probe through (half-open) and closes again if it succeeds.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 60):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def is_open(self) -> bool:
+        # Read-only check that does not use up the half-open probe
+        with self._lock:
+            return self.state == self.OPEN and time.monotonic() - self.opened_at < self.reset_seconds
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def release_probe(self) -> None:
+        # The probe ended without telling us anything about the API's health; let another try
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+        INFERENCE_CIRCUIT_OPEN.set(0)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    print(f"Inference API: circuit open for {self.reset_seconds:.0f}s after {self.failures} failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probe_in_flight = False
+        if self.state == self.OPEN:
+            INFERENCE_CIRCUIT_OPEN.set(1)
+
+
+class HFInferenceClient:
+    """
+    Shared client for every Inference API call (zero-shot batches and NER). Requests reuse
+    keep-alive connections from one pooled session, and `submit` runs calls on a worker pool so
+    callers can have up to max_concurrency requests in flight. Concurrency adapts to 429/503
+    responses, Retry-After pauses all callers rather than just the one that got it, and a
+    circuit breaker stops calls during an outage. Failures raise InferenceUnavailable instead
+    of returning empty results.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        max_concurrency: int = 8,
+        min_concurrency: int = 1,
+        max_retries: int = 2,
+        max_retry_wait_seconds: float = 30,
+        failure_threshold: int = 5,
+        reset_seconds: float = 60,
+        timeout_seconds: float = 30,
+    ):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        })
+        # One pooled connection per possible in-flight request, kept alive between calls
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.max_concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='hf-inference')
+        self.limiter = AdaptiveConcurrencyLimiter(
+            initial=max(min_concurrency, max_concurrency / 2), minimum=min_concurrency, maximum=max_concurrency
+        )
+        self.breaker = CircuitBreaker(failure_threshold, reset_seconds)
+        self.max_retries = max(0, int(max_retries))
+        self.max_retry_wait_seconds = max_retry_wait_seconds
+        self.timeout_seconds = timeout_seconds
+        self._blocked_until = 0.0
+        self._blocked_lock = threading.Lock()
+
+    def check_available(self) -> None:
+        """Raise straight away if calls would be refused, so callers can skip queueing work."""
+        if self.breaker.is_open():
+            raise InferenceUnavailable('circuit_open')
+
+    def _wait_for_retry_after(self) -> None:
+        with self._blocked_lock:
+            wait = self._blocked_until - time.monotonic()
+        if wait <= 0:
+            return
+        if wait > self.max_retry_wait_seconds:
+            raise InferenceUnavailable('rate_limited', 429, retry_after=wait)
+        time.sleep(wait)
+
+    def _block_for(self, seconds: float) -> None:
+        with self._blocked_lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def post(self, url: str, payload: Dict[str, Any], task: str) -> Any:
+        attempt = 0
+        while True:
+            attempt += 1
+            if not self.breaker.allow():
+                raise InferenceUnavailable('circuit_open')
+            # Every exit below reports to the breaker or hands the half-open probe back;
+            # otherwise a probe that never reports would keep the circuit refusing calls
+            reported = False
+            try:
+                data, error, delay, overloaded = self._attempt(url, payload, task, attempt)
+                if error is None:
+                    self.breaker.record_success()
+                    reported = True
+                    return data
+                if error.reason == 'bad_response' and 400 <= (error.status_code or 0) < 500:
+                    # The API answered (bad input, auth): says nothing bad about its health
+                    self.breaker.record_success()
+                    reported = True
+                    raise error
+                if delay is None or attempt > self.max_retries or delay > self.max_retry_wait_seconds:
+                    self.breaker.record_failure()
+                    reported = True
+                    raise error
+            finally:
+                if not reported:
+                    self.breaker.release_probe()
+            if not overloaded:
+                time.sleep(delay)
+
+    def _attempt(self, url: str, payload: Dict[str, Any], task: str, attempt: int):
+        """
+        One request. Returns (data, error, retry_delay, overloaded); retry_delay is None when
+        retrying cannot help.
+        """
+        self._wait_for_retry_after()
+        if not self.limiter.acquire(timeout=self.timeout_seconds):
+            raise InferenceUnavailable('timeout')
+        overloaded = False
+        succeeded = False
+        try:
+            try:
+                with INFERENCE_SECONDS.time(task=task):
+                    resp = self.session.post(url, json=payload, timeout=self.timeout_seconds)
+            except requests.RequestException as e:
+                INFERENCE_REQUESTS.inc(task=task, outcome='error')
+                reason = 'timeout' if isinstance(e, requests.Timeout) else 'network_error'
+                return None, InferenceUnavailable(reason), min(self.max_retry_wait_seconds, 2 ** attempt), False
+            INFERENCE_REQUESTS.inc(task=task, outcome=str(resp.status_code))
+            if resp.status_code < 400:
+                try:
+                    data = resp.json()
+                except ValueError:
+                    data = None
+                if data is None:
+                    return None, InferenceUnavailable('bad_response', resp.status_code), None, False
+                succeeded = True
+                return data, None, None, False
+            if resp.status_code in (429, 503):
+                overloaded = True
+                retry_after = parse_retry_after(resp.headers.get('Retry-After'))
+                delay = retry_after if retry_after is not None else min(self.max_retry_wait_seconds, 2 ** attempt)
+                self._block_for(delay)
+                reason = 'rate_limited' if resp.status_code == 429 else 'server_error'
+                return None, InferenceUnavailable(reason, resp.status_code, retry_after=delay), delay, True
+            if resp.status_code >= 500:
+                delay = min(self.max_retry_wait_seconds, 2 ** attempt)
+                return None, InferenceUnavailable('server_error', resp.status_code), delay, False
+            # Other 4xx (bad input, auth) will not get better on retry
+            return None, InferenceUnavailable('bad_response', resp.status_code), None, False
+        finally:
+            self.limiter.release(overloaded=overloaded, succeeded=succeeded)
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        Run an inference call (usually one that ends in `post`) on the client's worker pool.
+        Do not call this from inside a submitted function: a full pool would wait on itself.
+        """
+        return self._executor.submit(fn, *args, **kwargs)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+        self.session.close()
+
+
+_CLIENTS: Dict[str, HFInferenceClient] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_hf_client(api_key: str, config: Optional[Dict[str, Any]] = None) -> HFInferenceClient:
+    """One client per API key: the rate limit and the outage state belong to the account."""
+    config = config or {}
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(api_key)
+        if client is None:
+            client = HFInferenceClient(
+                api_key=api_key,
+                max_concurrency=int(config.get('HF_MAX_CONCURRENCY', 8)),
+                min_concurrency=int(config.get('HF_MIN_CONCURRENCY', 1)),
+                max_retries=int(config.get('HF_MAX_RETRIES', 2)),
+                max_retry_wait_seconds=float(config.get('HF_MAX_RETRY_WAIT_SECONDS', 30)),
+                failure_threshold=int(config.get('HF_CIRCUIT_FAILURE_THRESHOLD', 5)),
+                reset_seconds=float(config.get('HF_CIRCUIT_RESET_SECONDS', 60)),
+            )
+            _CLIENTS[api_key] = client
+        return client
@@ -0,0 +1,266 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from metrics.metrics import CACHE_EVENTS
+
+DEFAULT_CACHE_PATH = os.path.join('data', 'inference_cache.sqlite3')
+NER_TASK = 'token-classification'
+
+
+def zero_shot_task(multi_label: bool) -> str:
+    return 'zero-shot-classification:multi' if multi_label else 'zero-shot-classification'
+
+
+def normalize_text(text: str) -> str:
+    return ' '.join((text or '').split())
+
+
+def make_cache_key(model: str, task: str, labels: Sequence[str], text: str) -> str:
+    # Keys are fixed-size digests, so cached entries never pin the (often long) post text
+    raw = json.dumps([model, task, list(labels or ()), normalize_text(text)], ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class BaseInferenceCache:
+    """Cache for inference results, keyed by model, task, candidate labels and input text."""
+
+    backend = 'base'
+
+    def __init__(self):
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[name] += n
+        CACHE_EVENTS.inc(n, backend=self.backend, event=name)
+
+    def stats(self, reset: bool = False) -> Dict[str, Any]:
+        with self._stats_lock:
+            out = dict(self._stats)
+            if reset:
+                for k in self._stats:
+                    self._stats[k] = 0
+        return out
+
+    def get(self, model: str, task: str, labels: Sequence[str], text: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, model: str, task: str, labels: Sequence[str], text: str, value: Any) -> None:
+        raise NotImplementedError
+
+
+class MemoryInferenceCache(BaseInferenceCache):
+    """In-process LRU bounded by the approximate serialized size of its entries."""
+
+    backend = 'memory'
+    ENTRY_OVERHEAD_BYTES = 200
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, ttl_seconds: float = 0):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, model, task, labels, text):
+        key = make_cache_key(model, task, labels, text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds and time.time() - entry[0] > self.ttl_seconds:
+                self._bytes -= entry[2]
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._count('misses')
+                return None
+            self._entries.move_to_end(key)
+        self._count('hits')
+        return entry[1]
+
+    def set(self, model, task, labels, text, value):
+        key = make_cache_key(model, task, labels, text)
+        try:
+            size = len(key) + len(json.dumps(value)) + self.ENTRY_OVERHEAD_BYTES
+        except Exception:
+            return
+        evicted = 0
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[key] = (time.time(), value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, _, old_size) = self._entries.popitem(last=False)
+                self._bytes -= old_size
+                evicted += 1
+        if evicted:
+            self._count('evictions', evicted)
+
+    def stats(self, reset: bool = False) -> Dict[str, Any]:
+        out = super().stats(reset)
+        with self._lock:
+            out['entries'] = len(self._entries)
+            out['bytes'] = self._bytes
+        return out
+
+
+class SQLiteInferenceCache(BaseInferenceCache):
+    """
+    Disk-backed cache shared by every process pointing at the same file (main.py and worker.py).
+    WAL mode lets readers run alongside a writer. Entries expire after ttl_seconds, and once
+    the table grows past max_entries the oldest rows are pruned.
+    """
+
+    backend = 'sqlite'
+    PRUNE_EVERY = 200
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl_seconds: float = 7 * 24 * 3600, max_entries: int = 100000):
+        super().__init__()
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS inference_cache ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT NOT NULL,"
+            " task TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS inference_cache_created_at ON inference_cache (created_at)")
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; sqlite3 connections must not be shared across threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, model, task, labels, text):
+        key = make_cache_key(model, task, labels, text)
+        try:
+            row = self._conn().execute(
+                "SELECT value, created_at FROM inference_cache WHERE key = ?", (key,)
+            ).fetchone()
+        except Exception:
+            row = None
+        if row is None or (self.ttl_seconds and time.time() - row[1] > self.ttl_seconds):
+            self._count('misses')
+            return None
+        try:
+            value = json.loads(row[0])
+        except Exception:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return value
+
+    def set(self, model, task, labels, text, value):
+        key = make_cache_key(model, task, labels, text)
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO inference_cache (key, model, task, value, created_at) VALUES (?, ?, ?, ?, ?)",
+                (key, model, task, json.dumps(value), time.time()),
+            )
+            conn.commit()
+        except Exception:
+            return
+        with self._writes_lock:
+            self._writes += 1
+            prune = self._writes % self.PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+
+    def prune(self) -> None:
+        try:
+            conn = self._conn()
+            if self.ttl_seconds:
+                conn.execute("DELETE FROM inference_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            count = conn.execute("SELECT COUNT(*) FROM inference_cache").fetchone()[0]
+            excess = count - self.max_entries
+            if excess > 0:
+                self._count('evictions', excess)
+                conn.execute(
+                    "DELETE FROM inference_cache WHERE key IN "
+                    "(SELECT key FROM inference_cache ORDER BY created_at ASC LIMIT ?)",
+                    (excess,),
+                )
+            conn.commit()
+        except Exception as e:
+            print(f"Inference cache: prune failed: {e}")
+
+
+class TieredInferenceCache(BaseInferenceCache):
+    """Memory LRU in front of a shared persistent cache; disk hits are promoted to memory."""
+
+    def __init__(self, memory: BaseInferenceCache, disk: BaseInferenceCache):
+        super().__init__()
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, model, task, labels, text):
+        value = self.memory.get(model, task, labels, text)
+        if value is None:
+            value = self.disk.get(model, task, labels, text)
+            if value is not None:
+                self.memory.set(model, task, labels, text, value)
+        return value
+
+    def set(self, model, task, labels, text, value):
+        self.memory.set(model, task, labels, text, value)
+        self.disk.set(model, task, labels, text, value)
+
+    def stats(self, reset: bool = False) -> Dict[str, Any]:
+        return {'memory': self.memory.stats(reset), 'disk': self.disk.stats(reset)}
+
+
+_cache: Optional[BaseInferenceCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_inference_cache(config: Optional[Dict[str, Any]] = None) -> BaseInferenceCache:
+    """Process-wide inference cache shared by the matcher and the extractor."""
+    global _cache
+    with _cache_lock:
+        if _cache is not None:
+            return _cache
+        config = config or {}
+        backend = (config.get('INFERENCE_CACHE_BACKEND') or 'sqlite').lower()
+        ttl_seconds = float(config.get('INFERENCE_CACHE_TTL_HOURS', 168)) * 3600
+        memory = MemoryInferenceCache(
+            max_bytes=int(float(config.get('INFERENCE_CACHE_MEMORY_MB', 32)) * 1024 * 1024),
+            ttl_seconds=ttl_seconds,
+        )
+        _cache = memory
+        if backend == 'sqlite':
+            try:
+                disk = SQLiteInferenceCache(
+                    path=config.get('INFERENCE_CACHE_PATH') or DEFAULT_CACHE_PATH,
+                    ttl_seconds=ttl_seconds,
+                    max_entries=int(config.get('INFERENCE_CACHE_MAX_ENTRIES', 100000)),
+                )
+                _cache = TieredInferenceCache(memory, disk)
+            except Exception as e:
+                print(f"Inference cache: SQLite unavailable, using memory cache: {e}")
+        return _cache
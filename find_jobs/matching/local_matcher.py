@@ -0,0 +1,227 @@
+import json
+import math
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Tuple, Any, Optional
+
+from matching.ai_matcher import BaseAIMatcher, DOMAIN_LABELS, normalize_profession
+
+DEFAULT_MODEL_PATH = os.path.join('data', 'local_matcher.json')
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is",
+    "it", "of", "on", "or", "our", "the", "to", "we", "will", "with", "you", "your", "job",
+    "jobs", "apply", "vacancy", "position", "company", "location", "description", "experience",
+    "field", "title", "years", "year", "required", "requirements", "please", "via", "http", "https",
+}
+
+# Cold-start vocabulary so the model is usable before any labeled jobs are stored
+SEED_KEYWORDS: Dict[str, List[str]] = {
+    "Web Development": ["web", "frontend", "backend", "fullstack", "javascript", "react", "php", "django", "laravel", "html", "css", "node"],
+    "Data Science": ["data", "scientist", "analyst", "analytics", "machine", "learning", "ml", "ai", "python", "sql", "statistics"],
+    "UI/UX Design": ["ui", "ux", "designer", "figma", "design", "graphic", "prototype"],
+    "Mobile Development": ["mobile", "android", "ios", "flutter", "kotlin", "swift", "app"],
+    "DevOps": ["devops", "cloud", "aws", "docker", "kubernetes", "linux", "sre", "infrastructure"],
+    "Product Management": ["product", "manager", "roadmap", "owner"],
+    "Content Writing": ["content", "writer", "writing", "copywriter", "editor", "journalist"],
+    "Marketing": ["marketing", "digital", "seo", "social", "media", "brand", "campaign"],
+    "Finance": ["finance", "financial", "banking", "bank", "investment", "credit", "loan"],
+    "Human Resources": ["hr", "human", "resources", "recruiter", "recruitment", "talent", "payroll"],
+    "Sales": ["sales", "salesperson", "business", "development", "client", "customer", "representative"],
+    "Accounting": ["accountant", "accounting", "audit", "auditor", "tax", "bookkeeping", "cashier"],
+    "Customer Support": ["support", "customer", "service", "call", "center", "helpdesk", "receptionist"],
+    "Operations": ["operations", "logistics", "supply", "chain", "procurement", "warehouse", "store"],
+    "Project Management": ["project", "coordinator", "pmp", "officer", "planning"],
+    "Education": ["teacher", "instructor", "lecturer", "tutor", "school", "education", "trainer"],
+    "Healthcare": ["nurse", "doctor", "health", "medical", "pharmacist", "clinic", "hospital"],
+    "Engineering": ["engineer", "engineering", "civil", "electrical", "mechanical", "software"],
+    "Agriculture": ["agriculture", "agronomist", "farm", "livestock", "veterinary", "crop"],
+    "Legal": ["legal", "lawyer", "attorney", "law", "compliance", "contract"],
+    "Other": [],
+}
+_SEED_WEIGHT = 5
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall((text or '').lower()) if len(t) > 1 and t not in _STOPWORDS]
+
+
+def _job_tokens(job: Dict[str, Any]) -> List[str]:
+    # Title words are the strongest signal in short channel posts, so count them twice
+    title = job.get('title') or ''
+    return tokenize(title) * 2 + tokenize(job.get('description') or '')
+
+
+class LocalLexicalMatcher(BaseAIMatcher):
+    """
+    Offline multinomial Naive Bayes over DOMAIN_LABELS. Word counts come from stored jobs whose
+    `field` is one of the labels, on top of a small seed vocabulary. No network I/O.
+    """
+
+    def __init__(self, labels: Optional[List[str]] = None, smoothing: float = 1.0, sharpness: float = 2.0):
+        super().__init__()
+        self.labels = list(labels or DOMAIN_LABELS)
+        self.smoothing = smoothing
+        self.sharpness = sharpness
+        self.token_counts: Dict[str, Dict[str, int]] = {lbl: {} for lbl in self.labels}
+        self.label_docs: Dict[str, int] = {lbl: 0 for lbl in self.labels}
+        self._prepared = False
+
+    def _add(self, label: str, tokens: List[str], weight: int = 1) -> None:
+        counts = self.token_counts[label]
+        for tok in tokens:
+            counts[tok] = counts.get(tok, 0) + weight
+        self._prepared = False
+
+    def train(self, jobs: List[Dict[str, Any]]) -> int:
+        for label in self.labels:
+            self._add(label, tokenize(label) + SEED_KEYWORDS.get(label, []), weight=_SEED_WEIGHT)
+        trained = 0
+        for job in jobs:
+            label = (job.get('field') or '').strip()
+            if label not in self.token_counts:
+                continue
+            self._add(label, _job_tokens(job))
+            self.label_docs[label] += 1
+            trained += 1
+        return trained
+
+    def _prepare(self) -> None:
+        vocab = set()
+        for counts in self.token_counts.values():
+            vocab.update(counts)
+        vocab_size = max(1, len(vocab))
+        total_docs = sum(self.label_docs.values())
+        self._log_prior = {}
+        self._log_likelihood = {}
+        self._log_unseen = {}
+        for label in self.labels:
+            counts = self.token_counts[label]
+            denom = sum(counts.values()) + self.smoothing * vocab_size
+            self._log_prior[label] = math.log((self.label_docs[label] + 1.0) / (total_docs + len(self.labels)))
+            self._log_likelihood[label] = {tok: math.log((c + self.smoothing) / denom) for tok, c in counts.items()}
+            self._log_unseen[label] = math.log(self.smoothing / denom)
+        self._prepared = True
+
+    def classify(self, text: str) -> Dict[str, float]:
+        return self._classify_tokens(tokenize(text))
+
+    def _classify_tokens(self, tokens: List[str]) -> Dict[str, float]:
+        if not self._prepared:
+            self._prepare()
+        if not tokens:
+            return {}
+        # Dividing by sqrt(len) keeps long posts from collapsing to a one-hot distribution;
+        # sharpness scales it back so clear matches still clear AI_MIN_SCORE
+        raw: Dict[str, float] = {}
+        for label in self.labels:
+            table = self._log_likelihood[label]
+            unseen = self._log_unseen[label]
+            total = sum(table.get(tok, unseen) for tok in tokens)
+            raw[label] = self._log_prior[label] + self.sharpness * total / math.sqrt(len(tokens))
+        top = max(raw.values())
+        exp = {lbl: math.exp(v - top) for lbl, v in raw.items()}
+        norm = sum(exp.values())
+        return {lbl: v / norm for lbl, v in exp.items()}
+
+    def score_job(self, user_profile: Dict[str, Any], job: Dict[str, Any]) -> float:
+        tokens = _job_tokens(job)
+        # Prefilter: drop obvious non-job posts (e.g., 'Test')
+        if len(tokens) < 3:
+            return 0.0
+        job_field = (job.get('field') or '').strip()
+        user_profession = normalize_profession(user_profile.get('profession') or '')
+        if job_field and user_profession and job_field.lower() == user_profession.lower():
+            return 0.95
+        scores = self._classify_tokens(tokens)
+        if user_profession and user_profession in scores:
+            return float(scores[user_profession])
+        if job_field and job_field in scores:
+            return float(scores[job_field])
+        return float(scores.get('Other', 0.0))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'labels': self.labels,
+            'smoothing': self.smoothing,
+            'sharpness': self.sharpness,
+            'token_counts': self.token_counts,
+            'label_docs': self.label_docs,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LocalLexicalMatcher":
+        matcher = cls(
+            labels=data.get('labels'),
+            smoothing=float(data.get('smoothing', 1.0)),
+            sharpness=float(data.get('sharpness', 2.0)),
+        )
+        for label, counts in (data.get('token_counts') or {}).items():
+            if label in matcher.token_counts:
+                matcher.token_counts[label] = {tok: int(c) for tok, c in counts.items()}
+        for label, n in (data.get('label_docs') or {}).items():
+            if label in matcher.label_docs:
+                matcher.label_docs[label] = int(n)
+        return matcher
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "LocalLexicalMatcher":
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+_loaded: Dict[str, Tuple[float, LocalLexicalMatcher]] = {}
+_load_lock = threading.Lock()
+
+
+def train_local_matcher(config: Dict[str, Any]) -> LocalLexicalMatcher:
+    from db.db import fetch_labeled_jobs
+    matcher = LocalLexicalMatcher()
+    try:
+        jobs = fetch_labeled_jobs(int(config.get('LOCAL_MATCHER_TRAIN_LIMIT', 5000))) or []
+    except Exception as e:
+        print(f"Local matcher: failed to load labeled jobs, using seed vocabulary only: {e}")
+        jobs = []
+    trained = matcher.train(jobs)
+    print(f"Local matcher: trained on {trained} labeled jobs")
+    return matcher
+
+
+def load_local_matcher(config: Dict[str, Any]) -> LocalLexicalMatcher:
+    """Load the persisted model, retraining from stored jobs when it is missing or stale."""
+    path = config.get('LOCAL_MATCHER_PATH') or DEFAULT_MODEL_PATH
+    max_age_seconds = float(config.get('LOCAL_MATCHER_RETRAIN_HOURS', 24)) * 3600
+    with _load_lock:
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            mtime = None
+        if mtime is not None and time.time() - mtime < max_age_seconds:
+            cached = _loaded.get(path)
+            if cached and cached[0] == mtime:
+                return cached[1]
+            try:
+                matcher = LocalLexicalMatcher.load(path)
+                _loaded[path] = (mtime, matcher)
+                return matcher
+            except Exception as e:
+                print(f"Local matcher: failed to read {path}, retraining: {e}")
+        matcher = train_local_matcher(config)
+        try:
+            matcher.save(path)
+            _loaded[path] = (os.path.getmtime(path), matcher)
+        except Exception as e:
+            print(f"Local matcher: failed to save {path}: {e}")
+        return matcher
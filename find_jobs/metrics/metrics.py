@@ -0,0 +1,259 @@
+import asyncio
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from a cache lookup up to a slow scrape or full cycle
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0,
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{_escape(extra[1])}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, '')) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: non-cumulative bucket counts (last slot is +Inf), sum, count
+        self._series: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._series.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), counts):
+                cumulative += n
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        # Idempotent so modules can declare the metrics they use at import time
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+# Pipeline metrics shared across modules; each is recorded where the work happens
+SCRAPE_SECONDS = REGISTRY.histogram(
+    'find_jobs_scrape_channel_seconds', 'Time spent fetching new posts from one channel.', ['channel'])
+SCRAPE_MESSAGES = REGISTRY.counter(
+    'find_jobs_scrape_messages_total', 'Messages fetched per channel.', ['channel'])
+SCRAPE_ERRORS = REGISTRY.counter(
+    'find_jobs_scrape_errors_total', 'Channel scrapes that failed.', ['channel'])
+NEAR_DUPLICATES = REGISTRY.counter(
+    'find_jobs_near_duplicates_total', 'New posts linked to an existing job instead of enriched and matched.', ['channel'])
+ENRICH_SECONDS = REGISTRY.histogram(
+    'find_jobs_enrichment_seconds', 'Time to parse, enrich and classify one post.')
+ENRICH_CALLS = REGISTRY.counter(
+    'find_jobs_enrichment_total', 'Posts parsed and enriched, by outcome.', ['outcome'])
+INFERENCE_SECONDS = REGISTRY.histogram(
+    'find_jobs_inference_request_seconds', 'Latency of Hugging Face Inference API requests.', ['task'])
+INFERENCE_REQUESTS = REGISTRY.counter(
+    'find_jobs_inference_requests_total', 'Hugging Face Inference API requests, by outcome.', ['task', 'outcome'])
+INFERENCE_CONCURRENCY_LIMIT = REGISTRY.gauge(
+    'find_jobs_inference_concurrency_limit', 'Current adaptive limit on in-flight Inference API requests.')
+INFERENCE_CIRCUIT_OPEN = REGISTRY.gauge(
+    'find_jobs_inference_circuit_open', 'Whether the Inference API circuit breaker is open.')
+INFERENCE_DEGRADED = REGISTRY.counter(
+    'find_jobs_inference_degraded_total', 'Results left unscored because the Inference API was unavailable.',
+    ['component', 'reason'])
+CACHE_EVENTS = REGISTRY.counter(
+    'find_jobs_inference_cache_total', 'Inference cache lookups and evictions.', ['backend', 'event'])
+DB_SECONDS = REGISTRY.histogram(
+    'find_jobs_db_call_seconds', 'Latency of Supabase repository calls.', ['op'])
+DB_CALLS = REGISTRY.counter(
+    'find_jobs_db_calls_total', 'Supabase repository calls, by outcome.', ['op', 'outcome'])
+SCORING_SECONDS = REGISTRY.histogram(
+    'find_jobs_scoring_seconds', 'Time to score one cohort\'s candidate jobs.')
+JOBS_SCORED = REGISTRY.counter(
+    'find_jobs_jobs_scored_total', 'Job scores computed for cohorts.')
+ALERTS_QUEUED = REGISTRY.counter(
+    'find_jobs_alerts_queued_total', 'Job alerts written to the outbox.')
+ALERTS = REGISTRY.counter(
+    'find_jobs_alerts_total', 'Alert messages by delivery outcome (sent, retry, failed).', ['outcome'])
+CYCLE_SECONDS = REGISTRY.histogram(
+    'find_jobs_cycle_seconds', 'Duration of a scrape and match cycle.')
+CYCLE_OVERLAPS = REGISTRY.counter(
+    'find_jobs_cycle_overlaps_total', 'Scheduled runs skipped because the previous run was still going.', ['job'])
+CYCLE_IN_PROGRESS = REGISTRY.gauge(
+    'find_jobs_cycle_in_progress', 'Whether a scrape and match cycle is running.')
+CYCLE_LAST_SUCCESS = REGISTRY.gauge(
+    'find_jobs_cycle_last_success_timestamp_seconds', 'Unix time the last cycle finished without error.')
+
+
+async def _handle_scrape(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+        # Drain headers; the response does not depend on them
+        while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b'\r\n', b'\n', b''):
+            pass
+        parts = request_line.decode('latin-1').split()
+        if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] == '/metrics':
+            status, body = '200 OK', REGISTRY.render().encode('utf-8')
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        else:
+            status, body, content_type = '404 Not Found', b'Not found\n', 'text/plain'
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('latin-1') + body
+        )
+        await writer.drain()
+    except Exception:
+        pass
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(config) -> Optional[asyncio.AbstractServer]:
+    """Serve GET /metrics in Prometheus text format on the running event loop, if METRICS_PORT is set."""
+    port = int(config.get('METRICS_PORT', 0) or 0)
+    if not port:
+        return None
+    host = config.get('METRICS_HOST') or '127.0.0.1'
+    try:
+        server = await asyncio.start_server(_handle_scrape, host, port)
+    except OSError as e:
+        print(f"Metrics endpoint unavailable on {host}:{port}: {e}")
+        return None
+    print(f"Metrics: serving http://{host}:{port}/metrics")
+    return server
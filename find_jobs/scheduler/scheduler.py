@@ -1,28 +1,25 @@
-from apscheduler.schedulers.background import BackgroundScheduler
-from scraper.scraper import scrape_jobs, cleanup_pyrogram_client
-from db.db import save_job_post, fetch_all_users, mark_jobs_as_sent, fetch_unsent_jobs_for_user
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES
+from scraper.scraper import (
+    cleanup_pyrogram_client, check_pyrogram_client, enrich_job, message_text, parse_job_from_message, _telegram_scraper,
+)
+from scraper.pipeline import run_ingestion_pipeline
+from db.db import (
+    save_job_posts, fetch_all_users, load_job_snapshot, fetch_sent_job_ids_by_user, fetch_queued_job_ids_by_user,
+)
+from alerts.outbox import enqueue_job_alerts, AlertDeliveryWorker
+from scheduler.sharding import ShardCoordinator
+from search.near_duplicates import get_near_duplicate_index, job_fingerprint, refresh_near_duplicate_index
+from metrics.metrics import (
+    CYCLE_IN_PROGRESS, CYCLE_LAST_SUCCESS, CYCLE_OVERLAPS, CYCLE_SECONDS, JOBS_SCORED, NEAR_DUPLICATES, SCORING_SECONDS,
+)
 import logging
-from telegram import Bot
-import requests
 import asyncio
+import signal
+import time
+from datetime import datetime
 from typing import List, Dict, Any, Tuple
 
-# Send job alert to user
-def send_job_alert(bot, user_id, jobs, config=None):
-    if not jobs:
-        return
-    text = 'New job matches for you:\n'
-    for job in jobs:
-        text += f"\n{job.get('title', 'Job')} at {job.get('company', '')}\n{job.get('url', '')}\n"
-    if config is not None:
-        token = config['TELEGRAM_BOT_TOKEN']
-        url = f"https://api.telegram.org/bot{token}/sendMessage"
-        payload = {"chat_id": user_id, "text": text}
-        try:
-            requests.post(url, data=payload)
-        except Exception as e:
-            print(f"Failed to send Telegram alert: {e}")
-
 
 def _format_jobs_for_log(scored: List[Tuple[Dict[str, Any], float]]):
     return [
@@ -32,69 +29,301 @@ def _format_jobs_for_log(scored: List[Tuple[Dict[str, Any], float]]):
 
 
 class JobScheduler:
-    def __init__(self):
-        pass
+    def __init__(self, scraper=None):
+        self.coordinator = None
+        self.live = None
+        self.scraper = scraper or _telegram_scraper
 
-    def run_scrape_and_alert(self, config, bot):
+    def group_users_into_cohorts(self, ai_matcher, users):
+        # Scores depend only on the matcher's cohort key (normalized profession) and the job
+        cohorts: Dict[str, List[Dict[str, Any]]] = {}
+        for user in users:
+            cohorts.setdefault(ai_matcher.cohort_key(user), []).append(user)
+        return cohorts
+
+    async def run_alert_delivery(self, config):
         try:
-            logging.info('Running scheduled job scrape and alert')
-            jobs = scrape_jobs(config)
-            for job in jobs:
-                save_job_post(job)
-            users = fetch_all_users()
-            from matching.ai_matcher import get_ai_matcher, select_top_matches
-            ai_matcher = get_ai_matcher(config)
-            min_score = float(config.get('AI_MIN_SCORE', 0.5))
-            top_k = int(config.get('AI_TOP_K', 5))
-            for user in users:
-                candidate_jobs = fetch_unsent_jobs_for_user(user['user_id'])
-                scored = ai_matcher.score_jobs(user, candidate_jobs)
-                top_matches_scored = select_top_matches(scored, top_k=top_k, min_score=min_score)
+            await AlertDeliveryWorker(config).drain()
+        except Exception as e:
+            print(f"Exception in alert delivery: {e}")
+
+    async def ingest_jobs(self, config, ai_matcher):
+        # Each post is classified and stored as soon as it is enriched; offsets advance per channel.
+        # With live ingestion on, this poll only fills gaps (missed updates, downtime).
+        new_job_ids = await run_ingestion_pipeline(config, ai_matcher, self.scraper)
+        print(f"Stored {len(new_job_ids)} new jobs")
+        return new_job_ids
+
+    def match_users(self, config, ai_matcher, users):
+        from matching.ai_matcher import select_top_matches
+        min_score = float(config.get('AI_MIN_SCORE', 0.5))
+        top_k = int(config.get('AI_TOP_K', 5))
+        # One candidate window per cycle, shared read-only by every cohort and user
+        snapshot = load_job_snapshot(int(config.get('JOB_CANDIDATE_WINDOW', 200)))
+        # Sent and already-queued pairs for every user, one paged query each; the user loop below
+        # makes no DB reads. Jobs still pending (or parked as failed) in the outbox are left out
+        # too, or they would take the same top-k slots every cycle without ever being re-queued.
+        sent_by_user = fetch_sent_job_ids_by_user(snapshot.job_ids)
+        for user_id, job_ids in fetch_queued_job_ids_by_user(snapshot.job_ids).items():
+            sent_by_user.setdefault(user_id, set()).update(job_ids)
+        alerts: List[Tuple[Any, List[Dict[str, Any]]]] = []
+        degraded: Dict[Any, str] = {}
+        for members in self.group_users_into_cohorts(ai_matcher, users).values():
+            member_sent = [sent_by_user.get(user['user_id'], set()) for user in members]
+            cohort_jobs = [
+                job for job in snapshot.jobs
+                if any(job['id'] not in sent for sent in member_sent)
+            ]
+            # Rank the cohort's jobs once, then apply each member's sent filter and top-k
+            with SCORING_SECONDS.time():
+                scored = ai_matcher.score_jobs(members[0], cohort_jobs)
+            JOBS_SCORED.inc(len(cohort_jobs))
+            degraded.update(ai_matcher.degraded)
+            for user, sent_ids in zip(members, member_sent):
+                user_scored = [(job, score) for job, score in scored if job['id'] not in sent_ids]
+                top_matches_scored = select_top_matches(user_scored, top_k=top_k, min_score=min_score)
                 top_jobs_only = [job for job, score in top_matches_scored]
-                send_job_alert(bot, user['user_id'], top_jobs_only, config)
-                mark_jobs_as_sent(user['user_id'], top_jobs_only)
+                if top_jobs_only:
+                    alerts.append((user['user_id'], top_jobs_only))
+        # Matching only writes the outbox; the delivery job sends and confirms independently
+        queued = enqueue_job_alerts(alerts)
+        print(f"Queued {queued} job alerts for {len(alerts)} users")
+        if degraded:
+            # Unscored jobs stay in the candidate window and are matched once inference recovers
+            reasons = ', '.join(sorted(set(degraded.values())))
+            print(f"Degraded matching: {len(degraded)} jobs left unscored this cycle ({reasons})")
+        return alerts
+
+    def match_new_jobs(self, config, ai_matcher, users, jobs):
+        # Freshly stored jobs cannot have been sent to anyone, so no sent-alert lookup is needed
+        from matching.ai_matcher import select_top_matches
+        min_score = float(config.get('AI_MIN_SCORE', 0.5))
+        top_k = int(config.get('AI_TOP_K', 5))
+        alerts: List[Tuple[Any, List[Dict[str, Any]]]] = []
+        for members in self.group_users_into_cohorts(ai_matcher, users).values():
+            with SCORING_SECONDS.time():
+                scored = ai_matcher.score_jobs(members[0], jobs)
+            JOBS_SCORED.inc(len(jobs))
+            if ai_matcher.degraded:
+                print(f"Degraded matching: {len(ai_matcher.degraded)} new jobs left for the next polling cycle")
+            top_jobs_only = [job for job, score in select_top_matches(scored, top_k=top_k, min_score=min_score)]
+            if top_jobs_only:
+                alerts.extend((user['user_id'], top_jobs_only) for user in members)
+        return enqueue_job_alerts(alerts)
+
+    def ingest_live_post(self, config, channel, message):
+        from matching.ai_matcher import get_ai_matcher
+        job = parse_job_from_message(message, channel)
+        duplicates = get_near_duplicate_index(config)
+        fingerprint = None
+        if duplicates is not None:
+            try:
+                refresh_near_duplicate_index(duplicates)
+            except Exception as e:
+                print(f"Failed to refresh near-duplicate index: {e}")
+            fingerprint = job_fingerprint(job)
+            job['canonical_job_id'] = duplicates.find(fingerprint)
+            if job['canonical_job_id'] is not None:
+                # Already stored (and alerted) from another channel: link it, skip enrichment and alerts
+                save_job_posts([job])
+                NEAR_DUPLICATES.inc(channel=channel)
+                print(f"Live ingestion: stored {job['url']} as a duplicate of job {job['canonical_job_id']}")
+                return
+        ai_matcher = get_ai_matcher(config)
+        enrich_job(job, message_text(message), config)
+        try:
+            ai_matcher.annotate_jobs([job])
+        except Exception as e:
+            print(f"Failed to classify live job at ingest: {e}")
+        new_job_ids = save_job_posts([job])
+        if not new_job_ids:
+            return
+        job['id'] = new_job_ids[0]
+        if duplicates is not None:
+            duplicates.add(job['id'], fingerprint)
+        # The outbox's unique (user_id, job_id) makes this idempotent with the next polling
+        # cycle, so every user is matched here regardless of shard
+        queued = self.match_new_jobs(config, ai_matcher, fetch_all_users(), [job])
+        print(f"Live ingestion: stored {job['url']}, queued {queued} alerts")
+
+    async def handle_live_post(self, config, channel, message):
+        if not (getattr(message, 'text', None) or getattr(message, 'caption', None)):
+            return
+        if not await self.scraper.filter_unseen_messages(channel, [message]):
+            return
+        # Parsing, enrichment, storage and matching are blocking; keep them off the event loop.
+        # Offsets are left to the polling cycle, which still has to cover any gap before this post.
+        await asyncio.to_thread(self.ingest_live_post, config, channel, message)
+
+    async def start_live_ingestion(self, config):
+        from scraper.live import LiveChannelListener
+        try:
+            self.live = LiveChannelListener(
+                config, lambda channel, message: self.handle_live_post(config, channel, message), self.scraper
+            )
+            await self.live.start()
+        except Exception as e:
+            print(f"Live ingestion unavailable, relying on polling: {e}")
+            self.live = None
+
+    async def sync_live_ingestion(self, config, is_leader):
+        # One listener per deployment: it follows the scraper leader, which moves between workers
+        # in lease mode, so every leadership check subscribes or unsubscribes this process
+        if not config.get('LIVE_INGESTION', False):
+            return
+        if is_leader and self.live is None:
+            await self.start_live_ingestion(config)
+        elif not is_leader and self.live is not None:
+            live, self.live = self.live, None
+            try:
+                await live.stop()
+            except Exception as e:
+                print(f"Failed to stop live ingestion: {e}")
+
+    async def run_heartbeat(self, config):
+        try:
+            if config.get('LIVE_INGESTION', False):
+                # assignment() renews the lease too, and a new leader starts listening within a
+                # heartbeat instead of at the next scrape cycle
+                assignment = await asyncio.to_thread(self.coordinator.assignment)
+                await self.sync_live_ingestion(config, assignment.is_leader)
+            else:
+                await asyncio.to_thread(self.coordinator.heartbeat)
+        except Exception as e:
+            print(f"Failed to renew worker lease: {e}")
+
+    async def run_pyrogram_health_check(self, config):
+        try:
+            await check_pyrogram_client(config)
+        except Exception as e:
+            print(f"Pyrogram reconnect failed; the next scrape will retry: {e}")
+
+    async def run_scrape_and_alert(self, config):
+        if self.coordinator is None:
+            self.coordinator = ShardCoordinator(config)
+        started = time.perf_counter()
+        CYCLE_IN_PROGRESS.set(1)
+        try:
+            logging.info('Running scheduled job scrape and alert')
+            from matching.ai_matcher import get_ai_matcher
+            from matching.inference_cache import get_inference_cache
+            # Scraping runs on the event loop; blocking DB and scoring work runs in worker threads
+            assignment = await asyncio.to_thread(self.coordinator.assignment)
+            print(f"Worker {self.coordinator.worker_id}: {assignment}")
+            await self.sync_live_ingestion(config, assignment.is_leader)
+            ai_matcher = await asyncio.to_thread(get_ai_matcher, config)
+            # Only the leader scrapes, so replicas never duplicate scrapes or channel offsets
+            if assignment.is_leader:
+                await self.ingest_jobs(config, ai_matcher)
+            users = [user for user in await asyncio.to_thread(fetch_all_users) if assignment.owns(user['user_id'])]
+            await asyncio.to_thread(self.match_users, config, ai_matcher, users)
+            print(f"Inference cache stats this cycle: {get_inference_cache(config).stats(reset=True)}")
+            CYCLE_LAST_SUCCESS.set(time.time())
         except Exception as e:
             print(f"Exception in job_scrape_and_alert: {e}")
+        finally:
+            CYCLE_IN_PROGRESS.set(0)
+            CYCLE_SECONDS.observe(time.perf_counter() - started)
 
-    def start(self, config):
-        scheduler = BackgroundScheduler()
-        bot = Bot(token=config['TELEGRAM_BOT_TOKEN'])
-        scheduler.add_job(lambda: self.run_scrape_and_alert(config, bot), 'interval', minutes=config['JOB_SCRAPE_INTERVAL_MINUTES'])
+    async def start(self, config, run_now=False):
+        # Must be called from the running event loop: every job below runs on it
+        scheduler = AsyncIOScheduler()
+        scheduler.add_listener(self.record_overlap, EVENT_JOB_MAX_INSTANCES)
+        self.coordinator = ShardCoordinator(config)
+        scheduler.add_job(
+            self.run_scrape_and_alert,
+            'interval',
+            id='scrape_and_alert',
+            args=[config],
+            minutes=config['JOB_SCRAPE_INTERVAL_MINUTES'],
+            next_run_time=datetime.now() if run_now else None,
+            max_instances=1,
+            coalesce=True,
+        )
+        if self.coordinator.mode == 'lease':
+            # Keep the lease alive between cycles so peers don't reassign our shard
+            # (and, with live ingestion, subscribe now if this worker is the scraper leader)
+            await self.run_heartbeat(config)
+            scheduler.add_job(
+                self.run_heartbeat, 'interval', args=[config], seconds=max(5, self.coordinator.lease_ttl_seconds / 3)
+            )
+        elif config.get('LIVE_INGESTION', False):
+            await self.sync_live_ingestion(config, (await asyncio.to_thread(self.coordinator.assignment)).is_leader)
+        # The Pyrogram connection is kept for the life of the process; ping it between cycles
+        scheduler.add_job(
+            self.run_pyrogram_health_check,
+            'interval',
+            args=[config],
+            seconds=config.get('PYROGRAM_HEALTHCHECK_SECONDS', 60),
+            max_instances=1,
+            coalesce=True,
+        )
+        if config.get('ENABLE_ALERT_DELIVERY', True):
+            self.add_alert_delivery_job(scheduler, config)
         scheduler.start()
-        return bot, scheduler
+        return scheduler
+
+    def record_overlap(self, event):
+        # A run came due while the previous one was still going, so APScheduler skipped it
+        CYCLE_OVERLAPS.inc(job=event.job_id)
+        print(f"Skipped {event.job_id}: previous run still in progress")
 
-    def cleanup(self, scheduler):
+    def add_alert_delivery_job(self, scheduler, config):
+        scheduler.add_job(
+            self.run_alert_delivery,
+            'interval',
+            id='alert_delivery',
+            args=[config],
+            seconds=config.get('ALERT_DELIVERY_INTERVAL_SECONDS', 30),
+            max_instances=1,
+            coalesce=True,
+        )
+
+    async def start_delivery(self, config):
+        scheduler = AsyncIOScheduler()
+        scheduler.add_listener(self.record_overlap, EVENT_JOB_MAX_INSTANCES)
+        self.add_alert_delivery_job(scheduler, config)
+        scheduler.start()
+        return scheduler
+
+    async def cleanup(self, scheduler):
         try:
             scheduler.shutdown(wait=False)
-            try:
-                loop = asyncio.get_running_loop()
-                if not loop.is_closed():
-                    loop.create_task(cleanup_pyrogram_client())
-                else:
-                    pass
-            except RuntimeError:
-                try:
-                    asyncio.run(cleanup_pyrogram_client())
-                except RuntimeError:
-                    pass
-                except Exception as e:
-                    print(f"Error during Pyrogram cleanup: {e}")
-            except Exception as e:
-                print(f"Error during Pyrogram cleanup: {e}")
         except Exception as e:
             print(f"Error during scheduler cleanup: {e}")
+        try:
+            await cleanup_pyrogram_client()
+        except Exception as e:
+            print(f"Error during Pyrogram cleanup: {e}")
 
 
 _job_scheduler_singleton = JobScheduler()
 
 
-def job_scrape_and_alert(config, bot):
-    return _job_scheduler_singleton.run_scrape_and_alert(config, bot)
+def job_scrape_and_alert(config):
+    return _job_scheduler_singleton.run_scrape_and_alert(config)
 
 
-def start_scheduler(config):
-    return _job_scheduler_singleton.start(config)
+def start_scheduler(config, run_now=False):
+    return _job_scheduler_singleton.start(config, run_now)
+
+
+def start_delivery_scheduler(config):
+    return _job_scheduler_singleton.start_delivery(config)
 
 
 def cleanup_scheduler(scheduler):
-    return _job_scheduler_singleton.cleanup(scheduler) 
\ No newline at end of file
+    return _job_scheduler_singleton.cleanup(scheduler)
+
+
+async def wait_for_shutdown():
+    """Block until SIGINT/SIGTERM; the caller then stops its services on the same loop."""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            # Windows: Ctrl+C still surfaces as KeyboardInterrupt from asyncio.run
+            pass
+    await stop.wait()
@@ -0,0 +1,63 @@
+import hashlib
+import os
+import socket
+from typing import Any, Dict
+
+from db.db import heartbeat_worker, fetch_live_workers
+
+
+def shard_of(user_id, shard_count: int) -> int:
+    # Stable across processes and restarts (unlike hash()), and spreads sequential ids evenly
+    digest = hashlib.md5(str(user_id).encode('utf-8')).hexdigest()
+    return int(digest, 16) % max(1, shard_count)
+
+
+class ShardAssignment:
+    def __init__(self, index: int, count: int, is_leader: bool):
+        self.index = index
+        self.count = max(1, count)
+        self.is_leader = is_leader
+
+    def owns(self, user_id) -> bool:
+        return self.count == 1 or shard_of(user_id, self.count) == self.index
+
+    def __repr__(self):
+        role = 'leader' if self.is_leader else 'follower'
+        return f"shard {self.index + 1}/{self.count} ({role})"
+
+
+class ShardCoordinator:
+    """
+    Decides which users this worker matches and whether it is the single scraper leader.
+
+    - `single` (default): one worker owns every user and scrapes.
+    - `static`: WORKER_SHARD_INDEX of WORKER_SHARD_COUNT from config; shard 0 scrapes.
+    - `lease`: workers heartbeat into worker_leases; live workers sorted by id get shards in that
+      order, and the first one scrapes. A worker that stops heartbeating drops out after the TTL
+      and its users move to the survivors on their next cycle.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.mode = (config.get('WORKER_SHARD_MODE') or 'single').lower()
+        self.shard_count = int(config.get('WORKER_SHARD_COUNT', 1))
+        self.shard_index = int(config.get('WORKER_SHARD_INDEX', 0))
+        self.lease_ttl_seconds = int(config.get('WORKER_LEASE_TTL_SECONDS', 120))
+        self.worker_id = config.get('WORKER_ID') or f"{socket.gethostname()}-{os.getpid()}"
+
+    def heartbeat(self) -> None:
+        if self.mode == 'lease':
+            heartbeat_worker(self.worker_id)
+
+    def assignment(self) -> ShardAssignment:
+        if self.mode == 'static':
+            if not 0 <= self.shard_index < self.shard_count:
+                raise ValueError(f"WORKER_SHARD_INDEX {self.shard_index} out of range for {self.shard_count} shards")
+            return ShardAssignment(self.shard_index, self.shard_count, self.shard_index == 0)
+        if self.mode == 'lease':
+            self.heartbeat()
+            live = sorted(fetch_live_workers(self.lease_ttl_seconds) or [])
+            if self.worker_id not in live:
+                live = sorted(live + [self.worker_id])
+            index = live.index(self.worker_id)
+            return ShardAssignment(index, len(live), index == 0)
+        return ShardAssignment(0, 1, True)
@@ -0,0 +1,46 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from pyrogram import filters
+from pyrogram.handlers import MessageHandler
+
+from scraper.scraper import _channel_key, _telegram_scraper
+
+
+class LiveChannelListener:
+    """
+    Receives new posts from TELEGRAM_CHANNELS as Pyrogram updates instead of waiting for the
+    next poll. The handler is attached to the process's persistent client, so it shares the
+    connection (and event loop) polling uses and is re-attached if the client is rebuilt.
+    """
+
+    def __init__(self, config: Dict[str, Any], on_post: Callable[[str, Any], Awaitable[None]], scraper=None):
+        self.config = config
+        self.on_post = on_post
+        self.scraper = scraper or _telegram_scraper
+        # Map the chat username Telegram reports back to the channel as configured
+        self.channels = {_channel_key(c).lower(): c for c in (config.get('TELEGRAM_CHANNELS') or [])}
+        self.handler = None
+
+    async def start(self) -> None:
+        if not self.channels:
+            return
+        self.handler = MessageHandler(self._handle, filters.chat(list(self.channels)))
+        await self.scraper.add_client_handler(self.config, self.handler)
+        print(f"Live ingestion: listening for new posts in {len(self.channels)} channels")
+
+    async def stop(self) -> None:
+        if self.handler is None:
+            return
+        handler, self.handler = self.handler, None
+        await self.scraper.remove_client_handler(self.config, handler)
+        print("Live ingestion: stopped listening for new posts")
+
+    async def _handle(self, client, message) -> None:
+        chat = getattr(message, 'chat', None)
+        channel = self.channels.get((getattr(chat, 'username', None) or '').lower())
+        if channel is None:
+            return
+        try:
+            await self.on_post(channel, message)
+        except Exception as e:
+            print(f"Live ingestion: failed to process {channel}/{getattr(message, 'id', '?')}: {e}")
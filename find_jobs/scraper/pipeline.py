@@ -0,0 +1,304 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Tuple
+
+from db.db import save_job_posts, save_channel_offsets
+from metrics.metrics import (
+    ENRICH_CALLS, ENRICH_SECONDS, NEAR_DUPLICATES, SCRAPE_ERRORS, SCRAPE_MESSAGES, SCRAPE_SECONDS,
+)
+from scraper.scraper import enrich_job, message_text, parse_job_from_message, _channel_key, _telegram_scraper
+from search.near_duplicates import (
+    NearDuplicateIndex, get_near_duplicate_index, job_fingerprint, refresh_near_duplicate_index,
+)
+
+_DONE = object()
+
+
+class _ChannelProgress:
+    def __init__(self):
+        self.max_id = 0
+        self.outstanding = 0
+        self.fetch_done = False
+        self.failed = False
+        self.committed = False
+
+
+class _InFlightJob:
+    # Index key for a canonical job that is still being enriched; its id appears once stored
+    def __init__(self, job: Dict[str, Any]):
+        self.job = job
+
+
+class IngestionPipeline:
+    """
+    Streams posts through fetch -> dedupe -> enrich -> store, one asyncio task group per stage,
+    connected by bounded queues. A slow stage fills its input queue and blocks the stage before
+    it, so at most a few queues' worth of messages are in flight however many posts a cycle finds.
+
+    Stored rows are flushed in small batches as soon as they are enriched, and each batch is
+    classified by the matcher in one call just before it is written. A channel's
+    high-water mark is committed once every message fetched from it has been stored or skipped;
+    if any of them failed, the offset stays put and the next cycle retries (stored posts are
+    skipped by the URL dedupe).
+
+    Posts that are near-duplicates of a stored job (the same vacancy cross-posted to another
+    channel) skip enrichment and are stored linked to it via canonical_job_id. A copy of a post
+    still in flight in this run waits until that post is stored, then is linked the same way.
+
+    If any stage task dies, the others are cancelled rather than left blocked on a full queue;
+    channels with posts still in flight keep their offsets and are retried next cycle.
+    """
+
+    def __init__(self, config: Dict[str, Any], ai_matcher=None, scraper=None):
+        self.config = config
+        self.ai_matcher = ai_matcher
+        self.scraper = scraper or _telegram_scraper
+        self.queue_size = max(1, int(config.get('PIPELINE_QUEUE_SIZE', 50)))
+        self.enrich_workers = max(1, int(config.get('PIPELINE_ENRICH_WORKERS', 4)))
+        self.store_batch_size = max(1, int(config.get('PIPELINE_STORE_BATCH_SIZE', 20)))
+        self.store_linger_seconds = float(config.get('PIPELINE_STORE_LINGER_SECONDS', 1.0))
+        self.progress: Dict[str, _ChannelProgress] = {}
+        self.new_job_ids: List[int] = []
+        self.stats = {'fetched': 0, 'unseen': 0, 'duplicates': 0, 'enriched': 0, 'stored': 0, 'failed': 0}
+        self.duplicates = get_near_duplicate_index(config)
+        self.in_flight = NearDuplicateIndex(self.duplicates.max_distance) if self.duplicates is not None else None
+        self.deferred: List[Tuple[str, Dict[str, Any], _InFlightJob]] = []
+
+    async def run(self, channels: List[str]) -> List[int]:
+        try:
+            app = await self.scraper.get_pyrogram_client(self.config)
+        except Exception as e:
+            print(f"Failed to initialize Pyrogram client: {e}")
+            return []
+        offsets = self.scraper.load_channel_offsets()
+        if self.duplicates is not None:
+            # Pick up jobs other workers stored since our last cycle
+            try:
+                await asyncio.to_thread(refresh_near_duplicate_index, self.duplicates)
+            except Exception as e:
+                print(f"Failed to refresh near-duplicate index, storing copies unlinked this cycle: {e}")
+                self.duplicates = self.in_flight = None
+        semaphore = asyncio.Semaphore(max(1, int(self.config.get('SCRAPE_CONCURRENCY', 8))))
+        # Pages are the unit between fetch and dedupe (one URL lookup per page), single
+        # messages after that
+        pages: asyncio.Queue = asyncio.Queue(maxsize=max(1, self.queue_size // 10))
+        to_enrich: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        to_store: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+
+        started = time.monotonic()
+        deduper = asyncio.create_task(self._dedupe(pages, to_enrich, to_store))
+        enrichers = [asyncio.create_task(self._enrich(to_enrich, to_store)) for _ in range(self.enrich_workers)]
+        storer = asyncio.create_task(self._store(to_store))
+
+        async def fetch_and_drain() -> None:
+            await asyncio.gather(*[
+                self._fetch(app, channel, offsets.get(_channel_key(channel), 0), pages, semaphore)
+                for channel in channels
+            ])
+            # Drain stage by stage so every message already in flight is stored before we return
+            await pages.put(_DONE)
+            await deduper
+            for _ in enrichers:
+                await to_enrich.put(_DONE)
+            await asyncio.gather(*enrichers)
+            await to_store.put(_DONE)
+            await storer
+            if self.deferred:
+                await self._store_deferred()
+
+        tasks = [asyncio.create_task(fetch_and_drain()), deduper, *enrichers, storer]
+        # A stage that dies stops consuming its queue, which would block every stage before it
+        # on put(); stop the rest instead of waiting on them forever
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        errors = [task.exception() for task in done if not task.cancelled() and task.exception() is not None]
+        if errors:
+            print(f"Ingestion pipeline stopped early, stored jobs are kept: {errors[0]!r}")
+        print(
+            f"Ingestion pipeline: {self.stats} in {time.monotonic() - started:.1f}s "
+            f"across {len(channels)} channels"
+        )
+        return self.new_job_ids
+
+    async def _fetch(self, app, channel, last_message_id, pages: asyncio.Queue, semaphore) -> None:
+        progress = self.progress.setdefault(channel, _ChannelProgress())
+        page_size = int(self.config.get('SCRAPE_PAGE_SIZE', 20))
+        max_pages = int(self.config.get('SCRAPE_MAX_PAGES', 10))
+        max_retries = int(self.config.get('SCRAPE_FLOOD_WAIT_RETRIES', 3))
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                async for messages in self.scraper.iter_new_message_pages(
+                    app, channel, last_message_id, page_size, max_pages, max_retries
+                ):
+                    progress.max_id = max(progress.max_id, max(m.id for m in messages))
+                    progress.outstanding += len(messages)
+                    self.stats['fetched'] += len(messages)
+                    SCRAPE_MESSAGES.inc(len(messages), channel=channel)
+                    await pages.put((channel, messages))
+            except Exception as e:
+                print(f"Failed to scrape channel {channel}: {e}")
+                SCRAPE_ERRORS.inc(channel=channel)
+                progress.failed = True
+            # Includes time blocked on a full queue, i.e. backpressure from later stages
+            SCRAPE_SECONDS.observe(time.perf_counter() - started, channel=channel)
+        progress.fetch_done = True
+        await self._settle(channel, 0)
+
+    async def _dedupe(self, pages: asyncio.Queue, to_enrich: asyncio.Queue, to_store: asyncio.Queue) -> None:
+        while True:
+            item = await pages.get()
+            if item is _DONE:
+                return
+            channel, messages = item
+            # Consider both text messages and media with captions
+            posts = [m for m in messages if getattr(m, 'text', None) or getattr(m, 'caption', None)]
+            unseen = await self.scraper.filter_unseen_messages(channel, posts) if posts else []
+            self.stats['unseen'] += len(unseen)
+            await self._settle(channel, len(messages) - len(unseen))
+            for message in unseen:
+                # Parsing the post's own text is cheap; enrichment waits until we know it is new
+                try:
+                    job = parse_job_from_message(message, channel)
+                except Exception as e:
+                    print(f"Channel {channel}: failed to parse message {getattr(message, 'id', '?')}: {e}")
+                    self.stats['failed'] += 1
+                    self.progress[channel].failed = True
+                    await self._settle(channel, 1)
+                    continue
+                fingerprint = None
+                if self.duplicates is not None:
+                    fingerprint = job_fingerprint(job)
+                    job['canonical_job_id'] = self.duplicates.find(fingerprint)
+                    if job['canonical_job_id'] is not None:
+                        self._count_duplicate(channel)
+                        await to_store.put((channel, job, None))
+                        continue
+                    pending = self.in_flight.find(fingerprint)
+                    if pending is not None:
+                        self._count_duplicate(channel)
+                        self.deferred.append((channel, job, pending))
+                        continue
+                    self.in_flight.add(_InFlightJob(job), fingerprint)
+                await to_enrich.put((channel, message, job, fingerprint))
+
+    def _count_duplicate(self, channel: str) -> None:
+        self.stats['duplicates'] += 1
+        NEAR_DUPLICATES.inc(channel=channel)
+
+    async def _enrich(self, to_enrich: asyncio.Queue, to_store: asyncio.Queue) -> None:
+        while True:
+            item = await to_enrich.get()
+            if item is _DONE:
+                return
+            channel, message, job, fingerprint = item
+            started = time.perf_counter()
+            try:
+                # Enrichment makes blocking HTTP calls; keep them off the event loop. Concurrent
+                # workers keep several posts' extraction calls in flight at once.
+                await asyncio.to_thread(enrich_job, job, message_text(message), self.config)
+            except Exception as e:
+                print(f"Channel {channel}: failed to enrich message {getattr(message, 'id', '?')}: {e}")
+                ENRICH_CALLS.inc(outcome='error')
+                self.stats['failed'] += 1
+                self.progress[channel].failed = True
+                await self._settle(channel, 1)
+                continue
+            ENRICH_SECONDS.observe(time.perf_counter() - started)
+            ENRICH_CALLS.inc(outcome='ok')
+            self.stats['enriched'] += 1
+            await to_store.put((channel, job, fingerprint))
+
+    def _annotate(self, jobs: List[Dict[str, Any]]) -> None:
+        # Classify new jobs once here, a whole store batch per call so the matcher can send
+        # batched requests; the scores are stored with each row
+        try:
+            self.ai_matcher.annotate_jobs(jobs)
+        except Exception as e:
+            print(f"Failed to classify {len(jobs)} new jobs at ingest: {e}")
+
+    async def _store(self, to_store: asyncio.Queue) -> None:
+        batch: List[Tuple[str, Dict[str, Any], Any]] = []
+        done = False
+        while not done:
+            try:
+                if batch:
+                    item = await asyncio.wait_for(to_store.get(), timeout=self.store_linger_seconds)
+                else:
+                    item = await to_store.get()
+            except asyncio.TimeoutError:
+                item = None
+            if item is _DONE:
+                done = True
+            elif item is not None:
+                batch.append(item)
+            # Flush when the batch is full, the stream went quiet, or we are shutting down
+            if batch and (done or item is None or len(batch) >= self.store_batch_size):
+                await self._flush(batch)
+                batch = []
+
+    async def _flush(self, batch: List[Tuple[str, Dict[str, Any], Any]]) -> None:
+        # Linked copies are never matched, so only canonical jobs are worth classifying
+        canonical = [job for _, job, _ in batch if job.get('canonical_job_id') is None]
+        if self.ai_matcher is not None and canonical:
+            await asyncio.to_thread(self._annotate, canonical)
+        try:
+            ids = await asyncio.to_thread(save_job_posts, [job for _, job, _ in batch])
+            self.new_job_ids.extend(ids or [])
+            self.stats['stored'] += len(ids or [])
+            if self.duplicates is not None:
+                # New canonical jobs become lookup targets for later posts and cycles
+                for _, job, fingerprint in batch:
+                    if job.get('id') is not None and job.get('canonical_job_id') is None:
+                        self.duplicates.add(job['id'], fingerprint)
+        except Exception as e:
+            print(f"Failed to store {len(batch)} jobs: {e}")
+            self.stats['failed'] += len(batch)
+            for channel, _, _ in batch:
+                self.progress[channel].failed = True
+        for channel, _, _ in batch:
+            await self._settle(channel, 1)
+
+    async def _store_deferred(self) -> None:
+        # Copies of posts that were in flight alongside them: link to the stored original. If
+        # the original was not stored, leave the copy's channel uncommitted so it is retried.
+        linked = []
+        for channel, job, pending in self.deferred:
+            canonical_id = pending.job.get('id')
+            if canonical_id is None:
+                self.stats['failed'] += 1
+                self.progress[channel].failed = True
+                await self._settle(channel, 1)
+                continue
+            job['canonical_job_id'] = canonical_id
+            linked.append((channel, job, None))
+        if linked:
+            await self._flush(linked)
+
+    async def _settle(self, channel: str, count: int) -> None:
+        progress = self.progress[channel]
+        progress.outstanding -= count
+        if progress.committed or progress.failed or not progress.fetch_done or progress.outstanding > 0:
+            return
+        progress.committed = True
+        if not progress.max_id:
+            return
+        # Only advance the per-channel high-water mark once all its posts are stored
+        try:
+            await asyncio.to_thread(save_channel_offsets, {_channel_key(channel): progress.max_id})
+        except Exception as e:
+            print(f"Failed to save offset for channel {channel}: {e}")
+
+
+async def run_ingestion_pipeline(config: Dict[str, Any], ai_matcher=None, scraper=None) -> List[int]:
+    channels = config.get('TELEGRAM_CHANNELS') or []
+    if not channels:
+        print("No TELEGRAM_CHANNELS configured; skipping scrape.")
+        return []
+    try:
+        return await IngestionPipeline(config, ai_matcher, scraper).run(channels)
+    except Exception as e:
+        print(f"Failed to run ingestion pipeline: {e}")
+        return []
@@ -1,8 +1,9 @@
-from pyrogram import Client
+from pyrogram import Client, raw, utils
+from pyrogram.errors import FloodWait
 import re
 import asyncio
-import nest_asyncio
-import threading
+import random
+from db.db import get_channel_offsets, get_existing_job_urls
 
 # Optional: ensure TgCrypto is importable so Pyrogram can use it if present
 try:
@@ -11,18 +12,27 @@ try:
 except Exception:
     tgcrypto_available = False
 
-# Apply nest_asyncio to allow nested event loops
-nest_asyncio.apply()
-
-# Global client instance to reuse
+# Global client instance, connected once and kept for the life of the process's event loop
 _pyrogram_client = None
-_client_lock = threading.Lock()
+# Guards creating and stopping the client; created per event loop, see _get_client_lock
+_client_lock = None
+_client_lock_loop = None
 
 # TODO: Add your Telegram API credentials in config
 
 
-def parse_job_from_message(message, channel_username, config=None):
-    text = message.text or getattr(message, 'caption', None) or ""
+def build_post_url(channel_username, message_id):
+    channel_name = channel_username.lstrip('@')
+    return f"https://t.me/{channel_name}/{message_id}"
+
+
+def message_text(message):
+    return message.text or getattr(message, 'caption', None) or ""
+
+
+def parse_job_from_message(message, channel_username):
+    # Only the post's own text is parsed; enrich_job fills missing fields once the post is known to be new
+    text = message_text(message)
     # Normalize and split lines
     raw_lines = text.split('\n')
     lines = [ln.strip() for ln in raw_lines if ln.strip()]
@@ -60,26 +70,8 @@ def parse_job_from_message(message, channel_username, config=None):
 
     description = '\n'.join(description_lines).strip()
 
-    # AI-based enrichment to fill missing fields best-effort
-    try:
-        if config is not None and any(v == '' for v in (company, location, field, experience)):
-            from matching.ai_extractor import extract_fields
-            ai_out = extract_fields(text, config)
-            if company == '' and 'company' in ai_out:
-                company = ai_out['company']
-            if location == '' and 'location' in ai_out:
-                location = ai_out['location']
-            if field == '' and 'field' in ai_out:
-                field = ai_out['field']
-            if experience == '' and 'experience' in ai_out:
-                experience = ai_out['experience']
-    except Exception as e:
-        # Best-effort only; ignore enrichment failures
-        pass
-
-    channel_name = channel_username.lstrip('@')
-    url = f"https://t.me/{channel_name}/{message.id}"
-    return {
+    url = build_post_url(channel_username, message.id)
+    job = {
         'title': title,
         'company': company,
         'location': location,
@@ -88,15 +80,50 @@ def parse_job_from_message(message, channel_username, config=None):
         'description': description,
         'url': url,
     }
+    return job
+
+
+def enrich_job(job, text, config):
+    # AI-based enrichment to fill missing fields best-effort
+    try:
+        if any(job[key] == '' for key in ('company', 'location', 'field', 'experience')):
+            from matching.ai_extractor import extract_fields
+            ai_out = extract_fields(text, config)
+            for key in ('company', 'location', 'field', 'experience'):
+                if job[key] == '' and key in ai_out:
+                    job[key] = ai_out[key]
+            # Same labels as the matcher's domain pass, which then skips this job
+            if ai_out.get('field_scores'):
+                job['domain_scores'] = ai_out['field_scores']
+    except Exception as e:
+        # Best-effort only; ignore enrichment failures
+        pass
+    return job
+
+
+def _get_client_lock():
+    # An asyncio.Lock belongs to the loop that first waits on it, so a lock made at import time
+    # fails with "bound to a different event loop" once a second loop uses it
+    global _client_lock, _client_lock_loop
+    loop = asyncio.get_running_loop()
+    if _client_lock is None or _client_lock_loop is not loop:
+        _client_lock = asyncio.Lock()
+        _client_lock_loop = loop
+    return _client_lock
+
+
+def _channel_key(channel):
+    return (channel or '').strip().lstrip('@')
 
 
 class TelegramScraper:
     def __init__(self):
-        pass
+        # Update handlers re-attached whenever the client is recreated after a failed health check
+        self.client_handlers = []
 
     async def get_pyrogram_client(self, config):
         global _pyrogram_client
-        with _client_lock:
+        async with _get_client_lock():
             if _pyrogram_client is None:
                 api_id = int(config['PYROGRAM_API_ID'])
                 api_hash = config['PYROGRAM_API_HASH']
@@ -106,45 +133,118 @@ class TelegramScraper:
                     api_id=api_id,
                     api_hash=api_hash,
                     session_string=session_string,
-                    no_updates=True
+                    # Updates are only needed when live ingestion listens for new channel posts
+                    no_updates=not config.get('LIVE_INGESTION', False)
                 )
                 # Log whether TgCrypto is available (Pyrogram prefers it automatically)
                 if tgcrypto_available:
                     print("Pyrogram: TgCrypto detected and will be used for MTProto.")
                 else:
                     print("Pyrogram: TgCrypto not detected; falling back to pure-Python crypto.")
+                for handler in self.client_handlers:
+                    _pyrogram_client.add_handler(handler)
                 await _pyrogram_client.start()
         return _pyrogram_client
 
-    async def async_scrape_telegram_channels(self, config, channels):
-        jobs = []
+    async def add_client_handler(self, config, handler):
+        self.client_handlers.append(handler)
+        app = await self.get_pyrogram_client(config)
+        app.add_handler(handler)
+
+    async def remove_client_handler(self, config, handler):
+        if handler not in self.client_handlers:
+            return
+        self.client_handlers.remove(handler)
+        app = await self.get_pyrogram_client(config)
+        app.remove_handler(handler)
+
+    async def check_pyrogram_client(self, config, timeout_seconds=15):
+        # A cheap MTProto ping; if the connection is gone, rebuild the client (and its handlers)
+        # now rather than failing the next scrape. Processes that never scraped have nothing to check.
+        app = _pyrogram_client
+        if app is None:
+            return False
         try:
-            app = await self.get_pyrogram_client(config)
-            for channel in channels:
-                try:
-                    async for message in app.get_chat_history(channel, limit=20):
-                        # Consider both text messages and media with captions
-                        if getattr(message, 'text', None) or getattr(message, 'caption', None):
-                            job = parse_job_from_message(message, channel, config)
-                            jobs.append(job)
-                except Exception as e:
-                    print(f"Failed to scrape channel {channel}: {e}")
-                    continue
+            await asyncio.wait_for(
+                app.invoke(raw.functions.Ping(ping_id=random.getrandbits(63))), timeout_seconds
+            )
+            return True
+        except Exception as e:
+            print(f"Pyrogram health check failed, reconnecting: {e}")
+        await self.cleanup_pyrogram_client()
+        await self.get_pyrogram_client(config)
+        return False
+
+    def load_channel_offsets(self):
+        try:
+            return get_channel_offsets() or {}
         except Exception as e:
-            print(f"Failed to initialize Pyrogram client: {e}")
-            return []
-        return jobs
+            print(f"Failed to load channel offsets; scraping latest page only: {e}")
+            return {}
 
-    def scrape_telegram_channels(self, config, channels):
+    async def filter_unseen_messages(self, channel, messages):
+        # Drop posts whose URL is already stored before any parsing or AI enrichment happens
+        urls = [build_post_url(channel, m.id) for m in messages]
         try:
-            return asyncio.run(self.async_scrape_telegram_channels(config, channels))
+            known = await asyncio.to_thread(get_existing_job_urls, urls)
         except Exception as e:
-            print(f"Failed to scrape Telegram channels: {e}")
-            return []
+            print(f"Channel {channel}: failed to check known posts, enriching all: {e}")
+            return messages
+        return [m for m, url in zip(messages, urls) if url not in (known or set())]
+
+    async def with_flood_wait(self, channel, call, max_retries):
+        # FloodWait only pauses the channel that hit it; other channel tasks keep running
+        attempt = 0
+        while True:
+            try:
+                return await call()
+            except FloodWait as e:
+                attempt += 1
+                if attempt > max_retries:
+                    raise
+                wait_seconds = int(getattr(e, 'value', 0) or 0) + 1
+                print(f"Channel {channel}: FloodWait, retrying in {wait_seconds}s ({attempt}/{max_retries})")
+                await asyncio.sleep(wait_seconds)
+
+    async def iter_new_message_pages(self, app, channel, last_message_id, page_size, max_pages, max_retries=3):
+        # Page forward from the high-water mark, oldest new posts first: offset_id just above the
+        # last page with add_offset=-limit asks for the `limit` messages after it. If max_pages
+        # runs out, the offset is committed at the newest post actually fetched and the rest are
+        # picked up next cycle instead of being skipped. A channel with no stored offset only
+        # gets its latest page.
+        peer = await self.with_flood_wait(channel, lambda: app.resolve_peer(channel), max_retries)
+        cursor = last_message_id
+        pages = max_pages if last_message_id else 1
+        for _ in range(pages):
+            request = raw.functions.messages.GetHistory(
+                peer=peer,
+                offset_id=cursor + 1 if last_message_id else 0,
+                offset_date=0,
+                add_offset=-page_size if last_message_id else 0,
+                limit=page_size,
+                max_id=0,
+                min_id=cursor,
+                hash=0,
+            )
+            history = await self.with_flood_wait(
+                channel, lambda: app.invoke(request, sleep_threshold=0), max_retries
+            )
+            messages = await self.parse_history(app, history)
+            messages = sorted((m for m in messages if m.id > cursor), key=lambda m: m.id)
+            if not messages:
+                return
+            yield messages
+            if not last_message_id or len(messages) < page_size:
+                return
+            cursor = messages[-1].id
+        print(f"Channel {channel}: more than {pages} pages of new posts; the rest follow next cycle.")
+
+    async def parse_history(self, app, history):
+        return await utils.parse_messages(app, history, replies=0)
 
     async def cleanup_pyrogram_client(self):
         global _pyrogram_client
-        with _client_lock:
+        async with _get_client_lock():
             if _pyrogram_client:
                 try:
                     if _pyrogram_client.is_connected:
@@ -157,25 +257,16 @@ class TelegramScraper:
                     _pyrogram_client = None
 
 
-def get_pyrogram_client(config):
-    return asyncio.run(TelegramScraper().get_pyrogram_client(config))
-
-
-def async_scrape_telegram_channels(config, channels):
-    return TelegramScraper().async_scrape_telegram_channels(config, channels)
+_telegram_scraper = TelegramScraper()
 
 
-def scrape_telegram_channels(config, channels):
-    return TelegramScraper().scrape_telegram_channels(config, channels)
+async def get_pyrogram_client(config):
+    return await _telegram_scraper.get_pyrogram_client(config)
 
 
-def scrape_jobs(config):
-    channels = config.get('TELEGRAM_CHANNELS') or []
-    if not channels:
-        print("No TELEGRAM_CHANNELS configured; skipping scrape.")
-        return []
-    return TelegramScraper().scrape_telegram_channels(config, channels)
+async def check_pyrogram_client(config):
+    return await _telegram_scraper.check_pyrogram_client(config)
 
 
 async def cleanup_pyrogram_client():
-    return await TelegramScraper().cleanup_pyrogram_client() 
\ No newline at end of file
+    return await _telegram_scraper.cleanup_pyrogram_client()
@@ -0,0 +1,116 @@
+import heapq
+import math
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Tuple
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*")
+
+# Matches in the title count most, then the classified field, then company, then body text
+FIELD_WEIGHTS: Dict[str, float] = {
+    'title': 3.0,
+    'field': 2.0,
+    'company': 1.5,
+    'description': 1.0,
+}
+INDEXED_COLUMNS = 'id, title, company, field, description, url, canonical_job_id'
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall((text or '').lower()) if len(t) > 1]
+
+
+class JobSearchIndex:
+    """
+    In-memory inverted index over stored jobs. Postings map a term to {job_id: weighted term
+    frequency}; queries are ranked with a BM25-style saturation so lookups only touch the
+    posting lists of the query terms, not the whole table.
+    """
+
+    def __init__(self, k1: float = 1.2):
+        self.k1 = k1
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._docs: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self.max_job_id = 0
+        self.last_refresh = 0.0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add_jobs(self, jobs: Iterable[Dict[str, Any]]) -> int:
+        added = 0
+        with self._lock:
+            for job in jobs:
+                job_id = job.get('id')
+                if job_id is None:
+                    continue
+                self.max_job_id = max(self.max_job_id, int(job_id))
+                # Near-duplicates would repeat their canonical job in results
+                if job_id in self._docs or job.get('canonical_job_id') is not None:
+                    continue
+                weights: Dict[str, float] = {}
+                for column, weight in FIELD_WEIGHTS.items():
+                    for term in tokenize(job.get(column) or ''):
+                        weights[term] = weights.get(term, 0.0) + weight
+                if not weights:
+                    continue
+                for term, tf in weights.items():
+                    self._postings.setdefault(term, {})[job_id] = tf
+                self._docs[job_id] = {
+                    'id': job_id,
+                    'title': job.get('title') or '',
+                    'company': job.get('company') or '',
+                    'url': job.get('url') or '',
+                }
+                added += 1
+        return added
+
+    def search(self, query: str, page: int = 0, page_size: int = 5) -> Tuple[List[Tuple[Dict[str, Any], float]], int]:
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return [], 0
+        scores: Dict[int, float] = {}
+        with self._lock:
+            total_docs = len(self._docs) or 1
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1.0 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for job_id, tf in postings.items():
+                    scores[job_id] = scores.get(job_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + self.k1)
+            total = len(scores)
+            # Ties go to the newer job
+            top = heapq.nlargest((page + 1) * page_size, scores.items(), key=lambda kv: (kv[1], kv[0]))
+            results = [(self._docs[job_id], score) for job_id, score in top[page * page_size:]]
+        return results, total
+
+    def refresh(self, fetch_jobs_after, batch_size: int = 1000) -> int:
+        """Pull jobs stored since the last refresh (possibly by another process) into the index."""
+        # Concurrent searches share one in-flight refresh instead of each paging the table
+        if not self._refresh_lock.acquire(blocking=False):
+            return 0
+        try:
+            added = 0
+            while True:
+                rows = fetch_jobs_after(self.max_job_id, batch_size) or []
+                added += self.add_jobs(rows)
+                if len(rows) < batch_size:
+                    break
+            self.last_refresh = time.time()
+            return added
+        finally:
+            self._refresh_lock.release()
+
+    def is_stale(self, max_age_seconds: float) -> bool:
+        return time.time() - self.last_refresh > max_age_seconds
+
+
+_index = JobSearchIndex()
+
+
+def get_job_index() -> JobSearchIndex:
+    return _index
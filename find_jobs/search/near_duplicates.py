@@ -0,0 +1,192 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+FINGERPRINT_BITS = 64
+FINGERPRINT_COLUMNS = 'id, title, description, canonical_job_id'
+
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9+#]*")
+# Links and @mentions are what cross-posts usually differ in (channel footers, "join us" lines)
+_NOISE_RE = re.compile(r"(?:https?://|t\.me/)\S+|@\w+")
+
+
+def _shingles(text: str, size: int) -> List[str]:
+    words = _WORD_RE.findall(_NOISE_RE.sub(' ', (text or '').lower()))
+    if len(words) < size:
+        return []
+    return [' '.join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+def simhash(text: str, shingle_size: int = 3, min_shingles: int = 8) -> Optional[int]:
+    """
+    64-bit SimHash over word shingles. Texts that share most of their shingles get
+    fingerprints a few bits apart; texts too short to compare give None.
+    """
+    shingles = _shingles(text, shingle_size)
+    if len(shingles) < min_shingles:
+        return None
+    weights = [0] * FINGERPRINT_BITS
+    for shingle in shingles:
+        # A stable hash, so fingerprints agree across processes and restarts
+        h = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+# (SimHash of title and body, normalized title)
+Fingerprint = Tuple[int, str]
+
+
+def normalize_title(title: str) -> str:
+    return ' '.join(_WORD_RE.findall(_NOISE_RE.sub(' ', (title or '').lower())))
+
+
+def job_fingerprint(job: Dict[str, Any]) -> Optional[Fingerprint]:
+    # Title and body only: the url differs per channel, and enriched fields are not known yet.
+    # The title is also kept on its own: one employer's template reused for different roles
+    # differs in little but the title, so a SimHash match alone is not enough to link posts.
+    simhash_value = simhash(f"{job.get('title') or ''}\n{job.get('description') or ''}")
+    if simhash_value is None:
+        return None
+    return simhash_value, normalize_title(job.get('title') or '')
+
+
+class NearDuplicateIndex:
+    """
+    SimHash fingerprints of canonical jobs, bucketed so a lookup never scans the table. With
+    max_distance k the 64 bits are split into k + 1 bands; two fingerprints at most k bits apart
+    agree exactly on at least one band, so only the lookup's own bucket in each band has to be
+    compared. A candidate only counts as a duplicate if its normalized title is the same too.
+    Keys are job ids (or any hashable placeholder for a job not stored yet).
+    """
+
+    def __init__(self, max_distance: int = 4, max_entries: int = 50000):
+        self.max_distance = max(0, int(max_distance))
+        self.max_entries = max(1, int(max_entries))
+        band_count = min(FINGERPRINT_BITS, self.max_distance + 1)
+        widths = [FINGERPRINT_BITS // band_count + (1 if i < FINGERPRINT_BITS % band_count else 0) for i in range(band_count)]
+        self._bands: List[Tuple[int, int]] = []
+        shift = 0
+        for width in widths:
+            self._bands.append((shift, (1 << width) - 1))
+            shift += width
+        self._buckets: List[Dict[int, set]] = [{} for _ in self._bands]
+        # Insertion order doubles as age, so the oldest fingerprints are evicted first
+        self._fingerprints: 'OrderedDict[Hashable, Fingerprint]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self.max_job_id = 0
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._fingerprints)
+
+    def _band_values(self, fingerprint: int) -> List[int]:
+        return [(fingerprint >> shift) & mask for shift, mask in self._bands]
+
+    def add(self, key: Hashable, fingerprint: Optional[Fingerprint]) -> None:
+        if fingerprint is None:
+            return
+        with self._lock:
+            if key in self._fingerprints:
+                return
+            self._fingerprints[key] = fingerprint
+            for buckets, value in zip(self._buckets, self._band_values(fingerprint[0])):
+                buckets.setdefault(value, set()).add(key)
+            while len(self._fingerprints) > self.max_entries:
+                self._discard(*self._fingerprints.popitem(last=False))
+
+    def _discard(self, key: Hashable, fingerprint: Fingerprint) -> None:
+        for buckets, value in zip(self._buckets, self._band_values(fingerprint[0])):
+            bucket = buckets.get(value)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del buckets[value]
+
+    def find(self, fingerprint: Optional[Fingerprint]) -> Optional[Hashable]:
+        """Key of the closest same-title fingerprint within max_distance bits, or None."""
+        if fingerprint is None:
+            return None
+        simhash_value, title = fingerprint
+        best: Optional[Tuple[int, Hashable]] = None
+        with self._lock:
+            seen = set()
+            for buckets, value in zip(self._buckets, self._band_values(simhash_value)):
+                for key in buckets.get(value, ()):
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    candidate, candidate_title = self._fingerprints[key]
+                    if candidate_title != title:
+                        continue
+                    distance = (candidate ^ simhash_value).bit_count()
+                    if distance <= self.max_distance and (best is None or distance < best[0]):
+                        best = (distance, key)
+        return best[1] if best is not None else None
+
+    def add_jobs(self, jobs: Iterable[Dict[str, Any]]) -> int:
+        added = 0
+        for job in jobs:
+            job_id = job.get('id')
+            if job_id is None:
+                continue
+            self.max_job_id = max(self.max_job_id, int(job_id))
+            # Duplicates point at their canonical job, which is the one worth matching against
+            if job.get('canonical_job_id') is not None:
+                continue
+            fingerprint = job_fingerprint(job)
+            if fingerprint is not None:
+                self.add(job_id, fingerprint)
+                added += 1
+        return added
+
+    def refresh(self, fetch_recent_jobs, fetch_jobs_after, batch_size: int = 1000) -> int:
+        """
+        Load the jobs among the newest max_entries ids on first use, then pull in jobs stored
+        since (possibly by another worker). Everything is read in ascending pages of
+        batch_size, which also keeps each request under the API's row limit.
+        """
+        with self._refresh_lock:
+            added = 0
+            if not self.loaded:
+                newest = fetch_recent_jobs(1) or []
+                if newest:
+                    # Ascending from here, so eviction order matches age
+                    self.max_job_id = max(0, int(newest[0]['id']) - self.max_entries)
+                self.loaded = True
+            while True:
+                rows = fetch_jobs_after(self.max_job_id, batch_size) or []
+                added += self.add_jobs(rows)
+                if len(rows) < batch_size:
+                    break
+            return added
+
+
+_index: Optional[NearDuplicateIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_near_duplicate_index(config: Dict[str, Any]) -> Optional[NearDuplicateIndex]:
+    """Process-wide index, or None when NEAR_DUPLICATE_DETECTION is off."""
+    global _index
+    if not config.get('NEAR_DUPLICATE_DETECTION', True):
+        return None
+    with _index_lock:
+        if _index is None:
+            _index = NearDuplicateIndex(
+                max_distance=int(config.get('NEAR_DUPLICATE_MAX_DISTANCE', 4)),
+                max_entries=int(config.get('NEAR_DUPLICATE_INDEX_SIZE', 50000)),
+            )
+        return _index
+
+
+def refresh_near_duplicate_index(index: NearDuplicateIndex) -> int:
+    from db.db import fetch_jobs_after, fetch_recent_jobs
+    return index.refresh(
+        lambda limit: fetch_recent_jobs(limit, FINGERPRINT_COLUMNS),
+        lambda after_id, limit: fetch_jobs_after(after_id, limit, FINGERPRINT_COLUMNS),
+    )
@@ -0,0 +1,67 @@
+from matching.ai_matcher import BaseAIMatcher, HuggingFaceZeroShotMatcher
+from matching.hf_client import InferenceUnavailable
+
+JOB = {'id': 1, 'title': 'Accountant', 'description': 'Prepare monthly financial statements'}
+
+
+class FallbackMatcher(BaseAIMatcher):
+    def score_job(self, user_profile, job):
+        return 0.7
+
+
+class FailingBatcher:
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+
+    def classify(self, text, labels, multi_label):
+        self.calls += 1
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+    def classify_many(self, texts, labels, multi_label):
+        self.calls += 1
+        return [self.result for _ in texts]
+
+
+def matcher_with(batcher, **config):
+    config = dict({'INFERENCE_CACHE_BACKEND': 'memory'}, **config)
+    matcher = HuggingFaceZeroShotMatcher('key', config=config, fallback=FallbackMatcher())
+    matcher.batcher = batcher
+    return matcher
+
+
+def test_failed_prefetch_goes_straight_to_the_fallback():
+    batcher = FailingBatcher(InferenceUnavailable('rate_limited', 429))
+    matcher = matcher_with(batcher)
+
+    scored = matcher.score_jobs({'profession': 'Finance'}, [JOB, dict(JOB, id=2, title='Cashier')])
+
+    assert [score for _, score in scored] == [0.7, 0.7]
+    # One batched attempt; the per-job pass does not ask again about the texts that just failed
+    assert batcher.calls == 1
+
+
+def test_empty_scores_are_not_requested_again():
+    batcher = FailingBatcher({})
+    matcher = matcher_with(batcher)
+
+    assert matcher.score_job({'profession': 'Finance'}, JOB) == 0.7
+    assert matcher.score_job({'profession': 'Finance'}, JOB) == 0.7
+    assert batcher.calls == 1
+
+
+def test_failures_are_retried_once_the_ttl_is_over():
+    batcher = FailingBatcher({})
+    matcher = matcher_with(batcher, HF_NEGATIVE_CACHE_SECONDS=0)
+
+    matcher.score_job({'profession': 'Finance'}, JOB)
+    matcher.score_job({'profession': 'Finance'}, JOB)
+    assert batcher.calls == 2
+
+
+def test_degraded_jobs_are_tracked_per_matcher():
+    first, second = FallbackMatcher(), FallbackMatcher()
+    first.degraded[1] = 'rate_limited'
+    assert second.degraded == {}
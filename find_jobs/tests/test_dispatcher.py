@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+import pytest
+
+from alerts.dispatcher import TelegramAlertDispatcher, TokenBucket
+from benchmarks.fakes import FakeServiceServer
+
+
+@pytest.fixture
+def services():
+    def start(**kwargs):
+        server = FakeServiceServer(**kwargs).start()
+        servers.append(server)
+        return server
+
+    servers = []
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def test_paused_bucket_hands_out_nothing_until_the_pause_ends():
+    async def run():
+        bucket = TokenBucket(rate_per_second=100, capacity=100)
+        bucket.pause(0.2)
+        started = time.monotonic()
+        await bucket.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) >= 0.2
+
+
+def test_send_many_caps_messages_in_flight(services):
+    server = services(bot_latency_seconds=0.02)
+    dispatcher = TelegramAlertDispatcher(
+        'token', global_rate=1000, per_chat_rate=1000, max_in_flight=3, base_url=server.base_url
+    )
+
+    results = asyncio.run(dispatcher.send_many([(chat_id, 'hello') for chat_id in range(30)]))
+
+    assert [r.chat_id for r in results] == list(range(30))
+    assert all(r.ok for r in results)
+    assert server.stats['bot']['peak_in_flight'] <= 3
+
+
+def test_retry_after_pauses_every_sender(services):
+    server = services(bot_latency_seconds=0, bot_429_rate=1.0)
+    dispatcher = TelegramAlertDispatcher('token', max_retries=0, base_url=server.base_url)
+
+    results = asyncio.run(dispatcher.send_many([(1, 'hello')]))
+
+    assert results[0].status_code == 429
+    # The fake asks for retry_after=1; the shared bucket, not just that message, waits it out
+    assert dispatcher.global_bucket.paused_until - time.monotonic() > 0.5
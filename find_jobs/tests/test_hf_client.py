@@ -0,0 +1,226 @@
+import email.utils
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from matching.hf_batching import ZeroShotBatcher
+from matching.hf_client import (
+    AdaptiveConcurrencyLimiter, CircuitBreaker, HFInferenceClient, InferenceUnavailable, parse_retry_after,
+)
+
+
+def test_parse_retry_after_seconds_and_dates():
+    assert parse_retry_after('5') == 5.0
+    assert parse_retry_after('-3') == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+    date = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert 25 <= parse_retry_after(date) <= 30
+    past = email.utils.formatdate(time.time() - 30, usegmt=True)
+    assert parse_retry_after(past) == 0.0
+
+
+def test_limiter_grows_on_success_and_halves_on_overload():
+    limiter = AdaptiveConcurrencyLimiter(initial=4, minimum=1, maximum=6)
+    for _ in range(20):
+        assert limiter.acquire(timeout=0)
+        limiter.release()
+    assert limiter.limit == 6
+    assert limiter.acquire(timeout=0)
+    limiter.release(overloaded=True)
+    assert limiter.limit == 3
+    for _ in range(5):
+        assert limiter.acquire(timeout=0)
+        limiter.release(overloaded=True)
+    assert limiter.limit == 1
+
+
+def test_limiter_blocks_beyond_limit():
+    limiter = AdaptiveConcurrencyLimiter(initial=2, minimum=1, maximum=2)
+    assert limiter.acquire(timeout=0)
+    assert limiter.acquire(timeout=0)
+    assert not limiter.acquire(timeout=0.01)
+    limiter.release(succeeded=False)
+    assert limiter.acquire(timeout=0)
+    assert limiter.in_flight == 2
+
+
+def test_breaker_opens_then_allows_one_probe():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.is_open()
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_breaker_failed_probe_reopens_and_released_probe_can_be_retaken():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.release_probe()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+class _ScriptedServer:
+    """Answers each POST with the next (status, body, headers) in `responses`, repeating the last."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                status, body, headers = server.responses[min(server.requests, len(server.responses) - 1)]
+                server.requests += 1
+                data = body if isinstance(body, bytes) else json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        host, port = self._server.server_address[:2]
+        self.url = f"http://{host}:{port}/models/test"
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def scripted():
+    servers = []
+
+    def make(responses):
+        servers.append(_ScriptedServer(responses))
+        return servers[-1]
+
+    yield make
+    for server in servers:
+        server.close()
+
+
+def _client(**kwargs):
+    options = dict(max_retries=0, failure_threshold=1, reset_seconds=0.05, timeout_seconds=5)
+    options.update(kwargs)
+    return HFInferenceClient('key', **options)
+
+
+@pytest.mark.parametrize('probe_response', [
+    (400, {'error': 'bad input'}, {}),
+    (200, b'not json', {}),
+    (500, {'error': 'boom'}, {}),
+])
+def test_probe_outcome_never_leaves_circuit_stuck(scripted, probe_response):
+    server = scripted([(500, {'error': 'down'}, {}), probe_response, (200, {'ok': True}, {})])
+    client = _client()
+    with pytest.raises(InferenceUnavailable):
+        client.post(server.url, {}, task='test')
+    assert client.breaker.state == CircuitBreaker.OPEN
+    time.sleep(0.06)
+    with pytest.raises(InferenceUnavailable):
+        client.post(server.url, {}, task='test')
+    time.sleep(0.06)
+    assert client.post(server.url, {}, task='test') == {'ok': True}
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_probe_refused_before_sending_hands_probe_back(scripted):
+    server = scripted([(500, {'error': 'down'}, {}), (200, {'ok': True}, {})])
+    client = _client(max_retry_wait_seconds=1)
+    with pytest.raises(InferenceUnavailable):
+        client.post(server.url, {}, task='test')
+    time.sleep(0.06)
+    # A Retry-After longer than we are willing to wait raises before the request is sent
+    client._block_for(5)
+    with pytest.raises(InferenceUnavailable) as exc:
+        client.post(server.url, {}, task='test')
+    assert exc.value.reason == 'rate_limited'
+    client._blocked_until = 0.0
+    assert client.post(server.url, {}, task='test') == {'ok': True}
+
+
+def test_rate_limited_call_honors_retry_after_then_succeeds(scripted):
+    server = scripted([(429, {'error': 'slow down'}, {'Retry-After': '0.1'}), (200, {'ok': True}, {})])
+    client = _client(max_retries=1)
+    started = time.monotonic()
+    assert client.post(server.url, {}, task='test') == {'ok': True}
+    assert time.monotonic() - started >= 0.1
+    assert server.requests == 2
+    assert client.limiter.limit < client.limiter.maximum
+
+
+class _SlowClient:
+    """Answers (or fails) each batch after `delay`, like a call that sat out a Retry-After."""
+
+    def __init__(self, delay, error=None):
+        self.delay = delay
+        self.error = error
+        self.batches = []
+
+    def check_available(self):
+        pass
+
+    def post(self, url, payload, task):
+        time.sleep(self.delay)
+        self.batches.append(payload['inputs'])
+        if self.error is not None:
+            raise self.error
+        return [{'labels': ['a', 'b'], 'scores': [0.75, 0.25]} for _ in payload['inputs']]
+
+
+def _classify_together(client, texts):
+    batcher = ZeroShotBatcher('key', 'model', max_batch_size=len(texts), max_wait_seconds=1, client=client)
+    outcomes = {}
+
+    def classify(text):
+        try:
+            outcomes[text] = batcher.classify(text, ['a', 'b'], False)
+        except InferenceUnavailable as e:
+            outcomes[text] = e
+
+    threads = [threading.Thread(target=classify, args=(text,)) for text in texts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes
+
+
+def test_followers_wait_for_a_slow_batch_instead_of_timing_out():
+    client = _SlowClient(delay=0.3)
+    outcomes = _classify_together(client, ['one', 'two', 'three'])
+    assert len(client.batches) == 1
+    assert all(result == {'a': 0.75, 'b': 0.25} for result in outcomes.values())
+
+
+def test_followers_get_the_failure_that_ended_their_batch():
+    error = InferenceUnavailable('rate_limited', status_code=429, retry_after=30)
+    outcomes = _classify_together(_SlowClient(delay=0.3, error=error), ['one', 'two', 'three'])
+    assert all(outcome is error for outcome in outcomes.values())
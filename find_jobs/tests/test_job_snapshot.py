@@ -0,0 +1,40 @@
+import pytest
+
+from db.db import JobSnapshot
+from matching.ai_matcher import HuggingFaceZeroShotMatcher
+
+
+def snapshot():
+    return JobSnapshot([
+        {'id': 2, 'title': 'Accountant', 'domain_scores': {'Finance': 0.8, 'Other': 0.1}, 'tags': ['ifrs']},
+        {'id': 1, 'title': 'Driver', 'domain_scores': None},
+    ])
+
+
+def test_jobs_are_read_only_all_the_way_down():
+    jobs = snapshot().jobs
+    with pytest.raises(TypeError):
+        jobs[0]['title'] = 'Changed'
+    with pytest.raises(TypeError):
+        jobs[0]['domain_scores']['Finance'] = 0.0
+    with pytest.raises(AttributeError):
+        jobs[0]['tags'].append('gaap')
+
+
+def test_snapshot_does_not_alias_the_loaded_rows():
+    rows = [{'id': 1, 'domain_scores': {'Finance': 0.8}}]
+    frozen = JobSnapshot(rows)
+    rows[0]['domain_scores']['Finance'] = 0.0
+    assert frozen.jobs[0]['domain_scores']['Finance'] == 0.8
+    assert frozen.job_ids == [1]
+
+
+def test_matcher_uses_frozen_domain_scores_without_a_call():
+    class NoCalls:
+        def classify(self, *args):
+            raise AssertionError('stored scores should be used')
+
+    matcher = HuggingFaceZeroShotMatcher('key', config={'INFERENCE_CACHE_BACKEND': 'memory'})
+    matcher.batcher = NoCalls()
+    job = dict(snapshot().jobs[0], job_post_score=0.9)
+    assert matcher.score_job({'profession': 'Finance'}, job) == 0.8
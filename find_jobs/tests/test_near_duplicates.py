@@ -0,0 +1,99 @@
+import pytest
+
+from search.near_duplicates import NearDuplicateIndex, job_fingerprint
+
+# One employer's vacancy template: roles differ in little but the title and the years asked for
+TEMPLATE = (
+    "Abyssinia Trading PLC invites qualified applicants for the position below. "
+    "Required experience: {years} years of relevant work experience. Place of work: Addis Ababa. "
+    "Salary: attractive and negotiable. Terms of employment: permanent. "
+    "How to apply: interested applicants can submit their CV, application letter and "
+    "supporting documents in person to the head office human resource department, "
+    "second floor, within ten working days from the date of this announcement. "
+    "Only shortlisted candidates will be contacted for the written exam and interview. "
+    "Female applicants are highly encouraged to apply. The company reserves the right to accept "
+    "or reject any application. For more information call the human resource office during "
+    "working hours."
+)
+
+
+def templated(title, years):
+    return {'title': title, 'description': TEMPLATE.format(years=years)}
+
+
+def cross_post(job, footer):
+    return {'title': job['title'], 'description': f"{job['description']}\n{footer}"}
+
+
+def index_of(*jobs, max_distance=4):
+    index = NearDuplicateIndex(max_distance=max_distance)
+    for job_id, job in enumerate(jobs, start=1):
+        index.add(job_id, job_fingerprint(job))
+    return index
+
+
+@pytest.mark.parametrize('title', ['Junior Accountant', 'Sales Officer', 'Driver', 'IT Support'])
+def test_templated_vacancies_for_other_roles_are_not_linked(title):
+    original = job_fingerprint(templated('Senior Accountant', 5))
+    other = job_fingerprint(templated(title, 5))
+    # Close enough that SimHash alone would link them
+    assert (original[0] ^ other[0]).bit_count() <= 4
+    index = index_of(templated('Senior Accountant', 5))
+    assert index.find(other) is None
+
+
+@pytest.mark.parametrize('footer', [
+    'Join @addis_jobs for daily vacancies',
+    'More jobs: https://t.me/ethio_jobs',
+    '@hahu_jobs | t.me/hahu_jobs',
+])
+def test_cross_posts_with_channel_footers_are_linked(footer):
+    original = templated('Senior Accountant', 5)
+    index = index_of(templated('HR Officer', 3), original)
+    assert index.find(job_fingerprint(cross_post(original, footer))) == 2
+
+
+def test_title_match_ignores_case_punctuation_and_mentions():
+    original = templated('Senior Accountant', 5)
+    index = index_of(original)
+    repost = dict(original, title='SENIOR ACCOUNTANT! @addis_jobs')
+    assert index.find(job_fingerprint(repost)) == 1
+
+
+def test_short_posts_are_not_fingerprinted():
+    assert job_fingerprint({'title': 'Driver', 'description': 'Call 0911'}) is None
+
+
+def test_eviction_keeps_the_newest_entries():
+    index = NearDuplicateIndex(max_entries=2)
+    jobs = [templated(title, 5) for title in ('Cashier', 'Driver', 'Nurse')]
+    for job_id, job in enumerate(jobs, start=1):
+        index.add(job_id, job_fingerprint(job))
+    assert len(index) == 2
+    assert index.find(job_fingerprint(jobs[0])) is None
+    assert index.find(job_fingerprint(jobs[2])) == 3
+
+
+def test_refresh_loads_recent_history_in_pages():
+    titles = ['Cashier', 'Driver', 'Nurse', 'Teacher', 'Guard', 'Cleaner', 'Chef']
+    rows = [dict(templated(title, 2), id=job_id, canonical_job_id=None) for job_id, title in enumerate(titles, start=1)]
+    rows[4]['canonical_job_id'] = 1
+    requests = []
+
+    def fetch_recent_jobs(limit):
+        return [row for row in reversed(rows) if row['canonical_job_id'] is None][:limit]
+
+    def fetch_jobs_after(after_id, limit):
+        requests.append((after_id, limit))
+        return [row for row in rows if row['id'] > after_id][:limit]
+
+    index = NearDuplicateIndex(max_entries=5)
+    assert index.refresh(fetch_recent_jobs, fetch_jobs_after, batch_size=2) == 4
+    # Ids 3..7 are the newest five; id 5 is a duplicate and stays out
+    assert requests == [(2, 2), (4, 2), (6, 2)]
+    assert index.find(job_fingerprint(rows[1])) is None
+    assert index.find(job_fingerprint(rows[6])) == 7
+
+    rows.append(dict(templated('Welder', 2), id=8, canonical_job_id=None))
+    assert index.refresh(fetch_recent_jobs, fetch_jobs_after, batch_size=2) == 1
+    assert requests[-1] == (7, 2)
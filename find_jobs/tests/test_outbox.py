@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from alerts.dispatcher import TELEGRAM_MESSAGE_LIMIT, DeliveryResult, format_job_alert, split_job_alert
+from alerts.outbox import AlertDeliveryWorker, _is_permanent, enqueue_job_alerts
+from benchmarks.fakes import FakeRepository, FakeServiceServer
+from db.db import claim_outbox_batch, use_repository
+from matching.ai_matcher import BaseAIMatcher
+from scheduler.scheduler import JobScheduler
+
+
+class FlatMatcher(BaseAIMatcher):
+    def score_job(self, user_profile, job):
+        # Newer jobs rank higher
+        return 0.5 + job['id'] / 100
+
+
+@pytest.fixture
+def repo():
+    repo = FakeRepository(users=[{'user_id': 1, 'profession': 'Finance'}, {'user_id': 2, 'profession': 'Finance'}])
+    use_repository(repo)
+    repo.save_job_posts([
+        {'url': f'https://t.me/jobs/{i}', 'title': f'Job {i}', 'canonical_job_id': None} for i in range(1, 8)
+    ])
+    yield repo
+    use_repository(None)
+
+
+def test_jobs_already_in_the_outbox_do_not_take_top_k_slots(repo):
+    config = {'AI_TOP_K': 3, 'AI_MIN_SCORE': 0.5}
+    scheduler = JobScheduler()
+
+    first = scheduler.match_users(config, FlatMatcher(), repo.users)
+    assert [job['id'] for job in first[0][1]] == [7, 6, 5]
+    # Nothing was delivered; the next cycle moves on instead of re-selecting 7, 6 and 5
+    second = scheduler.match_users(config, FlatMatcher(), repo.users)
+    assert [job['id'] for job in second[0][1]] == [4, 3, 2]
+    assert len(repo.outbox) == 12
+
+
+def test_a_claim_takes_all_of_a_users_pending_rows(repo):
+    jobs = [{'id': i, 'title': f'Job {i}'} for i in range(1, 5)]
+    enqueue_job_alerts([(1, jobs[:3]), (2, jobs)])
+
+    rows = claim_outbox_batch(limit=2)
+
+    # The limit reached only user 1's rows, but none of them is left behind for another batch
+    assert sorted(r['job_id'] for r in rows if r['user_id'] == 1) == [1, 2, 3]
+    assert not any(r['user_id'] == 2 for r in rows)
+    assert len(claim_outbox_batch(limit=2)) == 4
+
+
+def test_a_large_backlog_is_split_into_messages_that_fit(repo):
+    server = FakeServiceServer(bot_latency_seconds=0).start()
+    try:
+        jobs = [
+            {'id': i, 'title': f'Senior accountant wanted, job number {i}', 'company': 'Acme',
+             'url': f'https://t.me/jobs/{i}'}
+            for i in range(1, 121)
+        ]
+        enqueue_job_alerts([(1, jobs)])
+        worker = AlertDeliveryWorker({'TELEGRAM_BOT_TOKEN': 'token', 'TELEGRAM_API_BASE_URL': server.base_url})
+
+        delivered, failed = asyncio.run(worker.drain())
+
+        assert failed == 0 and delivered > 1
+        assert '400' not in server.stats['bot']
+        assert {r['status'] for r in repo.outbox.values()} == {'sent'}
+    finally:
+        server.stop()
+
+
+def test_split_job_alert_keeps_every_message_under_the_limit():
+    jobs = [{'title': 'x' * 1000, 'company': 'Acme', 'url': 'https://t.me/jobs/1'} for _ in range(10)]
+    groups = split_job_alert(jobs, limit=TELEGRAM_MESSAGE_LIMIT)
+    assert sorted(i for group in groups for i in group) == list(range(10))
+    assert all(len(format_job_alert([jobs[i] for i in group])) <= TELEGRAM_MESSAGE_LIMIT for group in groups)
+
+
+def test_only_chat_errors_park_rows_for_good():
+    assert _is_permanent(DeliveryResult(1, False, 1, 403, 'Forbidden: bot was blocked by the user'))
+    assert _is_permanent(DeliveryResult(1, False, 1, 400, 'Bad Request: chat not found'))
+    assert not _is_permanent(DeliveryResult(1, False, 1, 400, 'Bad Request: message is too long'))
+    assert not _is_permanent(DeliveryResult(1, False, 1, 429, 'Too Many Requests'))
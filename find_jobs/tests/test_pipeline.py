@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from benchmarks.fakes import FakePyrogramClient, FakeRepository, FakeTelegramScraper
+from db.db import use_repository
+from matching.ai_matcher import BaseAIMatcher
+from scraper.pipeline import IngestionPipeline
+
+CHANNELS = ['@jobs_a', '@jobs_b']
+
+
+class RecordingMatcher(BaseAIMatcher):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def annotate_jobs(self, jobs):
+        self.calls.append(len(jobs))
+        for job in jobs:
+            job['job_post_score'] = 0.9
+
+
+@pytest.fixture
+def repo():
+    repo = FakeRepository(users=[])
+    use_repository(repo)
+    yield repo
+    use_repository(None)
+
+
+def pipeline_config(**overrides):
+    config = {
+        'NEAR_DUPLICATE_DETECTION': False,
+        'PIPELINE_QUEUE_SIZE': 10,
+        'PIPELINE_STORE_BATCH_SIZE': 10,
+        'PIPELINE_STORE_LINGER_SECONDS': 0.5,
+        'SCRAPE_PAGE_SIZE': 5,
+        'SCRAPE_MAX_PAGES': 10,
+    }
+    config.update(overrides)
+    return config
+
+
+def test_store_batches_are_annotated_in_one_call(repo):
+    client = FakePyrogramClient(CHANNELS, posts_per_channel=20)
+    repo.offsets = client.initial_offsets()
+    matcher = RecordingMatcher()
+    pipeline = IngestionPipeline(pipeline_config(), matcher, FakeTelegramScraper(client))
+
+    new_ids = asyncio.run(pipeline.run(CHANNELS))
+
+    assert len(new_ids) == 40
+    assert sum(matcher.calls) == 40
+    assert len(matcher.calls) < 40
+    assert all(job['job_post_score'] == 0.9 for job in repo.jobs)
+
+
+def test_a_dead_stage_stops_the_pipeline_instead_of_hanging(repo):
+    client = FakePyrogramClient(CHANNELS, posts_per_channel=200)
+    repo.offsets = client.initial_offsets()
+
+    class BrokenScraper(FakeTelegramScraper):
+        async def filter_unseen_messages(self, channel, messages):
+            raise RuntimeError('dedupe stage died')
+
+    config = pipeline_config(SCRAPE_MAX_PAGES=40)
+    pipeline = IngestionPipeline(config, scraper=BrokenScraper(client))
+
+    new_ids = asyncio.run(asyncio.wait_for(pipeline.run(CHANNELS), timeout=10))
+
+    assert new_ids == []
+    # Nothing was stored, so no channel moves past the posts it has not processed
+    assert repo.offsets == client.initial_offsets()
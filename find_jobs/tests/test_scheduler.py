@@ -0,0 +1,32 @@
+import asyncio
+
+from benchmarks.fakes import FakePyrogramClient, FakeTelegramScraper
+from scheduler.scheduler import JobScheduler
+from scheduler.sharding import ShardAssignment
+
+CONFIG = {'LIVE_INGESTION': True, 'TELEGRAM_CHANNELS': ['@jobs_a']}
+
+
+class FlippingCoordinator:
+    def __init__(self):
+        self.is_leader = False
+
+    def assignment(self):
+        return ShardAssignment(0 if self.is_leader else 1, 2, self.is_leader)
+
+
+def test_the_live_listener_follows_leadership():
+    client = FakePyrogramClient(['@jobs_a'], posts_per_channel=0)
+    job_scheduler = JobScheduler(FakeTelegramScraper(client))
+    job_scheduler.coordinator = coordinator = FlippingCoordinator()
+
+    async def heartbeats(*leadership):
+        subscribed = []
+        for is_leader in leadership:
+            coordinator.is_leader = is_leader
+            await job_scheduler.run_heartbeat(CONFIG)
+            subscribed.append(len(client.handlers))
+        return subscribed
+
+    assert asyncio.run(heartbeats(False, True, True, False, True)) == [0, 1, 1, 0, 1]
+    assert job_scheduler.scraper.client_handlers == client.handlers
@@ -0,0 +1,60 @@
+import asyncio
+
+from benchmarks.fakes import FakePyrogramClient, FakeTelegramScraper
+from scraper.scraper import _channel_key, _get_client_lock, cleanup_pyrogram_client
+
+CHANNEL = '@jobs_a'
+
+
+def fetch_pages(client, last_message_id, page_size=5, max_pages=3):
+    scraper = FakeTelegramScraper(client)
+
+    async def collect():
+        return [
+            [m.id for m in messages]
+            async for messages in scraper.iter_new_message_pages(client, CHANNEL, last_message_id, page_size, max_pages)
+        ]
+
+    return asyncio.run(collect())
+
+
+def test_pages_run_forward_from_the_high_water_mark():
+    client = FakePyrogramClient([CHANNEL], posts_per_channel=12)
+    last = client.initial_offsets()[_channel_key(CHANNEL)]
+    pages = fetch_pages(client, last)
+    ids = [message_id for page in pages for message_id in page]
+    assert ids == list(range(last + 1, last + 13))
+    assert [len(page) for page in pages] == [5, 5, 2]
+
+
+def test_a_backlog_longer_than_max_pages_is_finished_next_cycle():
+    client = FakePyrogramClient([CHANNEL], posts_per_channel=40)
+    last = client.initial_offsets()[_channel_key(CHANNEL)]
+    seen = []
+    while True:
+        ids = [message_id for page in fetch_pages(client, last) for message_id in page]
+        if not ids:
+            break
+        # The oldest new posts come first, so committing the newest fetched id loses nothing
+        assert ids[0] == last + 1
+        seen.extend(ids)
+        last = max(ids)
+    assert seen == [m.id for m in client.history[_channel_key(CHANNEL)]]
+
+
+def test_a_channel_without_an_offset_only_gets_its_latest_page():
+    client = FakePyrogramClient([CHANNEL], posts_per_channel=12)
+    newest = client.history[_channel_key(CHANNEL)][-1].id
+    assert fetch_pages(client, 0) == [list(range(newest - 4, newest + 1))]
+
+
+def test_the_client_lock_follows_the_running_loop():
+    async def contend():
+        # A waiter makes the lock bind to this loop
+        async with _get_client_lock():
+            waiter = asyncio.create_task(cleanup_pyrogram_client())
+            await asyncio.sleep(0)
+        await waiter
+
+    asyncio.run(contend())
+    asyncio.run(contend())
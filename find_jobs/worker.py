@@ -1,24 +1,28 @@
-import nest_asyncio
-nest_asyncio.apply()
+import asyncio
 from config.config import load_config
 from db.db import init_db
-from scheduler.scheduler import start_scheduler, cleanup_scheduler
-import asyncio
+from metrics.metrics import start_metrics_server
+from scheduler.scheduler import start_scheduler, cleanup_scheduler, wait_for_shutdown
+
+
+async def run(config):
+    metrics_server = await start_metrics_server(config)
+    scheduler = await start_scheduler(config)
+    try:
+        print('Worker running. Press Ctrl+C to exit.')
+        print(f"Scheduler will run job_scrape_and_alert every {config['JOB_SCRAPE_INTERVAL_MINUTES']} minutes.")
+        await wait_for_shutdown()
+        print("Worker shutting down...")
+    finally:
+        await cleanup_scheduler(scheduler)
+        if metrics_server is not None:
+            metrics_server.close()
+
 
 if __name__ == "__main__":
     config = load_config()
     init_db(config)
-    bot, scheduler = start_scheduler(config)
     try:
-        print('Worker running. Press Ctrl+C to exit.')
-        print('Scheduler will automatically run job_scrape_and_alert every 30 minutes.')
-        
-        # Let the scheduler handle the scraping automatically
-        # Don't manually trigger job_scrape_and_alert here
-        import time
-        while True:
-            time.sleep(60)
+        asyncio.run(run(config))
     except KeyboardInterrupt:
         print("Worker shutting down...")
-    finally:
-        cleanup_scheduler(scheduler) 
\ No newline at end of file